@@ -1,91 +1,24 @@
 # ml_model/odoo_api_competitor_products.py
-import xmlrpc.client
+import argparse
 import os
-from botocore.exceptions import ClientError
 import pandas as pd
-import boto3
-import json
-import base64
 import sys
 # Add project root to path to import log_config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from log_config import get_logger
+from odoo_client import get_client
+from odoo_mirror import OdooMirror
 
 logger = get_logger() # Use specific logger name for this module
 
-# --- AWS Secrets Manager ---
-def get_secret(secret_name, region_name="eu-north-1"):
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e: # Catch boto3 ClientError specifically if aiohttp is not used elsewhere
-        logger.error(f"Error getting secret '{secret_name}'", exc_info=True)
-        raise e
-    except Exception as e: # Generic exception for other potential errors
-         logger.error(f"Unexpected error getting secret '{secret_name}'", exc_info=True)
-         raise e
-    else:
-        if 'SecretString' in get_secret_value_response:
-            secret = get_secret_value_response['SecretString']
-            return json.loads(secret)
-        elif 'SecretBinary' in get_secret_value_response:
-            decoded_binary_secret = base64.b64decode(get_secret_value_response['SecretBinary'])
-            return json.loads(decoded_binary_secret)
-        else:
-            logger.error(f"Secret '{secret_name}' retrieved but contains no SecretString or SecretBinary.")
-            return None
-
-SECRET_NAME = "prod/wayakit-app"
-AWS_REGION = "eu-north-1"
-
-try:
-    secrets = get_secret(SECRET_NAME, AWS_REGION)
-    if not secrets:
-        raise ValueError("Secrets could not be retrieved or were empty.")
-
-    ODOO_URL = secrets.get('ODOO_URL')
-    ODOO_DB = secrets.get('ODOO_DB')
-    ODOO_USERNAME = secrets.get('ODOO_USERNAME')
-    API_TOKEN = secrets.get('ODOO_API_TOKEN')
-
-    if not all([ODOO_URL, ODOO_DB, ODOO_USERNAME, API_TOKEN]):
-        missing = [k for k, v in {'URL': ODOO_URL, 'DB': ODOO_DB, 'Username': ODOO_USERNAME, 'Token': API_TOKEN}.items() if not v]
-        logger.error(f"ERROR: Missing essential Odoo secrets from AWS Secrets Manager: {', '.join(missing)}.")
-        exit(1) # Exit with error code
-
-    logger.info(f"Secrets loaded successfully from AWS Secrets Manager for DB: {ODOO_DB}")
-
-except Exception as e:
-    logger.error(f"CRITICAL ERROR: Failed to load secrets. {e}", exc_info=True)
-    exit(1) # Exit with error code
+parser = argparse.ArgumentParser(description="Fetches the competitor products stored in Odoo.")
+parser.add_argument('--sync_mode', default='full', choices=['full', 'incremental'],
+                    help="'full' downloads the whole model; 'incremental' only what changed since the last run (local mirror).")
+args = parser.parse_args()
 
 # --- Odoo Connection ---
-try:
-    common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common')
-    # Verify connection before authenticating
-    version = common.version()
-    logger.info(f"Connected to Odoo version: {version['server_version']}")
-
-    uid = common.authenticate(ODOO_DB, ODOO_USERNAME, API_TOKEN, {})
-    if not uid:
-         raise ValueError("Authentication failed, received empty UID.")
-    models = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/object')
-    logger.info(f"Authentication successful. User ID (uid): {uid}")
-except xmlrpc.client.ProtocolError as err:
-    logger.error(f"Authentication ERROR: A protocol error occurred: {err.url}, {err.errcode}, {err.errmsg}", exc_info=False)
-    exit(1)
-except ConnectionRefusedError as e:
-    logger.error(f"Authentication ERROR: Connection refused. Check Odoo URL ('{ODOO_URL}') and network.", exc_info=False)
-    exit(1)
-except Exception as e:
-    logger.error(f"Authentication ERROR: An unexpected error occurred.", exc_info=True)
-    exit(1)
+# Credentials and authentication are resolved on the first call and shared by the whole process
+odoo = get_client()
 
 # --- Fetch Data from Odoo ---
 MODEL_NAME = 'competitor.product'
@@ -106,27 +39,9 @@ fields_to_get = [
     'company',
 ]
 
-logger.info(f"\nSearching records in Odoo model '{MODEL_NAME}'...")
-
-try:
-    # Fetch all records without a specific domain for now, add filters if needed
-    records = models.execute_kw(
-        ODOO_DB, uid, API_TOKEN,
-        MODEL_NAME,
-        'search_read',
-        [[]], # Empty domain fetches all records
-        {'fields': fields_to_get}
-    )
-    logger.info(f"Success. {len(records)} competitor products found.")
-
-except Exception as e:
-    logger.error(f"Critical ERROR during Odoo query for '{MODEL_NAME}'", exc_info=True)
-    exit(1)
-
-# --- Process and Save Data ---
-if records:
-    df = pd.DataFrame(records)
-
+# --- Process Data ---
+def to_output(df):
+    """Turns a chunk of competitor.product records into the CSV columns."""
     # Extract names from Many2one fields (returned as [id, 'name'])
     # Handle cases where the field might be False (empty)
     df['classification_id'] = df['classification_id'].apply(lambda x: x[1] if isinstance(x, list) and len(x) == 2 else None)
@@ -185,17 +100,32 @@ if records:
     # Format Price column (optional, keep as number is usually better for processing)
     # df_final['Price per unit SAR'] = df_final['Price per unit SAR'].apply(lambda x: f"SAR {x:,.2f}" if pd.notna(x) else '')
 
-    # Save to CSV
-    try:
-        df_final.to_csv(OUTPUT_CSV_FILE, index=False, encoding='utf-8-sig')
-        logger.info(f"\nSuccess! The file '{OUTPUT_CSV_FILE}' has been created with data from Odoo.")
-        logger.info("\nPreview of the first 5 rows:")
-        logger.info(f"\n{df_final.head()}")
-    except Exception as e:
-        logger.error(f"Error saving data to CSV '{OUTPUT_CSV_FILE}'", exc_info=True)
-        exit(1)
+    return df_final
+
+# --- Fetch and Save Data ---
+logger.info(f"\nSearching records in Odoo model '{MODEL_NAME}'...")
+
+# Records arrive in pages fetched in parallel; each chunk is written to the CSV as soon as it arrives.
+# In incremental mode only the changes are downloaded and the CSV is rebuilt from the local mirror
+try:
+    # Fetch all records without a specific domain for now, add filters if needed
+    if args.sync_mode == 'incremental':
+        rows, preview = OdooMirror(odoo, MODEL_NAME, [], fields_to_get).export_csv(OUTPUT_CSV_FILE, transform=to_output)
+    else:
+        rows, preview = odoo.export_csv(MODEL_NAME, [], fields_to_get, OUTPUT_CSV_FILE, transform=to_output) # Empty domain fetches all records
+    logger.info(f"Success. {rows} competitor products found.")
+
+except Exception as e:
+    logger.error(f"Critical ERROR during Odoo query or while saving '{OUTPUT_CSV_FILE}'", exc_info=True)
+    exit(1)
+
+if rows:
+    logger.info(f"\nSuccess! The file '{OUTPUT_CSV_FILE}' has been created with data from Odoo.")
+    logger.info("\nPreview of the first 5 rows:")
+    logger.info(f"\n{preview}")
 
 else:
     logger.warning("No competitor product records found in Odoo.")
 
-logger.info("\nOdoo competitor product fetching process completed.")
\ No newline at end of file
+logger.info("\nOdoo competitor product fetching process completed.")
+odoo.report()
\ No newline at end of file
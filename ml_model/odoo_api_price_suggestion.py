@@ -1,74 +1,107 @@
-import xmlrpc.client
-from botocore.exceptions import ClientError
 import pandas as pd
+import math
 import os
-from datetime import datetime
-import boto3
-import json
-import base64
 import sys
 import argparse 
-from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from log_config import get_logger
+from odoo_client import get_client
+from odoo_bulk import BulkJournal, BulkWriter, payload_fingerprint
 
 logger = get_logger()
 
 MODEL_NAME = 'product.price.suggestion'
 HISTORY_MODEL_NAME = 'product.price.suggestion.history'
 
-def get_secret(secret_name, region_name="eu-north-1"):
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        logger.error(f"Error al obtener el secreto", exc_info=True)
-        raise e 
-    else:
-        if 'SecretString' in get_secret_value_response:
-            secret = get_secret_value_response['SecretString']
-            return json.loads(secret)
-        else:
-            decoded_binary_secret = base64.b64decode(get_secret_value_response['SecretBinary'])
-            return json.loads(decoded_binary_secret)
-
-SECRET_NAME = "prod/wayakit-app" 
-AWS_REGION = "eu-north-1" 
-try:
-    secrets = get_secret(SECRET_NAME, AWS_REGION)
-    ODOO_URL = secrets.get('ODOO_URL')
-    ODOO_DB = secrets.get('ODOO_DB')
-    ODOO_USERNAME = secrets.get('ODOO_USERNAME')
-    API_TOKEN = secrets.get('ODOO_API_TOKEN')
-    if not all([ODOO_URL, ODOO_DB, ODOO_USERNAME, API_TOKEN]):
-        logger.error("ERROR: Faltan secretos esenciales de Odoo.")
-        exit()
-    logger.info(f"Secretos cargados exitosamente para DB: {ODOO_DB}")
-except Exception as e:
-    logger.error(f"ERROR CRÍTICO: No se pudieron cargar los secretos.", exc_info=True)
-    exit()
-
-try:
-    common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common')
-    uid = common.authenticate(ODOO_DB, ODOO_USERNAME, API_TOKEN, {})
-    models = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/object')
-    logger.info(f"Autenticación exitosa. User ID (uid): {uid}")
-except Exception as e:
-    logger.error(f"ERROR de autenticación", exc_info=True)
-    exit()
+# Credenciales y autenticación se resuelven en la primera llamada (tras leer el CSV) y se comparten en el proceso
+odoo = get_client()
 
 parser = argparse.ArgumentParser(description="Carga sugerencias de precios a Odoo.")
-parser.add_argument('--run_mode', default='partial', choices=['partial', 'full'],
-                    help="Define el modo de ejecución: 'partial' (solo añade) o 'full' (archiva, borra y añade).")
+parser.add_argument('--run_mode', default='partial', choices=['partial', 'full', 'reconcile'],
+                    help="Define el modo de ejecución: 'partial' (solo añade), 'full' (archiva, borra y añade) o "
+                         "'reconcile' (como 'full', pero solo archiva y escribe las sugerencias que cambiaron).")
 args = parser.parse_args()
 
+fields_to_archive = [
+    'product_id_str', 'product_type', 'generic_product_type', 
+    'subindustry', 'industry', 'volume_units', 
+    'production_cost', 'suggested_price', 'profit', 'create_date',
+    'product_name', 'predicted_price_per_unit', 'model_confidence',
+    'market_min_found', 'market_max_found', 'competitors_count'
+]
+
+
+def to_history(record):
+    """Copia de una sugerencia leída de Odoo lista para crearla en el historial."""
+    history = {key: value for key, value in record.items() if key != 'id'}
+    if 'create_date' in history:
+        history['original_create_date'] = history.pop('create_date')
+    return history
+
+
+def is_empty(value):
+    return value is None or value is False or value == '' or (isinstance(value, float) and math.isnan(value))
+
+
+def same_value(new, old, digits=None):
+    """Compara un valor del CSV con el guardado en Odoo (vacíos equivalentes; floats a la precisión del campo)."""
+    if is_empty(new) or is_empty(old):
+        return is_empty(new) and is_empty(old)
+    if isinstance(new, float) or isinstance(old, float):
+        if digits:
+            return round(float(new), digits) == round(float(old), digits)
+        return math.isclose(float(new), float(old), rel_tol=1e-9, abs_tol=1e-9)
+    return new == old
+
+
+def plan_reconciliation(new_records, existing_records, digits):
+    """
+    Diferencia entre el CSV y las sugerencias de Odoo por product_id_str: (a crear, a actualizar
+    [(registro actual, valores cambiados)], a eliminar). Si un producto está repetido en Odoo, cada
+    fila del CSV se empareja con uno (por id) y los sobrantes se eliminan.
+    """
+    existing_by_key = {}
+    for record in sorted(existing_records, key=lambda r: r['id']):
+        existing_by_key.setdefault(str(record['product_id_str']), []).append(record)
+    to_create, to_update = [], []
+    for new in new_records:
+        matches = existing_by_key.get(str(new['product_id_str']))
+        if not matches:
+            to_create.append(new)
+            continue
+        old = matches.pop(0)
+        changes = {field: value for field, value in new.items() if not same_value(value, old.get(field), digits.get(field))}
+        if changes:
+            to_update.append((old, changes))
+    to_remove = [record for records in existing_by_key.values() for record in records]
+    return to_create, to_update, to_remove
+
+
+def changes_key(changes):
+    return repr(sorted(changes.items()))
+
+
+def update_items(to_update):
+    """[id, valores cambiados] por sugerencia, ordenados para que los mismos cambios caigan en el mismo bloque."""
+    return sorted(([old['id'], changes] for old, changes in to_update), key=lambda item: changes_key(item[1]))
+
+
+def group_updates(items):
+    """Un write por combinación de valores: los registros con los mismos cambios comparten llamada."""
+    groups = {}
+    for record_id, changes in items:
+        groups.setdefault(changes_key(changes), (changes, []))[1].append(record_id)
+    return [(ids, changes) for changes, ids in groups.values()]
+
+
+def write_chunk(chunk):
+    """Escribe un bloque de cambios: un write por combinación de valores dentro del bloque."""
+    for ids, changes in group_updates(chunk):
+        odoo.execute_kw(MODEL_NAME, 'write', [ids, changes])
+    return True
+
+
 csv_file_path = 'ml_model/wayakit_prediction_report.csv'
 try:
     df_results = pd.read_csv(csv_file_path)
@@ -107,77 +140,115 @@ for index, row in df_results.iterrows():
 if not all_records_data:
     logger.warning("No hay registros válidos para cargar desde el CSV. Proceso finalizado.")
     exit()
-if args.run_mode == 'full':
-    logger.info("--- MODO EJECUCIÓN: FULL ---")
-    logger.info(f"Iniciando archivado de '{MODEL_NAME}' a '{HISTORY_MODEL_NAME}'...")
+# Las escrituras van en bloques acotados por varias conexiones. El registro local guarda los bloques
+# ya escritos: si la carga se corta, repetirla con el mismo CSV y modo envía solo los pendientes
+journal = BulkJournal(fingerprint=payload_fingerprint(args.run_mode, all_records_data))
+writer = BulkWriter(odoo, journal)
+
+if args.run_mode == 'reconcile':
+    logger.info("--- MODO EJECUCIÓN: RECONCILE ---")
     try:
-        existing_ids = models.execute_kw(
-            ODOO_DB, uid, API_TOKEN,
-            MODEL_NAME, 'search', [[('id', '!=', 0)]] 
-        )
-        
-        if existing_ids:
-            logger.info(f"Se encontraron {len(existing_ids)} registros para archivar.")
-            
-            fields_to_archive = [
-                'product_id_str', 'product_type', 'generic_product_type', 
-                'subindustry', 'industry', 'volume_units', 
-                'production_cost', 'suggested_price', 'profit', 'create_date',
-                'product_name', 'predicted_price_per_unit', 'model_confidence',
-                'market_min_found', 'market_max_found', 'competitors_count'
-            ]
-            old_records = models.execute_kw(
-                ODOO_DB, uid, API_TOKEN,
-                MODEL_NAME, 'read', [existing_ids], {'fields': fields_to_archive}
-            )
-            
-            records_to_create_in_history = []
-            for record in old_records:
-                record.pop('id', None)
-                if 'create_date' in record:
-                    record['original_create_date'] = record.pop('create_date')
-                records_to_create_in_history.append(record)
-            
-            logger.info(f"Creando {len(records_to_create_in_history)} registros en el historial '{HISTORY_MODEL_NAME}'...")
-            models.execute_kw(
-                ODOO_DB, uid, API_TOKEN,
-                HISTORY_MODEL_NAME, 'create', [records_to_create_in_history]
-            )
-            logger.info("¡Registros archivados en historial exitosamente!")
-
-            logger.info(f"Borrando {len(existing_ids)} registros antiguos de '{MODEL_NAME}'...")
-            models.execute_kw(
-                ODOO_DB, uid, API_TOKEN,
-                MODEL_NAME, 'unlink', [existing_ids]
-            )
-            logger.info("¡Registros antiguos borrados exitosamente!")
-
-        else:
-            logger.info("No se encontraron registros existentes. No se requiere archivado.")
+        existing_records = odoo.search_read(MODEL_NAME, [], fields_to_archive)
+        field_info = odoo.execute_kw(MODEL_NAME, 'fields_get', [], {'attributes': ['type', 'digits']})
+    except Exception as e:
+        logger.error(f"ERROR CRÍTICO al leer las sugerencias actuales de '{MODEL_NAME}'.", exc_info=True)
+        exit(1)
+    digits = {name: info['digits'][1] for name, info in field_info.items() if isinstance(info.get('digits'), list)}
+
+    to_create, to_update, to_remove = plan_reconciliation(all_records_data, existing_records, digits)
+    unchanged = len(all_records_data) - len(to_create) - len(to_update)
+    logger.info(
+        f"Diferencias con Odoo ({len(existing_records)} sugerencias actuales): sin cambios {unchanged} | "
+        f"a actualizar {len(to_update)} | nuevas {len(to_create)} | a eliminar {len(to_remove)}"
+    )
 
+    # Primero el historial: si falla no se ha tocado ninguna sugerencia
+    records_to_archive = [to_history(old) for old, _ in to_update] + [to_history(record) for record in to_remove]
+    if records_to_archive:
+        logger.info(f"Archivando {len(records_to_archive)} versiones anteriores en '{HISTORY_MODEL_NAME}'...")
+        try:
+            writer.run('archive', HISTORY_MODEL_NAME, 'create', records_to_archive)
+        except Exception as e:
+            logger.error(f"ERROR CRÍTICO durante el archivado.", exc_info=True)
+            logger.error("Abortando antes de modificar las sugerencias.")
+            exit(1)
+
+    try:
+        if to_update:
+            items = update_items(to_update)
+            logger.info(f"Actualizando {len(to_update)} sugerencias ({len(group_updates(items))} combinaciones de valores distintas)...")
+            # Los bloques se acotan como los de create; dentro de cada uno va un write por combinación de valores
+            writer.run('update', MODEL_NAME, 'write', items, call=write_chunk)
+        if to_create:
+            logger.info(f"Creando {len(to_create)} sugerencias nuevas...")
+            writer.run('create', MODEL_NAME, 'create', to_create)
+        if to_remove:
+            logger.info(f"Borrando {len(to_remove)} sugerencias que ya no están en el CSV...")
+            writer.run('unlink', MODEL_NAME, 'unlink', [record['id'] for record in to_remove])
     except Exception as e:
-        logger.error(f"ERROR CRÍTICO durante el archivado/borrado.", exc_info=True)
-        logger.error("Abortando para prevenir carga duplicada. La tabla de sugerencias puede no estar limpia.")
+        logger.error(f"ERROR CRÍTICO durante la reconciliación", exc_info=True)
+        logger.error("   Las versiones anteriores ya están en el historial; repetir la ejecución completa lo pendiente.")
         exit(1)
 
+    journal.finish()
+    logger.info("¡Reconciliación completada con éxito!")
+    logger.info("\nProceso finalizado.")
+    odoo.report()
+    exit()
+
+if args.run_mode == 'full':
+    logger.info("--- MODO EJECUCIÓN: FULL ---")
+    if journal.is_complete('unlink'):
+        logger.info("El archivado y borrado ya se completaron en la ejecución interrumpida. Se continúa con la carga.")
+    else:
+        logger.info(f"Iniciando archivado de '{MODEL_NAME}' a '{HISTORY_MODEL_NAME}'...")
+        try:
+            existing_ids = odoo.execute_kw(MODEL_NAME, 'search', [[('id', '!=', 0)]])
+
+            if existing_ids:
+                logger.info(f"Se encontraron {len(existing_ids)} registros para archivar.")
+
+                old_records = odoo.execute_kw(MODEL_NAME, 'read', [existing_ids], {'fields': fields_to_archive})
+
+                records_to_create_in_history = [to_history(record) for record in old_records]
+
+                logger.info(f"Creando {len(records_to_create_in_history)} registros en el historial '{HISTORY_MODEL_NAME}'...")
+                writer.run('archive', HISTORY_MODEL_NAME, 'create', records_to_create_in_history)
+                logger.info("¡Registros archivados en historial exitosamente!")
+
+                logger.info(f"Borrando {len(existing_ids)} registros antiguos de '{MODEL_NAME}'...")
+                writer.run('unlink', MODEL_NAME, 'unlink', existing_ids)
+                logger.info("¡Registros antiguos borrados exitosamente!")
+
+            else:
+                logger.info("No se encontraron registros existentes. No se requiere archivado.")
+                # Se registran igualmente como hechos: al reanudar, las sugerencias ya creadas por la
+                # ejecución interrumpida no deben archivarse ni borrarse
+                writer.run('archive', HISTORY_MODEL_NAME, 'create', [])
+                writer.run('unlink', MODEL_NAME, 'unlink', [])
+
+        except Exception as e:
+            logger.error(f"ERROR CRÍTICO durante el archivado/borrado.", exc_info=True)
+            logger.error("Abortando para prevenir carga duplicada. La tabla de sugerencias puede no estar limpia.")
+            exit(1)
+
 else:
     logger.info("--- MODO EJECUCIÓN: PARTIAL ---")
     logger.info("Solo se añadirán los nuevos registros (sin borrar).")
 
-logger.info(f"\n🚀 Enviando {len(all_records_data)} registros nuevos a '{MODEL_NAME}' en una sola llamada...")
+logger.info(f"\n🚀 Enviando {len(all_records_data)} registros nuevos a '{MODEL_NAME}' en bloques...")
 try:
-    new_record_ids = models.execute_kw(
-        ODOO_DB, uid, API_TOKEN,
-        MODEL_NAME,
-        'create',
-        [all_records_data]
-    )
-    
+    new_record_ids = writer.run('create', MODEL_NAME, 'create', all_records_data)
+    journal.finish()
+
     logger.info(f"¡Carga masiva completada con éxito!")
     logger.info(f"   Se crearon {len(new_record_ids)} nuevos registros.")
 
 except Exception as e:
     logger.error(f"ERROR CRÍTICO durante la carga masiva", exc_info=True)
-    logger.error("   La operación falló. Ningún registro fue creado en este lote.")
+    logger.error("   Los bloques ya creados quedan registrados: vuelve a ejecutar con el mismo CSV y modo para enviar solo los pendientes.")
+    odoo.report()
+    exit(1)
     
-logger.info("\nProceso finalizado.")
\ No newline at end of file
+logger.info("\nProceso finalizado.")
+odoo.report()
\ No newline at end of file
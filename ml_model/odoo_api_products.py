@@ -1,70 +1,24 @@
-import xmlrpc.client
+import argparse
 import os
-from botocore.exceptions import ClientError
-import pandas as pd
-import boto3
-import json
-import base64
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from log_config import get_logger
+from odoo_client import get_client
+from odoo_mirror import OdooMirror
 
 logger = get_logger()
 
-def get_secret(secret_name, region_name="eu-north-1"):
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        logger.error(f"Error al obtener el secreto", exc_info=True)
-        raise e 
-    else:
-        if 'SecretString' in get_secret_value_response:
-            secret = get_secret_value_response['SecretString']
-            return json.loads(secret)
-        else:
-            decoded_binary_secret = base64.b64decode(get_secret_value_response['SecretBinary'])
-            return json.loads(decoded_binary_secret)
-
-SECRET_NAME = "prod/wayakit-app" 
-AWS_REGION = "eu-north-1" 
-
-try:
-    secrets = get_secret(SECRET_NAME, AWS_REGION)
-
-    ODOO_URL = secrets.get('ODOO_URL')
-    ODOO_DB = secrets.get('ODOO_DB')
-    ODOO_USERNAME = secrets.get('ODOO_USERNAME')
-    API_TOKEN = secrets.get('ODOO_API_TOKEN')
-
-    if not all([ODOO_URL, ODOO_DB, ODOO_USERNAME, API_TOKEN]):
-        logger.error("ERROR: Faltan secretos esenciales de Odoo recuperados de AWS Secrets Manager.")
-        exit()
-
-    logger.info(f"Secretos cargados exitosamente desde AWS Secrets Manager para DB: {ODOO_DB}")
-
-except Exception as e:
-    logger.error(f"ERROR CRÍTICO: No se pudieron cargar los secretos.", exc_info=True)
-    exit()
+parser = argparse.ArgumentParser(description="Descarga los productos de Wayakit desde Odoo.")
+parser.add_argument('--sync_mode', default='full', choices=['full', 'incremental'],
+                    help="'full' descarga todo el modelo; 'incremental' solo lo modificado desde la última ejecución (espejo local).")
+args = parser.parse_args()
 
 # Nombre del archivo de salida
 OUTPUT_CSV_FILE = 'ml_model/wayakit_products.csv'
 
-# --- 2. AUTENTICACIÓN CON ODOO ---
-try:
-    common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common')
-    uid = common.authenticate(ODOO_DB, ODOO_USERNAME, API_TOKEN, {})
-    models = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/object')
-    logger.info(f"🔑 Autenticación exitosa. User ID (uid): {uid}")
-except Exception as e:
-    logger.error(f"🔥 ERROR de autenticación", exc_info=True)
-    exit()
+# --- 2. CONEXIÓN CON ODOO ---
+# Credenciales y autenticación se resuelven en la primera llamada y se comparten en el proceso
+odoo = get_client()
 
 # --- 3. DEFINICIÓN DE LA CONSULTA ---
 MODEL_NAME = 'product.master'
@@ -110,26 +64,9 @@ fields_to_get = [
 
 logger.info(f"\n🔎 Buscando registros en el modelo '{MODEL_NAME}'...")
 
-# --- 4. EJECUCIÓN DE LA CONSULTA ---
-try:
-    records = models.execute_kw(
-        ODOO_DB, uid, API_TOKEN,
-        MODEL_NAME,
-        'search_read',
-        [domain],
-        {'fields': fields_to_get}
-    )
-    logger.info(f"👍 Éxito. Se encontraron {len(records)} registros.")
-
-except Exception as e:
-    logger.error(f"🔥 ERROR crítico durante la consulta", exc_info=True)
-    exit()
-
-# --- 5. PROCESAMIENTO DE DATOS Y EXPORTACIÓN ---
-if records:
-    # Convertir los registros a un DataFrame de pandas
-    df = pd.DataFrame(records)
-    
+# --- 4. PROCESAMIENTO DE DATOS ---
+def to_output(df):
+    """Convierte un bloque de registros de Odoo en las columnas del CSV."""
     # Odoo devuelve los campos Many2one como una lista [id, 'nombre'].
     # Esta función extrae solo el nombre.
     df['type_of_product_id'] = df['type_of_product_id'].apply(lambda x: x[1] if isinstance(x, list) and len(x) > 1 else None)
@@ -173,16 +110,30 @@ if records:
     ]
 
     # Reordenar el DataFrame para que coincida con el orden solicitado
-    df_final = df_renamed[final_columns_order]
-    
-    # Guardar el DataFrame final en un archivo CSV
-    df_final.to_csv(OUTPUT_CSV_FILE, index=False, encoding='utf-8-sig')
+    return df_renamed[final_columns_order]
+
+# --- 5. EJECUCIÓN DE LA CONSULTA Y EXPORTACIÓN ---
+# Los registros llegan por páginas en paralelo y cada bloque se escribe en el CSV según llega;
+# en modo incremental solo se descargan los cambios y el CSV se regenera desde el espejo local
+try:
+    if args.sync_mode == 'incremental':
+        rows, preview = OdooMirror(odoo, MODEL_NAME, domain, fields_to_get).export_csv(OUTPUT_CSV_FILE, transform=to_output)
+    else:
+        rows, preview = odoo.export_csv(MODEL_NAME, domain, fields_to_get, OUTPUT_CSV_FILE, transform=to_output)
+    logger.info(f"👍 Éxito. Se encontraron {rows} registros.")
+
+except Exception as e:
+    logger.error(f"🔥 ERROR crítico durante la consulta", exc_info=True)
+    exit(1)
+
+if rows:
     logger.info(f"\n✅ ¡Éxito! El archivo '{OUTPUT_CSV_FILE}' ha sido creado con el resultado final.")
 
     logger.info("\n📊 Vista previa de las primeras 5 filas del resultado:")
-    logger.info(f"\n{df_final.head()}")
+    logger.info(f"\n{preview}")
     
 else:
     logger.warning("🤷 No se encontraron registros que coincidan con los criterios de filtrado.")
 
-logger.info("\nProceso completado.")
\ No newline at end of file
+logger.info("\nProceso completado.")
+odoo.report()
\ No newline at end of file
@@ -0,0 +1,221 @@
+# odoo_bulk.py
+# Escrituras masivas a Odoo en bloques acotados, en paralelo y reanudables:
+#   from odoo_bulk import BulkJournal, BulkWriter, payload_fingerprint
+#   journal = BulkJournal('ml_model/odoo_upload_journal.sqlite3', payload_fingerprint(run_mode, records))
+#   ids = BulkWriter(get_client(), journal).run('create', 'product.price.suggestion', 'create', records)
+#   journal.finish()
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from odoo_client import OdooError
+from log_config import get_logger
+
+logger = get_logger()
+
+ODOO_BULK_JOURNAL = 'ml_model/odoo_upload_journal.sqlite3'
+ODOO_BULK_MAX_RECORDS = 500          # records (or ids) per call
+ODOO_BULK_MAX_BYTES = 900_000        # XML-RPC body per call, under the 1 MiB nginx puts in front of Odoo by default
+ODOO_BULK_WORKERS = 3                # calls in flight at once (threads: the time is spent waiting on Odoo)
+ODOO_BULK_JOURNAL_MAX_AGE_HOURS = 24 # an older interrupted upload is not resumed: Odoo has moved on since
+
+
+def payload_fingerprint(*values):
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def chunk_payload(items, max_records=None, max_bytes=None):
+    """Splits `items` into consecutive chunks of at most `max_records` items and about `max_bytes` of XML-RPC."""
+    max_records = max_records or ODOO_BULK_MAX_RECORDS
+    max_bytes = max_bytes or ODOO_BULK_MAX_BYTES
+    chunks, chunk, size = [], [], 0
+    for item in items:
+        item_size = len(xmlrpc.client.dumps((item,), allow_none=True))
+        if chunk and (len(chunk) >= max_records or size + item_size > max_bytes):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(item)
+        size += item_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+class BulkJournal:
+    """
+    Durable record of the chunks an upload run has already written, so a rerun with the same
+    payload (same `fingerprint`) skips them. Jobs are named steps of the run ('archive', 'create'...):
+    a finished job is skipped whole; an unfinished one resumes at its pending chunks as long as
+    its payload is the same (otherwise it starts over). finish() closes the run, so the next one
+    starts from scratch.
+    """
+
+    def __init__(self, path=None, fingerprint=''):
+        self.path = path or ODOO_BULK_JOURNAL
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                name TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                chunks INTEGER NOT NULL,
+                completed_at REAL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                name TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                result_json TEXT NOT NULL,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (name, chunk_index)
+            )
+        """)
+        self.conn.commit()
+        if self._can_resume(fingerprint):
+            done = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            logger.info(f"[BulkJournal] Resuming the interrupted upload in '{self.path}' ({done} chunks already written).")
+        else:
+            with self.conn:
+                self.conn.execute("DELETE FROM chunks")
+                self.conn.execute("DELETE FROM jobs")
+                self.conn.execute("DELETE FROM meta")
+                self.conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                                      [('status', 'running'), ('fingerprint', fingerprint), ('started_at', str(time.time()))])
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _can_resume(self, fingerprint):
+        if self._get_meta('status') != 'running' or self._get_meta('fingerprint') != fingerprint:
+            return False
+        age_hours = (time.time() - float(self._get_meta('started_at') or 0)) / 3600
+        if age_hours > ODOO_BULK_JOURNAL_MAX_AGE_HOURS:
+            logger.warning(f"[BulkJournal] The interrupted upload is {age_hours:.0f}h old (max {ODOO_BULK_JOURNAL_MAX_AGE_HOURS}h). Starting over.")
+            return False
+        return True
+
+    def is_complete(self, name):
+        with self._lock:
+            row = self.conn.execute("SELECT completed_at FROM jobs WHERE name = ?", (name,)).fetchone()
+        return bool(row and row[0])
+
+    def start_job(self, name, payload, chunks):
+        """{chunk_index: result} of the chunks already written for this job and payload."""
+        with self._lock:
+            row = self.conn.execute("SELECT payload, chunks FROM jobs WHERE name = ?", (name,)).fetchone()
+            if row == (payload, chunks):
+                return {index: json.loads(result) for index, result in
+                        self.conn.execute("SELECT chunk_index, result_json FROM chunks WHERE name = ?", (name,))}
+            with self.conn:
+                self.conn.execute("DELETE FROM chunks WHERE name = ?", (name,))
+                self.conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, NULL)", (name, payload, chunks))
+            return {}
+
+    def mark_chunk(self, name, index, result):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", (name, index, json.dumps(result), time.time()))
+
+    def complete_job(self, name):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE jobs SET completed_at = ? WHERE name = ?", (time.time(), name))
+
+    def job_results(self, name):
+        with self._lock:
+            return [json.loads(result) for (result,) in
+                    self.conn.execute("SELECT result_json FROM chunks WHERE name = ? ORDER BY chunk_index", (name,))]
+
+    def finish(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM jobs")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('status', 'completed')")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class BulkWriter:
+    """
+    Sends large create/write/unlink payloads as size-bounded chunks over `workers` parallel
+    connections (OdooClient keeps one per thread), each chunk with the retries of execute_kw.
+    Written chunks go to the journal as they finish, so after a failure a rerun only sends the rest.
+    A chunk whose create timed out after reaching Odoo may be sent again on the rerun.
+    """
+
+    def __init__(self, client, journal, workers=None, max_records=None, max_bytes=None):
+        self.client = client
+        self.journal = journal
+        self.workers = workers or ODOO_BULK_WORKERS
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+
+    def run(self, name, model, method, items, make_args=None, max_records=None, call=None):
+        """
+        Runs job `name`: execute_kw(model, method, make_args(chunk)) for every chunk of `items`
+        (default args: [chunk], as create and unlink take), or call(chunk) when a chunk takes several
+        calls (e.g. one write per set of values). Returns the list results (created ids) concatenated
+        in the order of `items`, including those of chunks written by an earlier run.
+        """
+        make_args = make_args or (lambda chunk: [chunk])
+        call = call or (lambda chunk: self.client.execute_kw(model, method, make_args(chunk)))
+        if self.journal.is_complete(name):
+            logger.info(f"[BulkWriter] {name}: already completed by the interrupted run. Skipped.")
+            return self._flatten(self.journal.job_results(name))
+        chunks = chunk_payload(items, max_records or self.max_records, self.max_bytes)
+        results = self.journal.start_job(name, payload_fingerprint(model, method, items), len(chunks))
+        if not chunks:
+            # Un paso sin nada que enviar también queda hecho: al reanudar no se vuelve a calcular
+            self.journal.complete_job(name)
+            return []
+        if results:
+            logger.info(f"[BulkWriter] {name}: resuming, {len(results)}/{len(chunks)} chunks already written.")
+        pending = [index for index in range(len(chunks)) if index not in results]
+        sent, failures = 0, []
+        start = time.perf_counter()
+
+        def send(index):
+            result = call(chunks[index])
+            self.journal.mark_chunk(name, index, result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"odoo-{name}") as executor:
+            futures = {executor.submit(send, index): index for index in pending}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                    sent += len(chunks[index])
+                except Exception as e:
+                    failures.append(index)
+                    logger.error(f"[BulkWriter] {name}: chunk {index + 1}/{len(chunks)} ({len(chunks[index])} items) failed: {e}")
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"[BulkWriter] {name}: {sent} items sent to {model}.{method} in {len(pending) - len(failures)} chunks "
+            f"({elapsed:.1f}s, {sent / elapsed if elapsed else 0:.0f} records/s) | "
+            f"already written: {len(chunks) - len(pending)} chunks | failed: {len(failures)}"
+        )
+        if failures:
+            raise OdooError(f"{name}: {len(failures)} of {len(chunks)} chunks failed. Rerun to send only the pending ones.")
+        self.journal.complete_job(name)
+        return self._flatten(results[index] for index in range(len(chunks)))
+
+    @staticmethod
+    def _flatten(results):
+        flat = []
+        for result in results:
+            if isinstance(result, list):
+                flat.extend(result)
+        return flat
@@ -0,0 +1,315 @@
+# odoo_client.py
+# Cliente XML-RPC de Odoo compartido por los scripts de ml_model/ y scraper/:
+#   from odoo_client import get_client
+#   odoo = get_client()
+#   records = odoo.search_read('product.master', domain, fields)
+#   rows, preview = odoo.export_csv('competitor.product', [], fields, 'out.csv', transform=clean)
+import base64
+import http.client
+import json
+import os
+import random
+import socket
+import threading
+import time
+import xmlrpc.client
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from log_config import get_logger
+
+logger = get_logger()
+
+SECRET_NAME = "prod/wayakit-app"
+AWS_REGION = "eu-north-1"
+
+ODOO_TIMEOUT = 120               # seconds per XML-RPC call
+ODOO_MAX_RETRIES = 4             # attempts on network errors and 429/5xx responses
+ODOO_BACKOFF_BASE_SECONDS = 2    # jittered exponential backoff: base * 2^attempt, halved at random...
+ODOO_BACKOFF_MAX_SECONDS = 30    # ...up to this
+ODOO_PAGE_SIZE = 5000            # records per search_read page when streaming (iter_pages/export_csv)
+ODOO_READ_WORKERS = 4            # pages requested at once (worker processes: parsing XML-RPC is CPU-bound)
+
+RETRYABLE_ERRORS = (ConnectionError, socket.timeout, http.client.HTTPException, OSError)
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+# Una escritura solo se repite si Odoo no llegó a procesarla (conexión rechazada, 429 o 503)
+UNPROCESSED_STATUS = (429, 503)
+READ_METHODS = ('search', 'search_read', 'read', 'search_count', 'fields_get', 'read_group', 'name_get', 'name_search')
+# Repetir un write deja los mismos valores: se reintenta igual que una lectura
+IDEMPOTENT_METHODS = READ_METHODS + ('write',)
+
+_secrets = {}
+_secrets_lock = threading.Lock()
+
+
+class OdooError(Exception):
+    """Missing credentials, failed authentication or no response from Odoo after the retries."""
+
+
+def get_secret(secret_name=SECRET_NAME, region_name=AWS_REGION):
+    """Secret JSON from AWS Secrets Manager, fetched once per process."""
+    with _secrets_lock:
+        if (secret_name, region_name) in _secrets:
+            return _secrets[(secret_name, region_name)]
+        import boto3
+        client = boto3.session.Session().client(service_name='secretsmanager', region_name=region_name)
+        response = client.get_secret_value(SecretId=secret_name)
+        if 'SecretString' in response:
+            secret = json.loads(response['SecretString'])
+        else:
+            secret = json.loads(base64.b64decode(response['SecretBinary']))
+        _secrets[(secret_name, region_name)] = secret
+        return secret
+
+
+class TimeoutTransport(xmlrpc.client.Transport):
+    """Keep-alive XML-RPC transport (one persistent HTTP/1.1 connection) with a socket timeout."""
+
+    def __init__(self, timeout, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+class SafeTimeoutTransport(xmlrpc.client.SafeTransport):
+    def __init__(self, timeout, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+class OdooClient:
+    """
+    XML-RPC client for Odoo. Credentials come from Secrets Manager (once per process), the user is
+    authenticated on the first call and the uid is reused. Each thread keeps its own keep-alive
+    connection per endpoint. execute_kw() retries network errors and 429/5xx with jittered
+    backoff (server Faults are raised right away; writes are only retried when Odoo never got them)
+    and times every call; report() logs the totals.
+    """
+
+    def __init__(self, url=None, db=None, username=None, token=None, timeout=None, max_retries=None):
+        self.url, self.db, self.username, self.token = url, db, username, token
+        self.timeout = timeout or ODOO_TIMEOUT
+        self.max_retries = max_retries or ODOO_MAX_RETRIES
+        self.stats = Counter()
+        self._uid = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _load_credentials(self):
+        if all([self.url, self.db, self.username, self.token]):
+            return
+        try:
+            secrets = get_secret()
+        except Exception as e:
+            raise OdooError(f"Could not load the Odoo secrets from AWS Secrets Manager: {e}") from e
+        self.url = self.url or secrets.get('ODOO_URL')
+        self.db = self.db or secrets.get('ODOO_DB')
+        self.username = self.username or secrets.get('ODOO_USERNAME')
+        self.token = self.token or secrets.get('ODOO_API_TOKEN')
+        missing = [name for name, value in {'URL': self.url, 'DB': self.db, 'Username': self.username, 'Token': self.token}.items() if not value]
+        if missing:
+            raise OdooError(f"Missing essential Odoo secrets: {', '.join(missing)}")
+        logger.info(f"[Odoo] Secrets loaded for DB: {self.db}")
+
+    def _proxy(self, endpoint):
+        proxies = self._local.__dict__.setdefault('proxies', {})
+        if endpoint not in proxies:
+            transport_class = SafeTimeoutTransport if self.url.startswith('https') else TimeoutTransport
+            proxies[endpoint] = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/{endpoint}', transport=transport_class(self.timeout))
+        return proxies[endpoint]
+
+    def _drop_proxy(self, endpoint):
+        # Tras un error de red la conexión puede quedar a medias: se abre una nueva en el siguiente intento
+        proxy = self._local.__dict__.get('proxies', {}).pop(endpoint, None)
+        if proxy is not None:
+            proxy('close')()
+
+    def _backoff(self, attempt):
+        delay = min(ODOO_BACKOFF_MAX_SECONDS, ODOO_BACKOFF_BASE_SECONDS * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _call(self, endpoint, label, method, *args, idempotent=True):
+        for attempt in range(self.max_retries):
+            start = time.perf_counter()
+            try:
+                result = getattr(self._proxy(endpoint), method)(*args)
+            except xmlrpc.client.Fault:
+                with self._lock:
+                    self.stats[(label, 'errors')] += 1
+                raise
+            except xmlrpc.client.ProtocolError as e:
+                if e.errcode not in (RETRYABLE_STATUS if idempotent else UNPROCESSED_STATUS):
+                    with self._lock:
+                        self.stats[(label, 'errors')] += 1
+                    raise OdooError(f"{label}: HTTP {e.errcode} {e.errmsg}") from e
+                reason = f"HTTP {e.errcode}"
+            except RETRYABLE_ERRORS as e:
+                if not idempotent and not isinstance(e, ConnectionRefusedError):
+                    with self._lock:
+                        self.stats[(label, 'errors')] += 1
+                    raise OdooError(f"{label}: {type(e).__name__} after sending the request, not retried: {e}") from e
+                reason = type(e).__name__
+            else:
+                with self._lock:
+                    self.stats[(label, 'calls')] += 1
+                    self.stats[(label, 'seconds')] += time.perf_counter() - start
+                return result
+            self._drop_proxy(endpoint)
+            if attempt == self.max_retries - 1:
+                break
+            delay = self._backoff(attempt)
+            with self._lock:
+                self.stats[(label, 'retries')] += 1
+            logger.warning(f"[Odoo] {label}: {reason}. Retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+        with self._lock:
+            self.stats[(label, 'errors')] += 1
+        raise OdooError(f"{label}: no response after {self.max_retries} attempts")
+
+    @property
+    def uid(self):
+        """User id, authenticating on first use (once per process)."""
+        with self._lock:
+            if self._uid is not None:
+                return self._uid
+        self._load_credentials()
+        uid = self._call('common', 'authenticate', 'authenticate', self.db, self.username, self.token, {})
+        if not uid:
+            raise OdooError(f"Authentication failed for '{self.username}' on DB '{self.db}'.")
+        with self._lock:
+            if self._uid is None:
+                self._uid = uid
+                logger.info(f"[Odoo] Authentication successful. User ID (uid): {uid}")
+            return self._uid
+
+    def version(self):
+        self._load_credentials()
+        return self._call('common', 'version', 'version')
+
+    def execute_kw(self, model, method, args, kwargs=None):
+        """models.execute_kw(db, uid, token, model, method, args, kwargs), with retries and timing."""
+        uid = self.uid
+        start = time.perf_counter()
+        result = self._call('object', f"{model}.{method}", 'execute_kw', self.db, uid, self.token, model, method, args, kwargs or {},
+                            idempotent=method in IDEMPOTENT_METHODS)
+        logger.debug(f"[Odoo] {model}.{method}: {time.perf_counter() - start:.2f}s")
+        return result
+
+    def search_read(self, model, domain, fields, **kwargs):
+        return self.execute_kw(model, 'search_read', [domain], {'fields': fields, **kwargs})
+
+    def search_count(self, model, domain):
+        return self.execute_kw(model, 'search_count', [domain])
+
+    def iter_pages(self, model, domain, fields, page_size=None, workers=None, order='id'):
+        """
+        search_read in limit/offset pages requested `workers` at a time, yielded in order as lists of
+        records; at most 2 * workers pages are held in memory. The order (id by default) keeps the
+        pages from overlapping. Pages are fetched by worker processes: unmarshalling XML-RPC is pure
+        Python, so threads would queue on the GIL, while a pickled page comes back almost for free.
+        """
+        page_size = page_size or ODOO_PAGE_SIZE
+        workers = workers or ODOO_READ_WORKERS
+        total = self.search_count(model, domain)
+        logger.info(f"[Odoo] {model}: {total} records in pages of {page_size} ({workers} at a time).")
+        offsets = iter(range(0, total, page_size))
+        label = f"{model}.search_read[page]"
+        initargs = (self.url, self.db, self.username, self.token, self.uid, self.timeout, self.max_retries)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_page_worker, initargs=initargs) as executor:
+            def request(offset):
+                return executor.submit(_fetch_page, model, domain, fields, offset, page_size, order)
+
+            in_flight = deque(request(offset) for _, offset in zip(range(workers * 2), offsets))
+            while in_flight:
+                page, seconds = in_flight.popleft().result()
+                with self._lock:
+                    self.stats[(label, 'calls')] += 1
+                    self.stats[(label, 'seconds')] += seconds
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    in_flight.append(request(next_offset))
+                yield page
+
+    def iter_frames(self, model, domain, fields, **kwargs):
+        """iter_pages() as pandas DataFrame chunks."""
+        import pandas as pd
+        for page in self.iter_pages(model, domain, fields, **kwargs):
+            if page:
+                yield pd.DataFrame(page)
+
+    def export_csv(self, model, domain, fields, path, transform=None, **kwargs):
+        """
+        Streams a search_read to a CSV chunk by chunk (`transform` turns each raw DataFrame into the
+        output columns) without holding the whole model in memory. Returns (rows written, first
+        chunk for a preview). The chunks go to `path`.tmp, which only replaces `path` once every
+        page arrived: a failed export leaves the previous file untouched. Nothing is written when
+        there are no records.
+        """
+        rows, preview, f = 0, None, None
+        tmp_path = path + '.tmp'
+        try:
+            for frame in self.iter_frames(model, domain, fields, **kwargs):
+                if transform:
+                    frame = transform(frame)
+                first = f is None
+                if first:
+                    f = open(tmp_path, 'w', newline='', encoding='utf-8-sig')
+                    preview = frame.head()
+                frame.to_csv(f, header=first, index=False)
+                rows += len(frame)
+        except BaseException:
+            if f is not None:
+                f.close()
+                os.remove(tmp_path)
+            raise
+        if f is not None:
+            f.close()
+            os.replace(tmp_path, path)
+        return rows, preview
+
+    def report(self):
+        labels = sorted({label for label, _ in self.stats})
+        for label in labels:
+            calls = self.stats[(label, 'calls')]
+            logger.info(
+                f"[Odoo] {label}: {calls} calls ({self.stats[(label, 'seconds')] / calls if calls else 0:.2f}s avg, "
+                f"{self.stats[(label, 'seconds')]:.1f}s total) | retries: {self.stats[(label, 'retries')]} | "
+                f"errors: {self.stats[(label, 'errors')]}"
+            )
+
+
+# Cliente propio de cada proceso que descarga páginas (iter_pages)
+_page_client = None
+
+
+def _init_page_worker(url, db, username, token, uid, timeout, max_retries):
+    global _page_client
+    _page_client = OdooClient(url, db, username, token, timeout, max_retries)
+    _page_client._uid = uid
+
+
+def _fetch_page(model, domain, fields, offset, limit, order):
+    start = time.perf_counter()
+    page = _page_client.search_read(model, domain, fields, offset=offset, limit=limit, order=order)
+    return page, time.perf_counter() - start
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The OdooClient shared by every script and thread of the process."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OdooClient()
+        return _client
@@ -0,0 +1,158 @@
+# odoo_mirror.py
+# Espejo local (Parquet) de modelos de Odoo para la sincronización incremental:
+#   from odoo_mirror import OdooMirror
+#   mirror = OdooMirror(get_client(), 'product.master', domain, fields)
+#   rows, preview = mirror.export_csv('ml_model/wayakit_products.csv', transform=to_output)
+import json
+import os
+import time
+from odoo_client import ODOO_PAGE_SIZE
+from log_config import get_logger
+
+logger = get_logger()
+
+ODOO_MIRROR_DIR = 'ml_model/odoo_mirror'   # one <model>.parquet + <model>.json (state) per model
+WATERMARK_FIELD = 'write_date'
+
+
+def encode_records(records, json_columns):
+    """
+    Odoo values as Parquet-friendly columns: relational values ([id, 'name'], id lists) become JSON
+    text (their columns are added to `json_columns`) and False (Odoo's "empty") becomes null.
+    """
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, (list, dict)):
+                record[key] = json.dumps(value, ensure_ascii=False)
+                json_columns.add(key)
+            elif value is False:
+                record[key] = None
+    return records
+
+
+def decode_frame(frame, json_columns):
+    """Inverse of encode_records(): the same values search_read returns."""
+    import pandas as pd
+    for column in frame.columns:
+        if column in json_columns:
+            frame[column] = frame[column].map(lambda value: json.loads(value) if isinstance(value, str) else False)
+        elif not pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = frame[column].astype(object).where(frame[column].notna(), False)
+    return frame
+
+
+class OdooMirror:
+    """
+    Local columnar copy of the records of one Odoo model that match a domain. sync() only downloads
+    the records whose write_date is at or after the stored watermark (records written in the same
+    second as the last sync are fetched again rather than missed), drops the ids Odoo no longer
+    returns for the domain (deleted, or filtered out) and reads the ids the mirror is missing
+    (records that entered the domain without being written, e.g. when their order was confirmed).
+    Changing the fields or the domain rebuilds the mirror from scratch.
+    """
+
+    def __init__(self, client, model, domain, fields, directory=None):
+        self.client = client
+        self.model = model
+        self.domain = list(domain)
+        self.fields = list(fields)
+        self.read_fields = self.fields + ([WATERMARK_FIELD] if WATERMARK_FIELD not in self.fields else [])
+        directory = directory or ODOO_MIRROR_DIR
+        self.data_path = os.path.join(directory, f"{model}.parquet")
+        self.state_path = os.path.join(directory, f"{model}.json")
+
+    def _signature(self):
+        # Las tuplas del dominio se comparan como listas, igual que quedan en el JSON
+        return {'fields': self.fields, 'domain': json.loads(json.dumps(self.domain))}
+
+    def _load(self):
+        """(stored frame still encoded, state), or (None, None) when there is no usable mirror."""
+        if not (os.path.exists(self.state_path) and os.path.exists(self.data_path)):
+            logger.info(f"[OdooMirror] {self.model}: no local mirror yet. Downloading every record.")
+            return None, None
+        with open(self.state_path, encoding='utf-8') as f:
+            state = json.load(f)
+        if {key: state.get(key) for key in ('fields', 'domain')} != self._signature():
+            logger.info(f"[OdooMirror] {self.model}: fields or domain changed. Rebuilding the mirror.")
+            return None, None
+        import pandas as pd
+        return pd.read_parquet(self.data_path), state
+
+    def _fetch(self, domain):
+        records = []
+        for page in self.client.iter_pages(self.model, domain, self.read_fields):
+            records.extend(page)
+        return records
+
+    def _read(self, ids):
+        records = []
+        for start in range(0, len(ids), ODOO_PAGE_SIZE):
+            records.extend(self.client.execute_kw(self.model, 'read', [ids[start:start + ODOO_PAGE_SIZE]], {'fields': self.read_fields}))
+        return records
+
+    def _save(self, frame, json_columns):
+        os.makedirs(os.path.dirname(self.data_path) or '.', exist_ok=True)
+        # Se escribe a un temporal y se renombra: un corte a medias nunca deja un espejo corrupto
+        frame.to_parquet(self.data_path + '.tmp', index=False)
+        os.replace(self.data_path + '.tmp', self.data_path)
+        watermarks = frame[WATERMARK_FIELD].dropna() if WATERMARK_FIELD in frame.columns else []
+        state = {
+            **self._signature(),
+            'json_columns': sorted(json_columns),
+            'watermark': max(watermarks) if len(watermarks) else None,
+            'records': len(frame),
+            'synced_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with open(self.state_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, ensure_ascii=False)
+        os.replace(self.state_path + '.tmp', self.state_path)
+        return state
+
+    def sync(self):
+        """Brings the mirror up to date and returns its records as a DataFrame sorted by id (id + fields, as search_read)."""
+        import pandas as pd
+        start = time.perf_counter()
+        stored, state = self._load()
+        if stored is None:
+            json_columns = set()
+            frame = pd.DataFrame(encode_records(self._fetch(self.domain), json_columns))
+            summary = f"{len(frame)} downloaded"
+        else:
+            json_columns = set(state.get('json_columns', []))
+            current_ids = set(self.client.execute_kw(self.model, 'search', [self.domain]))
+            stored_ids = set(stored['id'])
+            changed = self._fetch(self.domain + [[WATERMARK_FIELD, '>=', state['watermark']]]) if state.get('watermark') else []
+            changed_ids = {record['id'] for record in changed}
+            missing = sorted(current_ids - stored_ids - changed_ids)
+            removed = stored_ids - current_ids
+            incoming = encode_records(changed + self._read(missing), json_columns)
+            frame = stored[~stored['id'].isin(removed | changed_ids)]
+            if incoming:
+                frame = pd.concat([frame, pd.DataFrame(incoming)], ignore_index=True)
+            new = len(changed_ids - stored_ids) + len(missing)
+            summary = f"{len(changed_ids & stored_ids)} updated, {new} new, {len(removed)} removed"
+        if not frame.empty:
+            frame = frame.sort_values('id', ignore_index=True)
+        state = self._save(frame, json_columns)
+        logger.info(
+            f"[OdooMirror] {self.model}: {summary} | {state['records']} records in the mirror | "
+            f"watermark {state['watermark']} | {time.perf_counter() - start:.1f}s"
+        )
+        if frame.empty:
+            return frame
+        return decode_frame(frame[['id'] + [field for field in self.fields if field in frame.columns]].copy(), json_columns)
+
+    def export_csv(self, path, transform=None):
+        """
+        sync() and regenerates the CSV from the whole mirror (`transform` turns the raw records into
+        the output columns). Same return as OdooClient.export_csv: (rows written, first rows for a preview).
+        Like it, the CSV is written to `path`.tmp and only then replaces the previous one.
+        """
+        frame = self.sync()
+        if frame.empty:
+            return 0, None
+        if transform:
+            frame = transform(frame)
+        frame.to_csv(path + '.tmp', index=False, encoding='utf-8-sig')
+        os.replace(path + '.tmp', path)
+        return len(frame), frame.head()
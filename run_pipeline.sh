@@ -97,7 +97,7 @@ if [ "$STAGE" == "1" ]; then
     log_message "Entorno Conda activado."
 
     log_message "--- PASO 1: Preparando lista de scraping ---"
-    run_command "python ml_model/odoo_api_products.py" "1a. Obtener TODOS los productos de Odoo (con fecha)" || exit 1
+    run_command "python ml_model/odoo_api_products.py --sync_mode incremental" "1a. Obtener TODOS los productos de Odoo (con fecha)" || exit 1
 
     if [ "$IS_FULL_RUN" == "true" ]; then
         log_message "Modo: EJECUCIÓN COMPLETA (Preparación)"
@@ -168,12 +168,12 @@ if [ "$STAGE" == "2" ]; then
             rm "$COMPETITORS_FILE"
         fi
         
-        run_command "timeout 30h python scraper/main.py --analysis_file '$ANALYSIS_FILE_TO_USE' --output_mode '$SCRAPER_OUTPUT_MODE' --output_file '$COMPETITORS_FILE'" "2. Ejecutar scraping (Modo: $SCRAPER_OUTPUT_MODE)"
-        run_command "python ml_model/odoo_api_cotizations.py" "3a. Obtener cotizaciones de Odoo"
-        run_command "python ml_model/odoo_api_competitor_products.py" "3b. Obtener productos de competidores de Odoo"
+        run_command "timeout 30h python scraper/main.py --analysis_file '$ANALYSIS_FILE_TO_USE' --output_mode '$SCRAPER_OUTPUT_MODE' --output_file '$COMPETITORS_FILE' --resume" "2. Ejecutar scraping (Modo: $SCRAPER_OUTPUT_MODE)"
+        run_command "python ml_model/odoo_api_cotizations.py --sync_mode incremental" "3a. Obtener cotizaciones de Odoo"
+        run_command "python ml_model/odoo_api_competitor_products.py --sync_mode incremental" "3b. Obtener productos de competidores de Odoo"
         
         if [ ! -f "$ODOO_PRODUCTS_FILE" ]; then
-            run_command "python ml_model/odoo_api_products.py" "4. (Re)Obtener productos de Odoo"
+            run_command "python ml_model/odoo_api_products.py --sync_mode incremental" "4. (Re)Obtener productos de Odoo"
         fi
 
         # --- CAMBIO: Añadido 'timeout 1h' (1 hora) a los scripts de ML ---
@@ -181,7 +181,7 @@ if [ "$STAGE" == "2" ]; then
         run_command "timeout 1h python ml_model/1b_preprocess_data.py --run_mode full" "6. Preparar datos Wayakit (Modo: full)"
         run_command "timeout 1h python ml_model/2_train_models.py" "7. Entrenar modelos ML"
         run_command "timeout 1h python ml_model/3_predicted_prices.py" "8. Generar predicciones"
-        run_command "timeout 1h python ml_model/odoo_api_price_suggestion.py --run_mode full" "9. Subir sugerencias a Odoo (Modo: full)"
+        run_command "timeout 1h python ml_model/odoo_api_price_suggestion.py --run_mode reconcile" "9. Subir sugerencias a Odoo (Modo: reconcile)"
 
     # --- FIN: Flujo de EJECUCIÓN COMPLETA (Etapa 2) ---
 
@@ -202,12 +202,12 @@ if [ "$STAGE" == "2" ]; then
             SCRAPER_OUTPUT_MODE="append"
             # --- CAMBIO: Añadido 'timeout 4h' (4 horas) al scraping parcial ---
             run_command "python scraper/odoo_api_connection_products.py --input_odoo_products_file '$NEW_PRODUCTS_TEMP_FILE' --output_analysis_file '$ANALYSIS_FILE_PARTIAL'" "1c. Generar lista PARCIAL de scraping (post-revisión)"
-            run_command "timeout 4h python scraper/main.py --analysis_file '$ANALYSIS_FILE_TO_USE' --output_mode '$SCRAPER_OUTPUT_MODE' --output_file '$COMPETITORS_FILE'" "2. Ejecutar scraping (Modo: $SCRAPER_OUTPUT_MODE)"
-            run_command "python ml_model/odoo_api_cotizations.py" "3a. Obtener cotizaciones de Odoo"
-            run_command "python ml_model/odoo_api_competitor_products.py" "3b. Obtener productos de competidores de Odoo"
+            run_command "timeout 4h python scraper/main.py --analysis_file '$ANALYSIS_FILE_TO_USE' --output_mode '$SCRAPER_OUTPUT_MODE' --output_file '$COMPETITORS_FILE' --resume" "2. Ejecutar scraping (Modo: $SCRAPER_OUTPUT_MODE)"
+            run_command "python ml_model/odoo_api_cotizations.py --sync_mode incremental" "3a. Obtener cotizaciones de Odoo"
+            run_command "python ml_model/odoo_api_competitor_products.py --sync_mode incremental" "3b. Obtener productos de competidores de Odoo"
 
             if [ ! -f "$ODOO_PRODUCTS_FILE" ]; then
-                run_command "python ml_model/odoo_api_products.py" "4. (Re)Obtener productos de Odoo"
+                run_command "python ml_model/odoo_api_products.py --sync_mode incremental" "4. (Re)Obtener productos de Odoo"
             fi
             
             # --- CAMBIO: Añadido 'timeout 1h' (1 hora) a los scripts de ML ---
@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from urllib.parse import urlsplit
+from services.page_cache import normalize_url
+
+
+def origin_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def page_key(url):
+    """Path + query of the normalized URL: the same key on the live host and on the replay server."""
+    parts = urlsplit(normalize_url(url))
+    return parts.path + (f"?{parts.query}" if parts.query else '')
+
+
+class FixtureStore:
+    """
+    Recorded pages for the offline benchmark, one folder per site plus `manifest.json`:
+    {"sites": {site: {"origin", "pages": {key: file}, "redirects": {key: key}}}, "tasks": [...]}.
+    Pages are the rendered HTML as the scrapers saw it, gzip-compressed.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'sites': {}, 'tasks': []}
+
+    @property
+    def tasks(self):
+        return self.manifest['tasks']
+
+    def sites(self):
+        return list(self.manifest['sites'])
+
+    def origin(self, site):
+        return self.manifest['sites'][site]['origin']
+
+    def register_site(self, site, base_url):
+        self.manifest['sites'].setdefault(site, {'origin': origin_of(base_url), 'pages': {}, 'redirects': {}})
+
+    def site_for_url(self, url):
+        host = urlsplit(url).netloc.lower()
+        for site, entry in self.manifest['sites'].items():
+            if urlsplit(entry['origin']).netloc.lower() == host:
+                return site
+        return None
+
+    def save_page(self, url, html):
+        site = self.site_for_url(url)
+        if site is None or not html:
+            return False
+        key = page_key(url)
+        filename = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20] + '.html.gz'
+        site_dir = os.path.join(self.directory, site)
+        os.makedirs(site_dir, exist_ok=True)
+        with gzip.open(os.path.join(site_dir, filename), 'wt', encoding='utf-8') as f:
+            f.write(html)
+        self.manifest['sites'][site]['pages'][key] = filename
+        return True
+
+    def save_redirect(self, requested_url, final_url):
+        site = self.site_for_url(requested_url)
+        if site is None or self.site_for_url(final_url) != site:
+            return
+        requested_key, final_key = page_key(requested_url), page_key(final_url)
+        if requested_key != final_key:
+            self.manifest['sites'][site]['redirects'][requested_key] = final_key
+
+    def add_task(self, task):
+        if task not in self.manifest['tasks']:
+            self.manifest['tasks'].append(task)
+
+    def load_page(self, site, key):
+        """Returns (html, None), (None, redirect_key) or (None, None) when the page was not recorded."""
+        entry = self.manifest['sites'][site]
+        if key in entry['pages']:
+            with gzip.open(os.path.join(self.directory, site, entry['pages'][key]), 'rt', encoding='utf-8') as f:
+                return f.read(), None
+        if key in entry['redirects']:
+            return None, entry['redirects'][key]
+        return None, None
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest['recorded_at'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
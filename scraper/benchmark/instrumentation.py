@@ -0,0 +1,141 @@
+import threading
+import time
+from concurrent.futures import Future
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from services.driver_pool import DriverPool, PooledDriver
+from utils import parse_count_string, parse_wipes_units
+
+
+class PhaseTimer:
+    """Accumulated wall time and call count per named phase."""
+
+    def __init__(self):
+        self.seconds = Counter()
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, elapsed):
+        with self._lock:
+            self.seconds[name] += elapsed
+            self.calls[name] += 1
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def wrap(self, name, func):
+        @wraps(func)
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return timed
+
+
+class StubRelevanceAgent:
+    """
+    Stand-in for RelevanceAgent: accepts every product after `latency_ms` (to simulate the
+    Gemini round trip) and counts wipes units with the local parser. No API key needed.
+    """
+
+    def __init__(self, timer, latency_ms=0):
+        self.timer = timer
+        self.latency = latency_ms / 1000
+
+    def is_relevant(self, product_name, search_query):
+        with self.timer.phase('relevance'):
+            if self.latency:
+                time.sleep(self.latency)
+            return True
+
+    def classify_batch(self, product_names, search_query):
+        # Un lote cuesta una sola ida y vuelta simulada
+        with self.timer.phase('relevance'):
+            if self.latency and product_names:
+                time.sleep(self.latency)
+            return [True] * len(product_names)
+
+    def extract_wipes_units(self, product_title):
+        # Como el agente real: solo los títulos que el parser no resuelve pagan la ida y vuelta
+        parsed = parse_wipes_units(product_title)
+        if parsed:
+            return parsed['quantity']
+        with self.timer.phase('relevance'):
+            if self.latency:
+                time.sleep(self.latency)
+            parsed = parse_count_string(product_title)
+            return parsed['quantity'] if parsed else 0
+
+    def submit_wipes_units(self, product_title):
+        future = Future()
+        future.set_result(self.extract_wipes_units(product_title))
+        return future
+
+
+class BenchmarkDriver(PooledDriver):
+    """
+    PooledDriver that times every page load and, when recording, snapshots the rendered page
+    whenever the scraper reads it: page_source, a successful find_element(s) (including the
+    polls of WebDriverWait) and right before navigating away. The last snapshot of a URL wins.
+    """
+
+    def __init__(self, driver, driver_id, timer, store=None):
+        super().__init__(driver, driver_id)
+        self.timer = timer
+        self.store = store
+
+    def snapshot(self):
+        if self.store is None:
+            return
+        try:
+            self.store.save_page(self._driver.current_url, self._driver.page_source)
+        except Exception:
+            pass
+
+    def get(self, url):
+        self.snapshot()
+        with self.timer.phase('browser_load'):
+            result = super().get(url)
+        if self.store is not None:
+            self.store.save_redirect(url, self._driver.current_url)
+            self.snapshot()
+        return result
+
+    @property
+    def page_source(self):
+        html = self._driver.page_source
+        if self.store is not None:
+            self.store.save_page(self._driver.current_url, html)
+        return html
+
+    def find_element(self, *args, **kwargs):
+        element = self._driver.find_element(*args, **kwargs)
+        self.snapshot()
+        return element
+
+    def find_elements(self, *args, **kwargs):
+        elements = self._driver.find_elements(*args, **kwargs)
+        if elements:
+            self.snapshot()
+        return elements
+
+
+class BenchmarkDriverPool(DriverPool):
+    def __init__(self, driver_path, timer, store=None, **kwargs):
+        super().__init__(driver_path, **kwargs)
+        self.timer = timer
+        self.store = store
+
+    def _create_driver(self):
+        pooled = super()._create_driver()
+        return BenchmarkDriver(pooled._driver, pooled.driver_id, self.timer, self.store)
+
+    def release(self, driver):
+        if driver is not None and not driver.broken:
+            driver.snapshot()
+        super().release(driver)
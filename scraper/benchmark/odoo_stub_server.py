@@ -0,0 +1,101 @@
+import socketserver
+import threading
+import time
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+from log_config import get_logger
+
+logger = get_logger()
+
+CHANNELS = ['b2b', 'retail', 'ecommerce']
+UOMS = ['ml', 'g', 'units']
+
+
+def synthetic_record(i):
+    """competitor.product-like record number i (ids start at 1), always the same for the same i."""
+    return {
+        'id': i + 1,
+        'date': f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+        'product_channel': CHANNELS[i % len(CHANNELS)],
+        'classification_id': [i % 97 + 1, f"C{i % 97}-Cleaning product type {i % 97}"],
+        'product_category': f"Category {i % 13}",
+        'subindustry_id': [i % 11 + 1, f"Subindustry {i % 11}"],
+        'industry_id': [i % 5 + 1, f"Industry {i % 5}"],
+        'generic_product_type': f"Generic type {i % 41}",
+        'total_quantity': float(i % 5000 + 100),
+        'uom': UOMS[i % len(UOMS)],
+        'price_unit_sar': round((i % 900) / 37 + 0.5, 4),
+        'company': f"Company {i % 257}",
+    }
+
+
+class ForkingXMLRPCServer(socketserver.ForkingMixIn, SimpleXMLRPCServer):
+    # Un proceso por petición, como los workers de Odoo: las páginas se sirven en paralelo de verdad
+    pass
+
+
+class OdooStubServer:
+    """
+    Local stand-in for Odoo's XML-RPC API with `records` synthetic competitor.product rows.
+    Answers authenticate/version and execute_kw search_count/search_read (offset, limit, fields;
+    the domain is ignored and rows always come in id order), with `latency_ms` per request plus
+    `record_cost_us` per record read or written, standing in for Odoo's ORM and database time.
+    create/write/unlink only pay that cost (nothing is stored: every request runs in its own
+    process); create returns one made-up id per record.
+    """
+
+    def __init__(self, records, latency_ms=0, record_cost_us=0):
+        self.records = records
+        self.latency = latency_ms / 1000
+        self.record_cost = record_cost_us / 1e6
+
+        class Handler(SimpleXMLRPCRequestHandler):
+            rpc_paths = ('/xmlrpc/2/common', '/xmlrpc/2/object')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ForkingXMLRPCServer(('127.0.0.1', 0), requestHandler=Handler, logRequests=False, allow_none=True)
+        self._server.register_function(self._authenticate, 'authenticate')
+        self._server.register_function(self._version, 'version')
+        self._server.register_function(self._execute_kw, 'execute_kw')
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name='odoo-stub', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"[OdooStub] {self.records} records at {self.url} (latency {self.latency * 1000:.0f}ms, {self.record_cost * 1e6:.0f}µs/record)")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _authenticate(self, db, username, token, user_agent_env):
+        return 2
+
+    def _version(self):
+        return {'server_version': 'stub'}
+
+    def _execute_kw(self, db, uid, token, model, method, args, kwargs=None):
+        if self.latency:
+            time.sleep(self.latency)
+        kwargs = kwargs or {}
+        if method == 'search_count':
+            return self.records
+        if method == 'search_read':
+            offset = kwargs.get('offset', 0)
+            limit = kwargs.get('limit') or self.records
+            fields = kwargs.get('fields')
+            rows = []
+            if self.record_cost:
+                time.sleep(max(0, min(offset + limit, self.records) - offset) * self.record_cost)
+            for i in range(offset, min(offset + limit, self.records)):
+                record = synthetic_record(i)
+                rows.append({key: value for key, value in record.items() if not fields or key in fields or key == 'id'})
+            return rows
+        if method in ('create', 'write', 'unlink'):
+            count = len(args[0]) if isinstance(args[0], list) else 1
+            if self.record_cost:
+                time.sleep(count * self.record_cost)
+            return list(range(1, count + 1)) if method == 'create' else True
+        raise ValueError(f"Stub does not implement {model}.{method}")
@@ -0,0 +1,109 @@
+import mimetypes
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmark.fixtures import page_key
+from log_config import get_logger
+
+logger = get_logger()
+
+SCRIPT_TAG = re.compile(r'<script\b[^>]*>.*?</script\s*>', re.IGNORECASE | re.DOTALL)
+HEAD_TAG = re.compile(r'<head\b[^>]*>', re.IGNORECASE)
+EXTERNAL_URL = re.compile(r'https?://((?!127\.0\.0\.1)[A-Za-z0-9.-]+\.[A-Za-z]{2,})/')
+EXTERNAL_PREFIX = '/__external__/'
+ASSET_TYPES = ('image/', 'font/', 'video/', 'audio/', 'text/css', 'application/font', 'application/x-font')
+# Las páginas grabadas ya están renderizadas: sin scripts. Los recursos de otros hosts (CDN de imágenes,
+# fuentes...) se sirven desde aquí como ficheros sintéticos de `asset_kb`, nunca desde la red
+OFFLINE_CSP = '<meta http-equiv="Content-Security-Policy" content="default-src \'self\' \'unsafe-inline\' data:">'
+
+
+class ReplayServer:
+    """
+    Local stand-in for one recorded site. Serves the fixture pages on 127.0.0.1 with
+    `latency_ms` (+/- `jitter_ms`) of simulated network delay per request, rewriting the
+    site's absolute links so navigation stays on the replay server. Images, fonts and other
+    resources (own or third-party) are answered with `asset_kb` of filler.
+    """
+
+    def __init__(self, site, store, latency_ms=0, jitter_ms=0, asset_kb=20):
+        self.site = site
+        self.store = store
+        self.origin = store.origin(site)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.asset_body = b'\0' * int(asset_kb * 1024)
+        self.stats = {'pages': 0, 'redirects': 0, 'assets': 0, 'not_found': 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"replay-{site}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"[Replay] {self.site}: {self.origin} -> {self.base} (latency {self.latency_ms}ms)")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def local_url(self, url):
+        """Same URL on the replay server (for the scrapers' base_url)."""
+        return self.base + url[len(self.origin):] if url.startswith(self.origin) else url
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _rewrite(self, html):
+        html = SCRIPT_TAG.sub('', html)
+        host = self.origin.split('://', 1)[1]
+        html = html.replace(self.origin, self.base).replace(f"//{host}", f"//{self.base.split('://', 1)[1]}")
+        html = EXTERNAL_URL.sub(lambda m: f"{self.base}{EXTERNAL_PREFIX}{m.group(1)}/", html)
+        return HEAD_TAG.sub(lambda m: m.group(0) + OFFLINE_CSP, html, count=1)
+
+    def _handler_class(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                delay = replay.latency_ms + random.uniform(-replay.jitter_ms, replay.jitter_ms)
+                if delay > 0:
+                    time.sleep(delay / 1000)
+                html, redirect_key = replay.store.load_page(replay.site, page_key(replay.base + self.path))
+                if html is not None:
+                    replay._count('pages')
+                    body = replay._rewrite(html).encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif self.path.startswith(EXTERNAL_PREFIX) or self._is_asset():
+                    replay._count('assets')
+                    self.send_response(200)
+                    self.send_header('Content-Type', mimetypes.guess_type(self.path.split('?')[0])[0] or 'application/octet-stream')
+                    self.send_header('Content-Length', str(len(replay.asset_body)))
+                    self.end_headers()
+                    self.wfile.write(replay.asset_body)
+                elif redirect_key is not None:
+                    replay._count('redirects')
+                    self.send_response(302)
+                    self.send_header('Location', replay.base + redirect_key)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                else:
+                    replay._count('not_found')
+                    self.send_error(404)
+
+            def _is_asset(self):
+                content_type = mimetypes.guess_type(self.path.split('?')[0])[0] or ''
+                return content_type.startswith(ASSET_TYPES)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
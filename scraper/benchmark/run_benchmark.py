@@ -0,0 +1,623 @@
+# scraper/benchmark/run_benchmark.py
+# Graba páginas reales de los sitios (record) y mide los scrapers contra ellas sin red (replay).
+#   python scraper/benchmark/run_benchmark.py record --tasks scraper/benchmark/tasks.json
+#   python scraper/benchmark/run_benchmark.py replay --latency_ms 150 --report_file bench.json
+#   python scraper/benchmark/run_benchmark.py page_load --sites amazon mumzworld fine
+#   python scraper/benchmark/run_benchmark.py wipes_units --with_ai
+#   python scraper/benchmark/run_benchmark.py parsing --size 100000
+#   python scraper/benchmark/run_benchmark.py odoo_read --records 500000 --latency_ms 50
+#   python scraper/benchmark/run_benchmark.py odoo_write --records 20000 --workers 3
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+scraper_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+project_root = os.path.abspath(os.path.join(scraper_dir, '..'))
+for path in (scraper_dir, project_root):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+import config
+from benchmark.fixtures import FixtureStore
+from benchmark.instrumentation import PhaseTimer, StubRelevanceAgent, BenchmarkDriverPool
+from benchmark.odoo_stub_server import OdooStubServer, synthetic_record
+from benchmark.replay_server import ReplayServer
+from services import fetcher
+from services.rate_limit import get_scheduler
+from scrapers import build_scrapers
+from utils import parse_wipes_units, parse_quantities, QUANTITY_PARSERS
+from log_config import get_logger
+from odoo_client import OdooClient
+from odoo_bulk import BulkJournal, BulkWriter
+
+logger = get_logger()
+
+DEFAULT_FIXTURES_DIR = os.path.join(scraper_dir, 'benchmark', 'fixtures')
+DEFAULT_TASKS_FILE = os.path.join(scraper_dir, 'benchmark', 'tasks.json')
+DEFAULT_WIPES_CORPUS = os.path.join(scraper_dir, 'benchmark', 'wipes_corpus.json')
+# Plantillas de títulos para el corpus sintético del benchmark de parseo
+TITLE_TEMPLATES = [
+    "Dettol Antibacterial Surface Cleaner {n}ml", "Clorox Bleach {d} L x {m}", "Mr Muscle Glass Cleaner {n} ml Pack of {m}",
+    "Fine Hand Soap ({m} Bottles x {n} ml)", "{m} Pcs x {d} Ltr Floor Cleaner", "Windex Original {n} fl oz", "Car Wax Polish {n}oz",
+    "Detergent Powder {d} kg", "Lysol Wipes {n} count", "Nitrile Gloves {n}/box", "Microfiber Cloths (24 pcs)", "Air Freshener {m}-pack x {n}",
+    "Cleaning Rags {n} - piece", "Dettol Wipes {n} Wipes, Pack of {m}", "Stainless Steel Polish", "Toilet Cleaner Gel {n} g",
+]
+# Fases medidas dentro de 'scrape'; el resto (parseo, esperas, sleeps) queda como 'other'
+LOAD_PHASES = ['browser_load', 'http_load', 'relevance']
+
+
+def disable_rate_limits():
+    # Contra el servidor local no hace falta cortesía: se mide el código, no el ritmo por sitio
+    config.DEFAULT_RATE_LIMIT = (1000.0, 1000)
+    config.SITE_RATE_LIMITS = {}
+
+
+def install_driver(driver_path):
+    if driver_path:
+        return driver_path
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+
+def time_http_session(timer, store=None):
+    session = fetcher.get_http_session()
+    session.get = timer.wrap('http_load', session.get)
+    if store is not None:
+        def record_response(response, *args, **kwargs):
+            if response.status_code == 200 and 'html' in response.headers.get('Content-Type', 'text/html'):
+                store.save_page(response.url, response.text)
+                if response.history:
+                    store.save_redirect(response.history[0].url, response.url)
+        session.hooks['response'].append(record_response)
+
+
+def run_tasks(tasks, scrapers, timer):
+    per_site = {}
+    for task in tasks:
+        scraper = scrapers.get(task['site'])
+        if scraper is None:
+            logger.warning(f"[Benchmark] Sin scraper para '{task['site']}'. Se omite.")
+            continue
+        start = time.perf_counter()
+        with timer.phase('scrape'):
+            try:
+                products = scraper.scrape(task['keyword'], task['search_mode'])
+            except Exception:
+                logger.error(f"[Benchmark] Error en '{task['site']}' / '{task['keyword']}'.", exc_info=True)
+                products = []
+        site_stats = per_site.setdefault(task['site'], Counter())
+        site_stats['tasks'] += 1
+        site_stats['products'] += len(products)
+        site_stats['seconds'] += time.perf_counter() - start
+    return per_site
+
+
+def record(args):
+    with open(args.tasks, encoding='utf-8') as f:
+        tasks = json.load(f)
+    store = FixtureStore(args.fixtures)
+    timer = PhaseTimer()
+    driver_pool = BenchmarkDriverPool(install_driver(args.driver_path), timer, store=store, size=1).start()
+    scrapers = build_scrapers(driver_pool, StubRelevanceAgent(timer))
+    for site, scraper in scrapers.items():
+        store.register_site(site, scraper.base_url)
+    time_http_session(timer, store)
+
+    try:
+        for task in tasks:
+            logger.info(f"[Benchmark] Grabando '{task['site']}' / '{task['keyword']}' ({task['search_mode']})...")
+            run_tasks([task], scrapers, timer)
+            store.add_task(task)
+            store.save()
+    finally:
+        driver_pool.close()
+        store.save()
+    pages = sum(len(entry['pages']) for entry in store.manifest['sites'].values())
+    logger.info(f"[Benchmark] {pages} páginas grabadas para {len(store.tasks)} búsquedas en '{args.fixtures}'.")
+
+
+def build_report(args, timer, per_site, servers, wall):
+    pages = sum(server.stats['pages'] for server in servers.values())
+    products = sum(stats['products'] for stats in per_site.values())
+    scrape_seconds = timer.seconds['scrape']
+    phases = {name: round(timer.seconds[name], 3) for name in ['browser_start', 'scrape'] + LOAD_PHASES}
+    phases['other'] = round(max(scrape_seconds - sum(timer.seconds[name] for name in LOAD_PHASES), 0.0), 3)
+    return {
+        'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'latency_ms': args.latency_ms,
+        'relevance_latency_ms': args.relevance_latency_ms,
+        'http_fast_path': not args.browser_only,
+        'resource_blocking': not args.no_block_resources,
+        'rate_limited': args.polite,
+        'wall_seconds': round(wall, 3),
+        'pages': pages,
+        'pages_per_sec': round(pages / wall, 3) if wall else 0.0,
+        'products': products,
+        'products_per_min': round(products / wall * 60, 3) if wall else 0.0,
+        'phases': phases,
+        'calls': dict(timer.calls),
+        'sites': {
+            site: {
+                'tasks': stats['tasks'],
+                'products': stats['products'],
+                'seconds': round(stats['seconds'], 3),
+                'pages': servers[site].stats['pages'] if site in servers else 0,
+                'assets': servers[site].stats['assets'] if site in servers else 0,
+                'not_found': servers[site].stats['not_found'] if site in servers else 0,
+            }
+            for site, stats in per_site.items()
+        },
+    }
+
+
+def print_report(report, baseline=None):
+    def delta(key, value, section=None):
+        if not baseline:
+            return ''
+        previous = (baseline.get(section) or {}).get(key) if section else baseline.get(key)
+        if not previous:
+            return ''
+        return f"  ({(value - previous) / previous * 100:+.1f}% vs baseline)"
+
+    logger.info("================ BENCHMARK ================")
+    logger.info(f"Tiempo total: {report['wall_seconds']:.1f}s{delta('wall_seconds', report['wall_seconds'])}")
+    logger.info(f"Páginas: {report['pages']} | {report['pages_per_sec']:.2f} páginas/s{delta('pages_per_sec', report['pages_per_sec'])}")
+    logger.info(f"Productos: {report['products']} | {report['products_per_min']:.1f} productos/min{delta('products_per_min', report['products_per_min'])}")
+    logger.info("Tiempo por fase:")
+    scrape_seconds = report['phases']['scrape'] or 1.0
+    for name in ['browser_start', 'scrape'] + LOAD_PHASES + ['other']:
+        seconds = report['phases'][name]
+        share = f" ({seconds / scrape_seconds * 100:.0f}% del scraping)" if name in LOAD_PHASES + ['other'] else ''
+        logger.info(f"  {name:<14} {seconds:>9.2f}s{share}{delta(name, seconds, 'phases')}")
+    logger.info("Por sitio:")
+    for site, stats in sorted(report['sites'].items()):
+        logger.info(
+            f"  {site:<13} búsquedas: {stats['tasks']:>3} | productos: {stats['products']:>4} | "
+            f"páginas: {stats['pages']:>4} (404: {stats['not_found']}) | recursos: {stats['assets']:>5} | {stats['seconds']:.1f}s"
+        )
+
+
+def replay(args):
+    store = FixtureStore(args.fixtures)
+    if not store.tasks:
+        logger.error(f"[Benchmark] No hay búsquedas grabadas en '{args.fixtures}'. Ejecuta primero 'record'.")
+        return 1
+    sites = [site for site in store.sites() if not args.sites or site in args.sites]
+    tasks = [task for task in store.tasks if task['site'] in sites]
+
+    if args.browser_only:
+        config.HTTP_FETCH_SITES = []
+    config.BLOCK_RESOURCES = not args.no_block_resources
+    if not args.polite:
+        disable_rate_limits()
+    fetcher.set_page_cache(None)
+    timer = PhaseTimer()
+    time_http_session(timer)
+    servers = {site: ReplayServer(site, store, args.latency_ms, args.jitter_ms, args.asset_kb).start() for site in sites}
+
+    driver_pool = BenchmarkDriverPool(install_driver(args.driver_path), timer, size=args.pool_size)
+    start = time.perf_counter()
+    try:
+        with timer.phase('browser_start'):
+            driver_pool.start()
+        scrapers = build_scrapers(driver_pool, StubRelevanceAgent(timer, args.relevance_latency_ms))
+        for site, server in servers.items():
+            scrapers[site].base_url = server.local_url(scrapers[site].base_url)
+        per_site = run_tasks(tasks, scrapers, timer)
+    finally:
+        driver_pool.close()
+        for server in servers.values():
+            server.stop()
+    wall = time.perf_counter() - start
+
+    fetcher.report_fetch_stats()
+    get_scheduler().report()
+    report = build_report(args, timer, per_site, servers, wall)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.report_file:
+        with open(args.report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"[Benchmark] Informe guardado en '{args.report_file}'.")
+    return 0
+
+
+def time_page_loads(driver_path, servers, store, blocking):
+    """driver.get() de cada página grabada, con la caché de Chrome desactivada para que cada carga cuente."""
+    config.BLOCK_RESOURCES = blocking
+    timer = PhaseTimer()
+    driver_pool = BenchmarkDriverPool(driver_path, timer, size=1).start()
+    assets_before = sum(server.stats['assets'] for server in servers.values())
+    load_times = {}
+    try:
+        for site, server in servers.items():
+            with driver_pool.lease(site) as driver:
+                driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+                for key in store.manifest['sites'][site]['pages']:
+                    start = time.perf_counter()
+                    driver.get(server.base + key)
+                    load_times.setdefault(site, []).append(time.perf_counter() - start)
+    finally:
+        driver_pool.close()
+    assets = sum(server.stats['assets'] for server in servers.values()) - assets_before
+    return load_times, assets
+
+
+def summarize_loads(times):
+    ordered = sorted(times)
+    return {
+        'pages': len(ordered),
+        'total': round(sum(ordered), 3),
+        'mean': round(statistics.mean(ordered), 3) if ordered else 0.0,
+        'median': round(statistics.median(ordered), 3) if ordered else 0.0,
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3) if ordered else 0.0,
+    }
+
+
+def page_load(args):
+    store = FixtureStore(args.fixtures)
+    sites = [site for site in store.sites() if not args.sites or site in args.sites]
+    if not sites:
+        logger.error(f"[Benchmark] No hay páginas grabadas en '{args.fixtures}'. Ejecuta primero 'record'.")
+        return 1
+    disable_rate_limits()
+    driver_path = install_driver(args.driver_path)
+    servers = {site: ReplayServer(site, store, args.latency_ms, args.jitter_ms, args.asset_kb).start() for site in sites}
+    report = {'date': time.strftime("%Y-%m-%d %H:%M:%S"), 'latency_ms': args.latency_ms, 'asset_kb': args.asset_kb, 'modes': {}}
+    try:
+        for mode, blocking in (('sin_bloqueo', False), ('con_bloqueo', True)):
+            load_times, assets = time_page_loads(driver_path, servers, store, blocking)
+            report['modes'][mode] = {
+                'assets_requested': assets,
+                'all': summarize_loads([t for times in load_times.values() for t in times]),
+                'sites': {site: summarize_loads(times) for site, times in load_times.items()},
+            }
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    before, after = report['modes']['sin_bloqueo'], report['modes']['con_bloqueo']
+    logger.info("============ driver.get(): sin bloqueo -> con bloqueo ============")
+    for site in sorted(before['sites']):
+        b, a = before['sites'][site], after['sites'][site]
+        speedup = b['mean'] / a['mean'] if a['mean'] else 0.0
+        logger.info(f"  {site:<13} {b['pages']:>4} páginas | media {b['mean']:.3f}s -> {a['mean']:.3f}s (x{speedup:.2f}) | p95 {b['p95']:.3f}s -> {a['p95']:.3f}s")
+    speedup = before['all']['mean'] / after['all']['mean'] if after['all']['mean'] else 0.0
+    logger.info(f"  {'TOTAL':<13} {before['all']['total']:.1f}s -> {after['all']['total']:.1f}s (x{speedup:.2f}) | "
+                f"recursos pedidos: {before['assets_requested']} -> {after['assets_requested']}")
+    if args.report_file:
+        with open(args.report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"[Benchmark] Informe guardado en '{args.report_file}'.")
+    return 0
+
+
+def score_units(answers, corpus):
+    """Accuracy over the titles with an answer, plus how many were answered."""
+    answered = [(answer, entry['units']) for answer, entry in zip(answers, corpus) if answer is not None]
+    correct = sum(1 for answer, expected in answered if answer == expected)
+    return {
+        'answered': len(answered),
+        'coverage': round(len(answered) / len(corpus), 3) if corpus else 0.0,
+        'accuracy': round(correct / len(answered), 3) if answered else 0.0,
+    }
+
+
+def wipes_units(args):
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+    titles = [entry['title'] for entry in corpus]
+    report = {'date': time.strftime("%Y-%m-%d %H:%M:%S"), 'titles': len(titles), 'methods': {}}
+
+    start = time.perf_counter()
+    parsed = [parse_wipes_units(title) for title in titles]
+    elapsed = time.perf_counter() - start
+    parser_answers = [p['quantity'] if p else None for p in parsed]
+    report['methods']['parser'] = {**score_units(parser_answers, corpus), 'seconds': round(elapsed, 6),
+                                   'us_per_title': round(elapsed / len(titles) * 1e6, 1) if titles else 0.0}
+
+    if args.with_ai:
+        # Sin memo: cada título se pregunta de verdad a Gemini
+        from services.ai_service import RelevanceAgent
+        agent = RelevanceAgent(cache_file=None, model_file=None)
+        if not agent.client:
+            logger.error("[Benchmark] Sin GEMINI_API_KEY no se puede medir la IA.")
+            return 1
+        try:
+            ai_answers, ai_times = [], []
+            for title in titles:
+                start = time.perf_counter()
+                ai_answers.append(agent._ask_wipes_units(title))
+                ai_times.append(time.perf_counter() - start)
+        finally:
+            agent.close()
+        report['methods']['ai'] = {**score_units(ai_answers, corpus), 'seconds': round(sum(ai_times), 3),
+                                   'us_per_title': round(statistics.mean(ai_times) * 1e6, 1)}
+        # Híbrido: el parser responde lo que puede y la IA solo los títulos ambiguos
+        hybrid_answers = [p if p is not None else a for p, a in zip(parser_answers, ai_answers)]
+        hybrid_seconds = elapsed + sum(t for p, t in zip(parser_answers, ai_times) if p is None)
+        report['methods']['hybrid'] = {**score_units(hybrid_answers, corpus), 'seconds': round(hybrid_seconds, 3),
+                                       'us_per_title': round(hybrid_seconds / len(titles) * 1e6, 1),
+                                       'ai_calls': sum(1 for p in parser_answers if p is None)}
+
+    logger.info(f"============ Unidades de toallitas: {len(titles)} títulos etiquetados ============")
+    for method, result in report['methods'].items():
+        logger.info(f"  {method:<7} cobertura {result['coverage']:.0%} | exactitud {result['accuracy']:.1%} | "
+                    f"{result['seconds']:.3f}s ({result['us_per_title']:.0f} µs/título)")
+    for answer, entry in zip(parser_answers, corpus):
+        if answer is not None and answer != entry['units']:
+            logger.info(f"  [parser] '{entry['title']}': {answer} (esperado {entry['units']})")
+    if args.report_file:
+        with open(args.report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"[Benchmark] Informe guardado en '{args.report_file}'.")
+    return 0
+
+
+def synthetic_titles(size, seed=42):
+    rng = random.Random(seed)
+    return [
+        rng.choice(TITLE_TEMPLATES).format(n=rng.choice([20, 40, 80, 100, 250, 500, 750, 1000]), d=rng.choice([1, 1.5, 2, 4, 5]), m=rng.randint(2, 12))
+        for _ in range(size)
+    ]
+
+
+def parsing(args):
+    if args.titles_csv:
+        import pandas as pd
+        titles = pd.read_csv(args.titles_csv)[args.column].dropna().astype(str).tolist()
+        titles = (titles * (args.size // len(titles) + 1))[:args.size] if titles else []
+    else:
+        titles = synthetic_titles(args.size)
+    if not titles:
+        logger.error("[Benchmark] El corpus de títulos está vacío.")
+        return 1
+    report = {'date': time.strftime("%Y-%m-%d %H:%M:%S"), 'titles': len(titles), 'distinct': len(set(titles)), 'parsers': {}}
+
+    logger.info(f"============ Parseo de cantidades: {len(titles)} títulos ({report['distinct']} distintos) ============")
+    for kind in args.parsers or list(QUANTITY_PARSERS):
+        parser = QUANTITY_PARSERS[kind]
+        start = time.perf_counter()
+        scalar = [parser(title) for title in titles]
+        scalar_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        batch = parse_quantities(titles, kind)
+        batch_seconds = time.perf_counter() - start
+
+        # El lote debe dar exactamente lo mismo que la función título a título
+        expected = [result['quantity'] if result else None for result in scalar]
+        mismatches = sum(1 for e, q in zip(expected, batch['quantity']) if (e is None) != (q != q) or (e is not None and e != q))
+        report['parsers'][kind] = {
+            'scalar_seconds': round(scalar_seconds, 4),
+            'batch_seconds': round(batch_seconds, 4),
+            'speedup': round(scalar_seconds / batch_seconds, 2) if batch_seconds else 0.0,
+            'parsed': len(expected) - expected.count(None),
+            'mismatches': mismatches,
+        }
+        result = report['parsers'][kind]
+        logger.info(f"  {kind:<18} título a título {scalar_seconds:.3f}s -> lote {batch_seconds:.3f}s (x{result['speedup']:.1f}) | "
+                    f"con cantidad: {result['parsed']} | discrepancias: {mismatches}")
+    if args.report_file:
+        with open(args.report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"[Benchmark] Informe guardado en '{args.report_file}'.")
+    return 1 if any(result['mismatches'] for result in report['parsers'].values()) else 0
+
+
+def timed(func, measure_memory):
+    """(result, seconds, peak MB or None) of func()."""
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+        return result, time.perf_counter() - start, tracemalloc.get_traced_memory()[1] / 2 ** 20 if measure_memory else None
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+
+
+def odoo_read(args):
+    import pandas as pd
+
+    model = 'competitor.product'
+    fields = [field for field in synthetic_record(0) if field != 'id']
+    server = OdooStubServer(args.records, args.latency_ms, args.record_cost_us).start()
+    client = OdooClient(url=server.url, db='stub', username='stub', token='stub')
+    report = {'date': time.strftime("%Y-%m-%d %H:%M:%S"), 'records': args.records, 'latency_ms': args.latency_ms,
+              'record_cost_us': args.record_cost_us, 'cpus': os.cpu_count(), 'page_size': args.page_size, 'workers': args.workers, 'modes': {}}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            def single_call():
+                # Camino anterior: una sola respuesta con todo el modelo, después pandas y el CSV
+                df = pd.DataFrame(client.search_read(model, [], fields))
+                df.to_csv(os.path.join(tmp, 'single.csv'), index=False, encoding='utf-8-sig')
+                return len(df)
+
+            def streaming():
+                rows, _ = client.export_csv(model, [], fields, os.path.join(tmp, 'streaming.csv'),
+                                            page_size=args.page_size, workers=args.workers)
+                return rows
+
+            for mode, func in (('single_call', single_call), ('streaming', streaming)):
+                rows, seconds, peak_mb = timed(func, args.measure_memory)
+                report['modes'][mode] = {'rows': rows, 'seconds': round(seconds, 3), 'rows_per_second': round(rows / seconds) if seconds else 0,
+                                         'peak_mb': round(peak_mb, 1) if peak_mb is not None else None}
+    finally:
+        server.stop()
+
+    logger.info(f"============ Odoo search_read: {args.records} registros (latencia {args.latency_ms}ms) ============")
+    for mode, result in report['modes'].items():
+        memory = f" | pico de memoria {result['peak_mb']:.0f} MB" if result['peak_mb'] is not None else ""
+        logger.info(f"  {mode:<12} {result['rows']} filas en {result['seconds']:.1f}s ({result['rows_per_second']} filas/s){memory}")
+    single, stream = report['modes']['single_call'], report['modes']['streaming']
+    if stream['seconds']:
+        logger.info(f"  Aceleración: x{single['seconds'] / stream['seconds']:.2f} con páginas de {args.page_size} y {args.workers} workers")
+    if args.report_file:
+        with open(args.report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"[Benchmark] Informe guardado en '{args.report_file}'.")
+    return 0 if single['rows'] == stream['rows'] == args.records else 1
+
+
+def odoo_write(args):
+    model = 'product.price.suggestion'
+    records = [{key: value for key, value in synthetic_record(i).items() if key != 'id'} for i in range(args.records)]
+    server = OdooStubServer(0, args.latency_ms, args.record_cost_us).start()
+    client = OdooClient(url=server.url, db='stub', username='stub', token='stub')
+    report = {'date': time.strftime("%Y-%m-%d %H:%M:%S"), 'records': args.records, 'latency_ms': args.latency_ms,
+              'record_cost_us': args.record_cost_us, 'workers': args.workers, 'max_records': args.max_records, 'modes': {}}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            def single_call():
+                # Camino anterior: todos los registros en un único create
+                return len(client.execute_kw(model, 'create', [records]))
+
+            def chunked():
+                journal = BulkJournal(os.path.join(tmp, 'journal.sqlite3'), fingerprint='benchmark')
+                try:
+                    writer = BulkWriter(client, journal, workers=args.workers, max_records=args.max_records)
+                    return len(writer.run('create', model, 'create', records))
+                finally:
+                    journal.close()
+
+            for mode, func in (('single_call', single_call), ('chunked', chunked)):
+                rows, seconds, _ = timed(func, False)
+                report['modes'][mode] = {'rows': rows, 'seconds': round(seconds, 3), 'rows_per_second': round(rows / seconds) if seconds else 0}
+    finally:
+        server.stop()
+
+    logger.info(f"============ Odoo create: {args.records} registros (latencia {args.latency_ms}ms, {args.record_cost_us}µs/registro) ============")
+    for mode, result in report['modes'].items():
+        logger.info(f"  {mode:<12} {result['rows']} registros en {result['seconds']:.1f}s ({result['rows_per_second']} registros/s)")
+    single, chunked_result = report['modes']['single_call'], report['modes']['chunked']
+    if chunked_result['seconds']:
+        logger.info(f"  Aceleración: x{single['seconds'] / chunked_result['seconds']:.2f} con {args.workers or 'los'} workers")
+    if args.report_file:
+        with open(args.report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"[Benchmark] Informe guardado en '{args.report_file}'.")
+    return 0 if single['rows'] == chunked_result['rows'] == args.records else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de los scrapers (grabación y reproducción de páginas).")
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES_DIR,
+                        help=f"Carpeta de páginas grabadas (default: {DEFAULT_FIXTURES_DIR})")
+    parser.add_argument('--driver_path', default=None,
+                        help="Ruta a ChromeDriver (default: se descarga con webdriver-manager)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="Ejecuta las búsquedas contra los sitios reales y graba las páginas")
+    record_parser.add_argument('--tasks', default=DEFAULT_TASKS_FILE,
+                               help=f"JSON con las búsquedas [{{site, keyword, search_mode}}] (default: {DEFAULT_TASKS_FILE})")
+
+    replay_parser = subparsers.add_parser('replay', help="Mide los scrapers contra las páginas grabadas servidas en local")
+    replay_parser.add_argument('--relevance_latency_ms', type=float, default=0,
+                               help="Latencia simulada de cada llamada al agente de relevancia (default: 0)")
+    replay_parser.add_argument('--sites', nargs='*', default=None,
+                               help="Limita el benchmark a estos sitios (default: todos los grabados)")
+    replay_parser.add_argument('--pool_size', type=int, default=1,
+                               help="Navegadores Chrome en el pool (default: 1)")
+    replay_parser.add_argument('--browser_only', action='store_true',
+                               help="Desactiva el camino HTTP rápido y carga todo con Chrome")
+    replay_parser.add_argument('--polite', action='store_true',
+                               help="Mantiene los límites de peticiones por sitio de config (por defecto se desactivan en local)")
+    replay_parser.add_argument('--no_block_resources', action='store_true',
+                               help="No bloquea imágenes, fuentes ni trackers en Chrome (config.BLOCK_RESOURCES)")
+    replay_parser.add_argument('--report_file', default=None,
+                               help="Guarda el informe en JSON para compararlo después")
+    replay_parser.add_argument('--baseline', default=None,
+                               help="Informe JSON previo con el que comparar (regresiones)")
+
+    page_load_parser = subparsers.add_parser('page_load', help="Compara el tiempo de driver.get() con y sin bloqueo de recursos")
+    page_load_parser.add_argument('--sites', nargs='*', default=None,
+                                  help="Limita la medición a estos sitios (default: todos los grabados)")
+    page_load_parser.add_argument('--report_file', default=None,
+                                  help="Guarda el informe en JSON")
+
+    wipes_parser = subparsers.add_parser('wipes_units', help="Exactitud y latencia del parser de toallitas frente a la IA")
+    wipes_parser.add_argument('--corpus', default=DEFAULT_WIPES_CORPUS,
+                              help=f"JSON etiquetado [{{title, units}}] (default: {DEFAULT_WIPES_CORPUS})")
+    wipes_parser.add_argument('--with_ai', action='store_true',
+                              help="Pregunta también a Gemini cada título (necesita GEMINI_API_KEY) para comparar")
+    wipes_parser.add_argument('--report_file', default=None,
+                              help="Guarda el informe en JSON")
+
+    parsing_parser = subparsers.add_parser('parsing', help="Compara el parseo de cantidades título a título con la API por lotes")
+    parsing_parser.add_argument('--size', type=int, default=100000,
+                                help="Número de títulos del corpus (default: 100000)")
+    parsing_parser.add_argument('--titles_csv', default=None,
+                                help="CSV con títulos reales (p. ej. competitors_complete.csv); se repite hasta --size (default: corpus sintético)")
+    parsing_parser.add_argument('--column', default='product',
+                                help="Columna de títulos en --titles_csv (default: product)")
+    parsing_parser.add_argument('--parsers', nargs='*', default=None, choices=list(QUANTITY_PARSERS),
+                                help="Parsers a medir (default: todos)")
+    parsing_parser.add_argument('--report_file', default=None,
+                                help="Guarda el informe en JSON")
+
+    odoo_parser = subparsers.add_parser('odoo_read', help="Compara search_read en una sola llamada con la lectura paginada en paralelo")
+    odoo_parser.add_argument('--records', type=int, default=500000,
+                             help="Registros sintéticos del servidor Odoo local (default: 500000)")
+    odoo_parser.add_argument('--latency_ms', type=float, default=50,
+                             help="Latencia simulada por llamada XML-RPC en milisegundos (default: 50)")
+    odoo_parser.add_argument('--record_cost_us', type=float, default=50,
+                             help="Tiempo de servidor por registro leído (ORM y base de datos), en microsegundos (default: 50)")
+    odoo_parser.add_argument('--page_size', type=int, default=None,
+                             help="Registros por página (default: odoo_client.ODOO_PAGE_SIZE)")
+    odoo_parser.add_argument('--workers', type=int, default=None,
+                             help="Páginas pedidas a la vez (default: odoo_client.ODOO_READ_WORKERS)")
+    odoo_parser.add_argument('--measure_memory', action='store_true',
+                             help="Mide el pico de memoria con tracemalloc (más lento)")
+    odoo_parser.add_argument('--report_file', default=None,
+                             help="Guarda el informe en JSON")
+
+    odoo_write_parser = subparsers.add_parser('odoo_write', help="Compara un create con todo el lote frente a la carga en bloques en paralelo")
+    odoo_write_parser.add_argument('--records', type=int, default=20000,
+                                   help="Registros a crear en el servidor Odoo local (default: 20000)")
+    odoo_write_parser.add_argument('--latency_ms', type=float, default=50,
+                                   help="Latencia simulada por llamada XML-RPC en milisegundos (default: 50)")
+    odoo_write_parser.add_argument('--record_cost_us', type=float, default=500,
+                                   help="Tiempo de servidor por registro creado, en microsegundos (default: 500)")
+    odoo_write_parser.add_argument('--max_records', type=int, default=None,
+                                   help="Registros por bloque (default: odoo_bulk.ODOO_BULK_MAX_RECORDS)")
+    odoo_write_parser.add_argument('--workers', type=int, default=None,
+                                   help="Bloques enviados a la vez (default: odoo_bulk.ODOO_BULK_WORKERS)")
+    odoo_write_parser.add_argument('--report_file', default=None,
+                                   help="Guarda el informe en JSON")
+
+    for sub in (replay_parser, page_load_parser):
+        sub.add_argument('--latency_ms', type=float, default=100,
+                         help="Latencia simulada por petición en milisegundos (default: 100)")
+        sub.add_argument('--jitter_ms', type=float, default=0,
+                         help="Variación aleatoria de la latencia en milisegundos (default: 0)")
+        sub.add_argument('--asset_kb', type=float, default=20,
+                         help="Tamaño de cada imagen/fuente/recurso externo servido en local (default: 20)")
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args)
+        return 0
+    if args.command == 'page_load':
+        return page_load(args)
+    if args.command == 'wipes_units':
+        return wipes_units(args)
+    if args.command == 'parsing':
+        return parsing(args)
+    if args.command == 'odoo_read':
+        return odoo_read(args)
+    if args.command == 'odoo_write':
+        return odoo_write(args)
+    return replay(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -74,4 +74,114 @@ SACO_EXCLUSIONS = [
 ]
 
 # USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"
\ No newline at end of file
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"
+
+# --- Driver pool ---
+DRIVER_POOL_SIZE = 1          # Chrome instances kept warm
+DRIVER_MAX_PAGES = 200        # page loads before a Chrome instance is recycled
+DRIVER_LEASE_TIMEOUT = 300    # seconds a scraper waits for a free driver
+
+# --- Resource blocking (Chrome DevTools Network.setBlockedURLs) ---
+# The scrapers only read DOM text, so images, fonts, media, ads and trackers are never downloaded.
+# Patterns use DevTools wildcards ('*') against the full URL. Stylesheets and the sites' own scripts
+# are kept: several scrapers click elements and wait for JS-rendered content.
+BLOCK_RESOURCES = True
+_BLOCKED_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp',
+                       'woff', 'woff2', 'ttf', 'otf', 'eot', 'mp4', 'webm', 'mp3']
+BLOCKED_RESOURCE_PATTERNS = [f"*.{ext}" for ext in _BLOCKED_EXTENSIONS] + [f"*.{ext}?*" for ext in _BLOCKED_EXTENSIONS] + [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*googleadservices.com*', '*facebook.net*', '*facebook.com/tr*', '*connect.facebook.*', '*hotjar.com*',
+    '*clarity.ms*', '*analytics.tiktok.com*', '*sc-static.net*', '*snap.licdn.com*', '*criteo.*', '*taboola.com*',
+]
+SITE_BLOCKED_RESOURCE_PATTERNS = {
+    'amazon': ['*amazon-adsystem.com*', '*fls-eu.amazon.*', '*unagi*.amazon.*', '*images-na.ssl-images-amazon.com/images/*',
+               '*m.media-amazon.com/images/I/*', '*/sponsored-products/*'],
+    'mumzworld': ['*cdn.segment.com*', '*api.segment.io*', '*widget.intercom.io*', '*js.intercomcdn.com*', '*bat.bing.com*'],
+    'fine': ['*tawk.to*', '*zopim.com*', '*static.zdassets.com*', '*embed.tawk.to*'],
+}
+
+# --- Politeness (per-site request pacing) ---
+# (requests per second, burst) per site, applied to every browser navigation and HTTP fetch.
+# Limits are per process: with --workers, multiply by SITE_MAX_CONCURRENCY for the site total.
+DEFAULT_RATE_LIMIT = (1.0, 3)
+SITE_RATE_LIMITS = {
+    'amazon': (0.5, 2),
+    'saco': (0.5, 2),
+    'mumzworld': (0.7, 2),
+}
+BACKOFF_BASE_SECONDS = 10     # first pause after a 429/503, captcha or slow response
+BACKOFF_MAX_SECONDS = 300     # the pause doubles on repeated trouble up to this
+SLOW_RESPONSE_SECONDS = 8     # a page load slower than this counts as the site struggling
+BLOCKED_PAGE_MARKERS = ['captcha', 'robot check', 'access denied', 'unusual traffic']
+
+# --- Parallel scraping (--workers) ---
+DEFAULT_SITE_CONCURRENCY = 1  # simultaneous searches per site
+SITE_MAX_CONCURRENCY = {
+    'amazon': 2,
+    'saco': 1,
+    'fine': 1,
+    'gogreen': 1,
+    'officesupply': 1,
+    'mumzworld': 1,
+    'aerosense': 1,
+}
+
+# --- Task journal (--resume) ---
+JOURNAL_MAX_AGE_HOURS = 72    # an interrupted run older than this is not resumed
+
+# --- Streaming writer ---
+WRITER_FLUSH_ROWS = 20        # fsync the output CSV after this many rows...
+WRITER_FLUSH_SECONDS = 10     # ...or after this many seconds, whichever comes first
+WRITER_QUEUE_SIZE = 1000      # max rows waiting to be written before producers block
+
+# --- Page fetching (HTTP fast path, browser fallback) ---
+HTTP_FETCH_SITES = ['saco', 'officesupply', 'gogreen', 'amazon', 'aerosense']
+HTTP_TIMEOUT = 15                  # seconds per plain HTTP request
+HTTP_POOL_SIZE = 10                # keep-alive connections per host
+HTTP_FALLBACK_DISABLE_AFTER = 5    # consecutive browser fallbacks before a site goes browser-only for the run
+
+# --- Page cache (product pages) ---
+PAGE_CACHE_DIR = 'scraper/page_cache'
+PAGE_CACHE_TTL_HOURS = 24     # a cached product page older than this is fetched again
+PAGE_CACHE_MAX_MB = 500       # compressed HTML kept on disk; least recently used pages are evicted first
+PAGE_CACHE_IGNORED_PARAMS = ['ref', 'ref_', 'qid', 'sr', 'keywords', 'crid', 'sprefix', 'dib', 'dib_tag', 'th', 'psc', 'gclid', 'fbclid']
+
+# --- Listing pre-filter ---
+# Judge search-result titles (quantity + AI relevance) before opening product pages
+LISTING_PREFILTER_ENABLED = True
+# Also skip cards whose listing title has no quantity. Off: the product page (fuller title) may still
+# have it, so those cards are opened as before; on: fewer page loads at the cost of some products
+LISTING_QUANTITY_GATE = False
+
+# --- AI relevance (decision cache and batching) ---
+RELEVANCE_CACHE_FILE = 'scraper/relevance_cache.sqlite3'
+RELEVANCE_CACHE_TTL_DAYS = 30           # a decision older than this is asked again
+RELEVANCE_CACHE_MAX_ENTRIES = 200000    # least recently used decisions are evicted above this
+RELEVANCE_BATCH_SIZE = 20               # titles per batched relevance request (classify_batch)
+
+# --- Gemini client (services.gemini_client) ---
+# (requests per minute, tokens per minute) per model; set them to the account's quota tier.
+# Budgets are per process: with --workers, each worker gets the full budget.
+GEMINI_DEFAULT_RATE_LIMIT = (15, 250000)
+GEMINI_RATE_LIMITS = {
+    'gemini-2.5-flash-lite': (15, 250000),
+    'gemini-2.5-pro': (5, 250000),
+}
+GEMINI_MAX_CONCURRENCY = 4          # requests in flight at once (threads sharing one keep-alive session)
+GEMINI_TIMEOUT = 60                 # seconds per request
+GEMINI_MAX_RETRIES = 5              # attempts on 429/5xx and network errors
+GEMINI_BACKOFF_BASE_SECONDS = 2     # jittered exponential backoff: base * 2^attempt, halved at random...
+GEMINI_BACKOFF_MAX_SECONDS = 60     # ...up to this, or longer if Retry-After asks for it
+WIPES_UNITS_IN_FLIGHT = 8           # wipes counts a scraper leaves pending with Gemini while it keeps visiting pages
+
+# --- Local relevance pre-classifier (train_relevance_model.py) ---
+RELEVANCE_MODEL_FILE = 'scraper/models/relevance_model.joblib'
+RELEVANCE_MODEL_BAND = (0.1, 0.9)      # probabilities inside this band are escalated to Gemini
+RELEVANCE_MODEL_AUDIT_RATE = 0.02      # share of local answers also asked to Gemini to track agreement
+RELEVANCE_MODEL_MIN_SAMPLES = 300      # cached Gemini decisions needed before training
+
+# --- Deferred relevance stage (--relevance_stage deferred) ---
+# Scrapers stage every candidate; relevance is decided afterwards in bulk and only accepted rows reach the CSV
+RELEVANCE_STAGE = 'inline'            # 'inline' (ask while scraping) or 'deferred'
+RELEVANCE_STAGE_CONCURRENCY = 4       # queries classified at once (their batches share the Gemini budget)
+RELEVANCE_STAGE_CHUNK = 200           # titles per classify_batch() call; decisions are saved after each chunk
@@ -188,24 +188,25 @@ import pandas as pd
 import time
 import csv
 import os  
+import signal
 import sys
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
      sys.path.insert(0, project_root)
-import re
 import config
 import argparse
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from services.ai_service import RelevanceAgent
-from scrapers.amazon_scraper import AmazonScraper
-from scrapers.mumzworld_scraper import MumzworldScraper
-from scrapers.saco_scraper import SacoScraper
-from scrapers.fine_scraper import FineScraper
-from scrapers.gogreen_scraper import GoGreenScraper 
-from scrapers.officesupply_scraper import OfficeSupplyScraper
-from scrapers.aerosense_scraper import AeroSenseScraper
+from services.driver_pool import DriverPool
+from services.parallel_runner import run_tasks_parallel
+from services.task_journal import TaskJournal, file_fingerprint
+from services.result_cache import SearchResultCache
+from services.result_writer import StreamingCSVWriter
+from services.relevance_stage import CandidateStore, StagingRelevanceAgent, classify_staged
+from services.fetcher import report_fetch_stats, set_page_cache
+from services.page_cache import PageCache
+from services.rate_limit import get_scheduler
+from scrapers import build_scrapers
 from log_config import get_logger
 
 logger = get_logger() # <-- AÑADIDO
@@ -218,6 +219,35 @@ parser.add_argument('--output_mode', default='overwrite', choices=['overwrite',
                     help="Modo de escritura para el archivo de salida ('overwrite' o 'append', default: overwrite)")
 parser.add_argument('--output_file', default=config.OUTPUT_CSV_FILE,
                     help=f"Archivo CSV de salida para los resultados (default: {config.OUTPUT_CSV_FILE})")
+parser.add_argument('--pool_size', type=int, default=config.DRIVER_POOL_SIZE,
+                    help=f"Número de navegadores Chrome que se mantienen abiertos (default: {config.DRIVER_POOL_SIZE})")
+parser.add_argument('--workers', type=int, default=1,
+                    help="Número de procesos de scraping en paralelo. Con 1 se ejecuta en serie (default: 1)")
+parser.add_argument('--resume', action='store_true',
+                    help="Reanuda una ejecución interrumpida usando el journal, saltando las búsquedas ya completadas")
+parser.add_argument('--journal_file', default=None,
+                    help="Archivo SQLite del journal de tareas (default: junto al archivo de salida)")
+parser.add_argument('--page_cache_dir', default=config.PAGE_CACHE_DIR,
+                    help=f"Carpeta de la caché de páginas de producto (default: {config.PAGE_CACHE_DIR})")
+parser.add_argument('--no_page_cache', action='store_true',
+                    help="Descarga siempre las páginas de producto sin usar la caché en disco")
+parser.add_argument('--relevance_cache_file', default=config.RELEVANCE_CACHE_FILE,
+                    help=f"Archivo SQLite con las decisiones de relevancia de la IA (default: {config.RELEVANCE_CACHE_FILE})")
+parser.add_argument('--no_relevance_cache', action='store_true',
+                    help="Pregunta siempre a la IA sin usar las decisiones guardadas")
+parser.add_argument('--relevance_model_file', default=config.RELEVANCE_MODEL_FILE,
+                    help=f"Modelo local de relevancia entrenado con train_relevance_model.py (default: {config.RELEVANCE_MODEL_FILE})")
+parser.add_argument('--no_relevance_model', action='store_true',
+                    help="No usa el modelo local: todos los títulos se consultan a la IA")
+parser.add_argument('--relevance_stage', default=config.RELEVANCE_STAGE, choices=['inline', 'deferred'],
+                    help="'inline': la relevancia se decide mientras se navega. 'deferred': se guardan todos los candidatos "
+                         f"y se clasifican en bloque al terminar el scraping (default: {config.RELEVANCE_STAGE})")
+parser.add_argument('--staging_file', default=None,
+                    help="Archivo SQLite con los candidatos del modo diferido (default: junto al archivo de salida)")
+parser.add_argument('--classify_only', action='store_true',
+                    help="No hace scraping: clasifica los candidatos ya guardados en --staging_file y escribe el CSV de salida")
+parser.add_argument('--reclassify', action='store_true',
+                    help="Con --classify_only, vuelve a clasificar también los candidatos ya decididos")
 args = parser.parse_args()
 # --- FIN Argumentos ---
 
@@ -225,10 +255,255 @@ args = parser.parse_args()
 INPUT_ANALYSIS_FILE = args.analysis_file
 OUTPUT_MODE = args.output_mode
 OUTPUT_SCRAPING_FILE = args.output_file
+DRIVER_POOL_SIZE = args.pool_size
+WORKERS = args.workers
+RESUME = args.resume
+JOURNAL_FILE = args.journal_file or os.path.splitext(OUTPUT_SCRAPING_FILE)[0] + '_journal.sqlite3'
+PAGE_CACHE_DIR = None if args.no_page_cache else args.page_cache_dir
+RELEVANCE_CACHE_FILE = None if args.no_relevance_cache else args.relevance_cache_file
+RELEVANCE_MODEL_FILE = None if args.no_relevance_model else args.relevance_model_file
+CLASSIFY_ONLY = args.classify_only
+DEFER_RELEVANCE = args.relevance_stage == 'deferred' or CLASSIFY_ONLY
+STAGING_FILE = args.staging_file or os.path.splitext(OUTPUT_SCRAPING_FILE)[0] + '_candidates.sqlite3'
 # --- FIN Renombrar ---
 
+
+def build_scrape_tasks(df_instructions):
+    """Convierte las instrucciones en tareas (subindustria, tipo de producto, sitio, keyword)."""
+    tasks = []
+    b2c_subindustries = ['home', 'automotive', 'pets'] # Usar minúsculas para comparación
+
+    # Agrupar por subindustria para procesar como lo hacías
+    for sub_industry_group, df_industry_instructions in df_instructions.groupby('Sub industry'):
+        industry = df_industry_instructions.iloc[0]['Industry'] # Obtener de la primera fila del grupo
+
+        for index, row in df_industry_instructions.iterrows():
+            sub_industry = row['Sub industry'] # Asegurar que sub_industry se define aquí
+            original_type_of_product = str(row['Type of product'])
+            original_type_of_product_lower = original_type_of_product.lower()
+            generic_type_of_product = str(row['Generic product type'])
+
+            try:
+                base_keyword = original_type_of_product_lower.split('-', 1)[1].strip()
+            except IndexError:
+                base_keyword = original_type_of_product_lower.strip()
+
+            search_modifiers_val = row.get('Search Modifiers')
+            site_specific_keywords = {}
+            general_modifiers = []
+
+            if pd.notna(search_modifiers_val):
+                search_modifiers_str = str(search_modifiers_val)
+                modifiers = search_modifiers_str.split(';')
+                for mod in modifiers:
+                    mod = mod.strip()
+                    if ':' in mod:
+                        site, keyword = mod.split(':', 1)
+                        site = site.strip().lower() # asegurar minúsculas
+                        keyword = keyword.strip()
+                        if site not in site_specific_keywords:
+                            site_specific_keywords[site] = []
+                        site_specific_keywords[site].append(keyword)
+                    elif mod:
+                        general_modifiers.append(mod)
+
+            general_modifiers_text = " ".join(general_modifiers)
+            search_keyword = f"{base_keyword} {general_modifiers_text}".strip()
+
+            search_mode = 'units' if any(kw in original_type_of_product_lower for kw in ['wipes', 'rags', 'microfiber', 'brush']) else 'volume'
+
+            sites_to_scrape = config.TARGET_MAP.get(sub_industry, []).copy()
+
+            if base_keyword in config.MUMZWORLD_EXCLUSIONS and 'mumzworld' in sites_to_scrape:
+                sites_to_scrape.remove('mumzworld')
+                logger.debug(f"Excluyendo Mumzworld para '{base_keyword}'")
+
+            if base_keyword in config.SACO_EXCLUSIONS and 'saco' in sites_to_scrape:
+                sites_to_scrape.remove('saco')
+                logger.debug(f"Excluyendo Saco para '{base_keyword}'")
+
+            channel_value = 'B2C' if sub_industry.lower() in b2c_subindustries else 'B2B'
+
+            for site_name in sites_to_scrape:
+                # Decidir qué keyword usar: específico del sitio o el general
+                keywords_to_use = site_specific_keywords.get(site_name, [search_keyword])
+
+                for keyword_to_use in keywords_to_use:
+                    # Lógica para sitios B2B que requieren keyword específica
+                    if site_name in ['fine', 'gogreen', 'officesupply', 'aerosense']:
+                         if site_name not in site_specific_keywords and not general_modifiers: # Saltar si no hay keyword específica Y TAMPOCO modificadores generales
+                            logger.warning(f"Saltando '{site_name}' para '{base_keyword}' porque no se proveyó keyword específica o modificador general.")
+                            continue
+
+                    tasks.append({
+                        'industry': industry,
+                        'subindustry': sub_industry,
+                        'type_of_product': original_type_of_product,
+                        'generic_product_type': generic_type_of_product,
+                        'base_keyword': base_keyword,
+                        'site': site_name,
+                        'keyword': keyword_to_use,
+                        'search_mode': search_mode,
+                        'channel': channel_value,
+                    })
+
+    return tasks
+
+
+def build_output_rows(task, found_products):
+    rows = []
+    for product in found_products:
+        rows.append({
+            'date': time.strftime("%Y-%m-%d"),
+            'industry': task['industry'],
+            'subindustry': task['subindustry'],
+            'type_of_product': task['type_of_product'],
+            'generic_product_type': task['generic_product_type'],
+            'product': product.get('Product'),
+            'price_sar': product.get('Price_SAR'),
+            'company': product.get('Company'),
+            'source': task['site'],
+            'url': product.get('URL'),
+            'unit_of_measurement': product.get('Unit of measurement'),
+            'total_quantity': product.get('Total quantity'),
+            'channel': task['channel'],
+        })
+        logger.debug(f"    -> Producto añadido: {product.get('Product', 'N/A')[:60]}...") # Cambiado a DEBUG para menos verbosidad
+    return rows
+
+
+def run_scraping(tasks, scrapers, writer, journal, result_cache, store=None):
+    tasks_by_group = {}
+    for task in tasks:
+        tasks_by_group.setdefault(task['subindustry'], []).append(task)
+
+    for sub_industry_group, group_tasks in tasks_by_group.items():
+        logger.info(f"\n=================================================")
+        logger.info(f"  PROCESANDO SUBINDUSTRIA: '{sub_industry_group}'")
+        logger.info(f"=================================================\n")
+
+        products_in_group = 0
+
+        for task in group_tasks:
+            scraper = scrapers.get(task['site'])
+            if not scraper:
+                logger.warning(f"   -> No se encontró scraper para '{task['site']}'.")
+                continue
+
+            logger.info(f">> Buscando '{task['base_keyword']}' para '{sub_industry_group}' (Modo: {task['search_mode']})")
+            logger.info(f"   -> Buscando en '{task['site']}' con keyword: '{task['keyword']}'")
+            found_products = result_cache.get(task)
+            if found_products is None:
+                # Cada producto se escribe en cuanto el scraper lo valida, sin esperar al final del grupo
+                def write_product(product, task=task):
+                    writer.writerows(build_output_rows(task, [product]))
+                # Si la búsqueda falla a medias, sus filas ya escritas se retiran del CSV
+                unit_start = None if store else writer.checkpoint()
+                try:
+                    # En modo diferido nada llega al CSV hasta pasar la etapa de relevancia
+                    found_products = scraper.scrape(task['keyword'], task['search_mode'], on_product=None if store else write_product)
+                except Exception as scrape_error:
+                     logger.error(f"Error durante scraping de '{task['site']}' con keyword '{task['keyword']}'.", exc_info=True)
+                     if unit_start is not None:
+                         writer.rollback(unit_start)
+                     continue # Continuar con el siguiente sitio/keyword (queda pendiente para --resume)
+                result_cache.put(task, found_products)
+                rows = build_output_rows(task, found_products)
+                if store:
+                    store.stage(task, rows)
+            else:
+                rows = build_output_rows(task, found_products)
+                if store:
+                    store.stage(task, rows)
+                else:
+                    writer.writerows(rows)
+
+            journal.mark_done(task, rows)
+            products_in_group += len(rows)
+
+        if products_in_group:
+            destination = f"guardados como candidatos en '{STAGING_FILE}'" if store else f"escritos en '{OUTPUT_SCRAPING_FILE}'"
+            logger.info(f"{products_in_group} productos encontrados para '{sub_industry_group}' {destination}.")
+        else:
+            logger.info(f"No se encontraron productos para guardar en '{sub_industry_group}'.")
+
+        # Sin pausa fija entre subindustrias: el ritmo por sitio lo marca services.rate_limit
+        logger.info(f"Proceso para '{sub_industry_group}' completado.")
+
+
+def run_scraping_parallel(tasks, driver_path, writer, journal, result_cache, store=None):
+    def on_result(task, found_products):
+        rows = build_output_rows(task, found_products)
+        if store:
+            store.stage(task, rows)
+        journal.mark_done(task, rows)
+        logger.info(f"   -> '{task['site']}' / '{task['keyword']}' ({task['subindustry']}): {len(rows)} productos.")
+        if not store:
+            writer.writerows(rows)
+
+    run_tasks_parallel(tasks, WORKERS, driver_path, on_result, result_cache=result_cache, page_cache_dir=PAGE_CACHE_DIR,
+                       relevance_cache_file=RELEVANCE_CACHE_FILE, relevance_model_file=RELEVANCE_MODEL_FILE,
+                       defer_relevance=store is not None)
+
+
+def run_relevance_stage(store, writer, ai_agent=None):
+    """Clasifica en bloque los candidatos pendientes y escribe en el CSV los aceptados."""
+    agent = ai_agent or RelevanceAgent(RELEVANCE_CACHE_FILE, RELEVANCE_MODEL_FILE)
+    try:
+        if not classify_staged(store, agent):
+            return
+        counts = store.counts(agent.prompt_version)
+        rows = store.accepted_rows(agent.prompt_version)
+        writer.writerows(rows)
+        logger.info(
+            f"[RelevanceStage] Candidatos: {counts['total']} | aceptados: {counts['accepted']} | "
+            f"descartados: {counts['rejected']} | pendientes: {counts['pending']}. {len(rows)} filas escritas en '{OUTPUT_SCRAPING_FILE}'."
+        )
+    finally:
+        if ai_agent is None:
+            agent.report()
+            agent.close()
+
+
+def classify_only():
+    """--classify_only: repite la etapa de relevancia sobre los candidatos guardados, sin navegar."""
+    if not os.path.exists(STAGING_FILE):
+        logger.error(f"No existe el archivo de candidatos '{STAGING_FILE}'. Ejecuta antes el scraping con --relevance_stage deferred.")
+        return
+    store = CandidateStore(STAGING_FILE)
+    try:
+        if args.reclassify:
+            store.reset_decisions()
+            logger.info("Decisiones anteriores descartadas: se clasifican todos los candidatos.")
+        write_header = OUTPUT_MODE == 'overwrite' or not os.path.exists(OUTPUT_SCRAPING_FILE)
+        with open(OUTPUT_SCRAPING_FILE, 'w' if OUTPUT_MODE == 'overwrite' else 'a', newline='', encoding='utf-8') as f:
+            if write_header:
+                csv.DictWriter(f, fieldnames=config.CSV_COLUMNS).writeheader()
+            writer = StreamingCSVWriter(f, fieldnames=config.CSV_COLUMNS)
+            try:
+                run_relevance_stage(store, writer)
+            finally:
+                writer.close()
+    finally:
+        store.close()
+
+
+def _exit_on_sigterm(signum, frame):
+    # `timeout` envía SIGTERM: se convierte en SystemExit para que corran los bloques finally
+    # (vaciar el writer, cerrar navegadores y journal) en lugar de morir con filas a medias
+    logger.warning(f"Señal {signum} recibida. Cerrando ordenadamente...")
+    raise SystemExit(128 + signum)
+
+
 def main():
+    if CLASSIFY_ONLY:
+        logger.info(f"Clasificando los candidatos de '{STAGING_FILE}' en '{OUTPUT_SCRAPING_FILE}' (modo de salida: {OUTPUT_MODE}).")
+        classify_only()
+        return
+
     logger.info(f"Iniciando scraping. Modo de salida: {OUTPUT_MODE}")
+    if DEFER_RELEVANCE:
+        logger.info(f"Relevancia diferida: los candidatos se guardan en '{STAGING_FILE}' y se clasifican al final.")
     logger.info(f"Usando archivo de instrucciones: {INPUT_ANALYSIS_FILE}")
     logger.info(f"Archivo de salida: {OUTPUT_SCRAPING_FILE}")
 
@@ -244,168 +519,120 @@ def main():
         logger.error(f"Error leyendo '{INPUT_ANALYSIS_FILE}'.", exc_info=True)
         return
 
+    tasks = build_scrape_tasks(df_instructions)
+
+    # --- Journal de tareas: reanudar o empezar de cero ---
+    journal = TaskJournal(JOURNAL_FILE)
+    # Del CSV de salida solo cuenta la ruta: la propia ejecución lo va escribiendo
+    fingerprint = file_fingerprint([INPUT_ANALYSIS_FILE], os.path.abspath(OUTPUT_SCRAPING_FILE), OUTPUT_MODE, args.relevance_stage)
+    resuming = RESUME and journal.can_resume(fingerprint)
+
     # --- Determinar modo de escritura y cabecera --- MODIFICADO ---
     file_exists = os.path.exists(OUTPUT_SCRAPING_FILE)
-    write_mode = 'w' if OUTPUT_MODE == 'overwrite' else 'a'
-    write_header = (OUTPUT_MODE == 'overwrite') or (not file_exists) # Escribir cabecera si se sobrescribe o si el archivo no existe en modo append
+    if resuming:
+        # Se descarta todo lo escrito por la ejecución interrumpida y se reescribe desde el journal,
+        # así no quedan filas duplicadas ni a medias (vale tanto para 'overwrite' como para 'append')
+        base_offset = journal.resume()
+        if file_exists and os.path.getsize(OUTPUT_SCRAPING_FILE) >= base_offset:
+            with open(OUTPUT_SCRAPING_FILE, 'r+b') as f:
+                f.truncate(base_offset)
+        write_mode = 'a'
+        write_header = not os.path.exists(OUTPUT_SCRAPING_FILE) or os.path.getsize(OUTPUT_SCRAPING_FILE) == 0
+    else:
+        write_mode = 'w' if OUTPUT_MODE == 'overwrite' else 'a'
+        write_header = (OUTPUT_MODE == 'overwrite') or (not file_exists) # Escribir cabecera si se sobrescribe o si el archivo no existe en modo append
+        base_offset = os.path.getsize(OUTPUT_SCRAPING_FILE) if (file_exists and OUTPUT_MODE == 'append') else 0
+        journal.start(fingerprint, base_offset)
+
+    # Candidatos del modo diferido: al reanudar se conservan los de las búsquedas ya hechas
+    store = CandidateStore(STAGING_FILE) if DEFER_RELEVANCE else None
+    if store and not resuming:
+        store.clear()
+
+    pending_tasks = [task for task in tasks if not journal.is_done(task)]
+    logger.info(f"{len(pending_tasks)} de {len(tasks)} búsquedas (sitio, keyword) por ejecutar.")
 
     # Usar 'with open' fuera del bucle para mejor manejo del archivo
     try:
         with open(OUTPUT_SCRAPING_FILE, write_mode, newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=config.CSV_COLUMNS)
             if write_header:
-                writer.writeheader()
+                csv.DictWriter(f, fieldnames=config.CSV_COLUMNS).writeheader()
                 logger.info(f"Escribiendo cabecera en '{OUTPUT_SCRAPING_FILE}'.")
             # --- FIN Modificación ---
 
-            logger.info("Descargando y configurando ChromeDriver...")
+            # Las filas se escriben desde un hilo aparte según se encuentran y se sincronizan a disco cada pocos segundos
+            writer = StreamingCSVWriter(f, fieldnames=config.CSV_COLUMNS)
             try:
-                driver_path = ChromeDriverManager().install()
-                logger.info(f"ChromeDriver listo en: {driver_path}")
-            except Exception as e:
-                logger.critical("No se pudo instalar ChromeDriver.", exc_info=True)
-                return # Salir si no hay driver
-
-            ai_agent = RelevanceAgent() # Asume que RelevanceAgent ya usa Secrets Manager internamente
-
-            # Agrupar por subindustria para procesar como lo hacías
-            for sub_industry_group, df_industry_instructions in df_instructions.groupby('Sub industry'):
-                logger.info(f"\n=================================================")
-                logger.info(f"  PROCESANDO SUBINDUSTRIA: '{sub_industry_group}'")
-                logger.info(f"=================================================\n")
-
-                if df_industry_instructions.empty:
-                    logger.warning(f"No hay instrucciones para '{sub_industry_group}'.")
-                    continue
-
-                # Crear scrapers (puedes mover esto fuera del bucle si prefieres)
-                scrapers = {
-                    'amazon': AmazonScraper(driver_path=driver_path, relevance_agent=ai_agent),
-                    'mumzworld': MumzworldScraper(driver_path=driver_path, relevance_agent=ai_agent),
-                    'saco': SacoScraper(driver_path=driver_path, relevance_agent=ai_agent),
-                    'fine': FineScraper(driver_path=driver_path, relevance_agent=ai_agent),
-                    'gogreen': GoGreenScraper(driver_path=driver_path, relevance_agent=ai_agent),
-                    'officesupply': OfficeSupplyScraper(driver_path=driver_path, relevance_agent=ai_agent),
-                    'aerosense': AeroSenseScraper(driver_path=driver_path) # Aerosense no usa AI agent? Verificar
-                }
-
-                all_found_products_for_group = [] # Acumular productos por grupo
-
-                for index, row in df_industry_instructions.iterrows():
-                    # ... (lógica para extraer base_keyword, modifiers, search_keyword, search_mode - sin cambios) ...
-                    sub_industry = row['Sub industry'] # Asegurar que sub_industry se define aquí
-                    original_type_of_product = str(row['Type of product'])
-                    original_type_of_product_lower = original_type_of_product.lower()
-                    generic_type_of_product = str(row['Generic product type'])
-
-                    try:
-                        base_keyword = original_type_of_product_lower.split('-', 1)[1].strip()
-                    except IndexError:
-                        base_keyword = original_type_of_product_lower.strip()
-
-                    search_modifiers_val = row.get('Search Modifiers')
-                    site_specific_keywords = {}
-                    general_modifiers = []
-
-                    if pd.notna(search_modifiers_val):
-                        search_modifiers_str = str(search_modifiers_val)
-                        modifiers = search_modifiers_str.split(';')
-                        for mod in modifiers:
-                            mod = mod.strip()
-                            if ':' in mod:
-                                site, keyword = mod.split(':', 1)
-                                site = site.strip().lower() # asegurar minúsculas
-                                keyword = keyword.strip()
-                                if site not in site_specific_keywords:
-                                    site_specific_keywords[site] = []
-                                site_specific_keywords[site].append(keyword)
-                            elif mod:
-                                general_modifiers.append(mod)
-
-                    general_modifiers_text = " ".join(general_modifiers)
-                    search_keyword = f"{base_keyword} {general_modifiers_text}".strip()
-
-                    search_mode = 'units' if any(kw in original_type_of_product_lower for kw in ['wipes', 'rags', 'microfiber', 'brush']) else 'volume'
-                    # ... (fin lógica extracción) ...
-
-                    logger.info(f">> Buscando '{base_keyword}' para '{sub_industry}' (Modo: {search_mode})")
-                    # ... (lógica de sitios a scrapear, exclusiones - sin cambios) ...
-                    sites_to_scrape = config.TARGET_MAP.get(sub_industry, []).copy()
-
-                    if base_keyword in config.MUMZWORLD_EXCLUSIONS and 'mumzworld' in sites_to_scrape:
-                        sites_to_scrape.remove('mumzworld')
-                        logger.debug(f"Excluyendo Mumzworld para '{base_keyword}'")
-
-                    if base_keyword in config.SACO_EXCLUSIONS and 'saco' in sites_to_scrape:
-                        sites_to_scrape.remove('saco')
-                        logger.debug(f"Excluyendo Saco para '{base_keyword}'")
-
-
-                    for site_name in sites_to_scrape:
-                        scraper = scrapers.get(site_name)
-                        if scraper:
-                            # Decidir qué keyword usar: específico del sitio o el general
-                            keywords_to_use = site_specific_keywords.get(site_name, [search_keyword])
-
-                            for keyword_to_use in keywords_to_use:
-                                # Lógica para sitios B2B que requieren keyword específica
-                                if site_name in ['fine', 'gogreen', 'officesupply', 'aerosense']:
-                                     if site_name not in site_specific_keywords and not general_modifiers: # Saltar si no hay keyword específica Y TAMPOCO modificadores generales
-                                        logger.warning(f"Saltando '{site_name}' para '{base_keyword}' porque no se proveyó keyword específica o modificador general.")
-                                        continue
-
-                                logger.info(f"   -> Buscando en '{site_name}' con keyword: '{keyword_to_use}'")
-                                try:
-                                    found_products = scraper.scrape(keyword_to_use, search_mode)
-                                except Exception as scrape_error:
-                                     logger.error(f"Error durante scraping de '{site_name}' con keyword '{keyword_to_use}'.", exc_info=True)
-                                     found_products = [] # Continuar con el siguiente sitio/keyword
-
-                                b2c_subindustries = ['home', 'automotive', 'pets'] # Usar minúsculas para comparación
-                                channel_value = 'B2C' if sub_industry.lower() in b2c_subindustries else 'B2B'
-
-                                for product in found_products:
-                                    row_data = {
-                                        # ... (mapeo de datos - sin cambios) ...
-                                        'date': time.strftime("%Y-%m-%d"),
-                                        'industry': df_industry_instructions.iloc[0]['Industry'], # Obtener de la primera fila del grupo
-                                        'subindustry': sub_industry,
-                                        'type_of_product': original_type_of_product,
-                                        'generic_product_type': generic_type_of_product,
-                                        'product': product.get('Product'),
-                                        'price_sar': product.get('Price_SAR'),
-                                        'company': product.get('Company'),
-                                        'source': site_name,
-                                        'url': product.get('URL'),
-                                        'unit_of_measurement': product.get('Unit of measurement'),
-                                        'total_quantity': product.get('Total quantity'),
-                                        'channel': channel_value,
-                                    }
-                                    all_found_products_for_group.append(row_data)
-                                    logger.debug(f"    -> Producto añadido: {product.get('Product', 'N/A')[:60]}...") # Cambiado a DEBUG para menos verbosidad
-                        else:
-                            logger.warning(f"   -> No se encontró scraper para '{site_name}'.")
-
-                # Escribir los resultados del grupo actual al archivo CSV
-                if all_found_products_for_group:
-                    logger.info(f"Escribiendo {len(all_found_products_for_group)} productos encontrados para '{sub_industry_group}' en '{OUTPUT_SCRAPING_FILE}'...")
-                    writer.writerows(all_found_products_for_group)
+                if resuming and not store:
+                    completed_rows = journal.completed_rows()
+                    writer.writerows(completed_rows)
+                    logger.info(f"Reescritas {len(completed_rows)} filas de búsquedas ya completadas desde el journal.")
+
+                logger.info("Descargando y configurando ChromeDriver...")
+                try:
+                    driver_path = ChromeDriverManager().install()
+                    logger.info(f"ChromeDriver listo en: {driver_path}")
+                except Exception as e:
+                    logger.critical("No se pudo instalar ChromeDriver.", exc_info=True)
+                    return # Salir si no hay driver
+
+                # Memoria de búsquedas (sitio, keyword, modo) ya hechas en esta ejecución
+                result_cache = SearchResultCache()
+
+                if WORKERS > 1:
+                    # Cada worker crea su propio pool de navegadores y su RelevanceAgent
+                    run_scraping_parallel(pending_tasks, driver_path, writer, journal, result_cache, store)
                 else:
-                    logger.info(f"No se encontraron productos para guardar en '{sub_industry_group}'.")
+                    ai_agent = RelevanceAgent(RELEVANCE_CACHE_FILE, RELEVANCE_MODEL_FILE) # Asume que RelevanceAgent ya usa Secrets Manager internamente
+
+                    # Un solo pool de navegadores para toda la ejecución; los scrapers piden prestado un driver por búsqueda
+                    driver_pool = DriverPool(driver_path, size=DRIVER_POOL_SIZE).start()
+                    scrapers = build_scrapers(driver_pool, StagingRelevanceAgent(ai_agent) if store else ai_agent)
+                    page_cache = PageCache(PAGE_CACHE_DIR) if PAGE_CACHE_DIR else None
+                    set_page_cache(page_cache)
 
-                logger.info(f"Proceso para '{sub_industry_group}' completado.")
-                logger.info("Descansando 5 segundos antes de la siguiente subindustria...") # Reducido tiempo de descanso?
-                time.sleep(5)
+                    try:
+                        try:
+                            run_scraping(pending_tasks, scrapers, writer, journal, result_cache, store)
+                        finally:
+                            driver_pool.close()
+                        # Con el navegador ya cerrado, la IA clasifica todos los candidatos a la vez
+                        if store:
+                            run_relevance_stage(store, writer, ai_agent)
+                    finally:
+                        report_fetch_stats()
+                        get_scheduler().report()
+                        if page_cache:
+                            page_cache.report()
+                            page_cache.close()
+                        ai_agent.report()
+                        ai_agent.close()
+
+                if store and WORKERS > 1:
+                    run_relevance_stage(store, writer)
+                result_cache.report()
+                # El journal solo se da por terminado si todas las filas llegaron al disco
+                writer.close()
+                journal.finish()
+            finally:
+                writer.close()
 
     except IOError as e:
         logger.critical(f"Error fatal al abrir/escribir en '{OUTPUT_SCRAPING_FILE}'.", exc_info=True)
+        sys.exit(1)
     except Exception as e:
         logger.critical("Error inesperado en el proceso principal de scraping.", exc_info=True)
+        sys.exit(1)
+    finally:
+        journal.close()
+        if store:
+            store.close()
 
     logger.info("\n\n--- PROCESO DE SCRAPING COMPLETADO ---")
 
 
 if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
     try:
         # sys.stdout.reconfigure ya no es necesario con logging bien configurado
         main()
@@ -1,11 +1,6 @@
-import xmlrpc.client
 import os
 import pandas as pd
 import argparse
-import boto3
-import json
-import base64
-from botocore.exceptions import ClientError
 import sys
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
@@ -14,23 +9,6 @@ from log_config import get_logger
 
 logger = get_logger()
 
-def get_secret(secret_name, region_name="eu-north-1"):
-    session = boto3.session.Session()
-    client = session.client(service_name='secretsmanager', region_name=region_name)
-    try:
-        get_secret_value_response = client.get_secret_value(SecretId=secret_name)
-    except ClientError as e:
-        logger.error(f"Error al obtener el secreto '{secret_name}': {e}", exc_info=True)
-        raise e
-    else:
-        if 'SecretString' in get_secret_value_response:
-            secret = get_secret_value_response['SecretString']
-            return json.loads(secret)
-        else:
-            decoded_binary_secret = base64.b64decode(get_secret_value_response['SecretBinary'])
-            return json.loads(decoded_binary_secret)
-
-
 parser = argparse.ArgumentParser(description="Genera la lista de productos/subindustrias para scraping.")
 parser.add_argument('--input_odoo_products_file', default='ml_model/wayakit_products.csv',
                     help="Archivo CSV de entrada con productos de Odoo (ej. wayakit_products.csv o wayakit_new_products_temp.csv).")
@@ -40,35 +18,11 @@ parser.add_argument('--modifiers_file', default='scraper/modifiers_mapping.csv',
                     help="Archivo CSV con mapeo de modificadores de búsqueda.")
 args = parser.parse_args()
 
-SECRET_NAME = "prod/wayakit-app"
-AWS_REGION = "eu-north-1"
-try:
-    secrets = get_secret(SECRET_NAME, AWS_REGION)
-    ODOO_URL = secrets.get('ODOO_URL')
-    ODOO_DB = secrets.get('ODOO_DB')
-    ODOO_USERNAME = secrets.get('ODOO_USERNAME')
-    API_TOKEN = secrets.get('ODOO_API_TOKEN')
-    if not all([ODOO_URL, ODOO_DB, ODOO_USERNAME, API_TOKEN]):
-        logger.error("Faltan secretos esenciales de Odoo recuperados.")
-        exit(1)
-    logger.info(f"Secretos cargados para DB: {ODOO_DB}")
-except Exception as e:
-    logger.critical(f"No se pudieron cargar los secretos.", exc_info=True)
-    exit(1)
-
 INPUT_ODOO_FILE = args.input_odoo_products_file
 OUTPUT_ANALYSIS_FILE = args.output_analysis_file
 MODIFIERS_FILE = args.modifiers_file
 
-try:
-    common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common')
-    uid = common.authenticate(ODOO_DB, ODOO_USERNAME, API_TOKEN, {})
-    models = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/object')
-    logger.info(f"Autenticación Odoo exitosa. UID: {uid}")
-except Exception as e:
-    logger.error(f"Error de autenticación Odoo.", exc_info=True)
-    exit(1)
-
+# Este paso solo lee el CSV exportado por ml_model/odoo_api_products.py: no necesita conexión con Odoo
 logger.info(f"Leyendo archivo de productos Odoo: '{INPUT_ODOO_FILE}'")
 try:
     df_odoo_products = pd.read_csv(INPUT_ODOO_FILE)
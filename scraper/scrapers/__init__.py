@@ -0,0 +1,19 @@
+from scrapers.amazon_scraper import AmazonScraper
+from scrapers.mumzworld_scraper import MumzworldScraper
+from scrapers.saco_scraper import SacoScraper
+from scrapers.fine_scraper import FineScraper
+from scrapers.gogreen_scraper import GoGreenScraper
+from scrapers.officesupply_scraper import OfficeSupplyScraper
+from scrapers.aerosense_scraper import AeroSenseScraper
+
+
+def build_scrapers(driver_pool, relevance_agent):
+    return {
+        'amazon': AmazonScraper(driver_pool=driver_pool, relevance_agent=relevance_agent),
+        'mumzworld': MumzworldScraper(driver_pool=driver_pool, relevance_agent=relevance_agent),
+        'saco': SacoScraper(driver_pool=driver_pool, relevance_agent=relevance_agent),
+        'fine': FineScraper(driver_pool=driver_pool, relevance_agent=relevance_agent),
+        'gogreen': GoGreenScraper(driver_pool=driver_pool, relevance_agent=relevance_agent),
+        'officesupply': OfficeSupplyScraper(driver_pool=driver_pool, relevance_agent=relevance_agent),
+        'aerosense': AeroSenseScraper(driver_pool=driver_pool) # Aerosense no usa AI agent
+    }
@@ -1,22 +1,15 @@
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 import re
-import time
 from utils import extract_aerosense_units 
-import config
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+from services.fetcher import PageFetcher
 from log_config import get_logger
 
 logger = get_logger()
 
 class AeroSenseScraper:
-    def __init__(self, driver_path):
-        self.driver_path = driver_path
+    def __init__(self, driver_pool):
+        self.driver_pool = driver_pool
         self.base_url = "https://www.aero-sense.com/en/online-shop/cabin-and-exterior-cleaning"
+        self.fetcher = PageFetcher('aerosense', driver_pool)
     
     def _log(self, msg):
         logger.info(msg)
@@ -39,40 +32,17 @@ class AeroSenseScraper:
         
         return volume_ml
 
-    def scrape(self, search_term, mode='volume'):
+    def scrape(self, search_term, mode='volume', on_product=None):
         product_slug = search_term.replace(' ', '-').lower()
         product_url = f"{self.base_url}/{product_slug}"
         
         self._log(f"Navigating directly to AeroSense product page: {product_url}")
         
-        service = ChromeService(executable_path=self.driver_path)
-        options = webdriver.ChromeOptions()
-        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--disable-notifications')
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--disable-webgl')
-        options.add_argument('--disable-3d-apis')
-        options.add_argument(f"user-agent={config.USER_AGENT}")
-        options.add_argument('--log-level=3')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-extensions ')
-        options.add_argument('--disable-browser-side-navigation')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        driver = webdriver.Chrome(service=service, options=options)
-        
         products_found = []
         
         try:
-            driver.get(product_url)
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "h1 div.field--name-title"))
-            )
-            
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            # Página estática: normalmente basta con HTTP y no se pide ningún navegador al pool
+            soup = self.fetcher.get_soup(product_url, "h1 div.field--name-title", timeout=20, cache=True)
 
             product_name_tag = soup.select_one('h1 div.field--name-title')
             product_name = product_name_tag.text.strip() if product_name_tag else "Unknown Product"
@@ -117,12 +87,11 @@ class AeroSenseScraper:
                     'URL': product_url
                 }
                 products_found.append(product_data)
+                if on_product:
+                    on_product(product_data)
 
         except Exception as e:
             logger.error(f"An error occurred while scraping {product_url}", exc_info=True)
-        finally:
-            if driver:
-                driver.quit()
         
         return products_found
 
@@ -4,19 +4,19 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from urllib.parse import urljoin
 from utils import parse_volume_string, parse_count_string
+from services.fetcher import PageFetcher
+from services.listing_filter import ListingFilter
 import config
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
 from log_config import get_logger
 
 logger = get_logger()
 
 class AmazonScraper:
-    def __init__(self, driver_path, relevance_agent):
-        self.driver_path = driver_path
+    def __init__(self, driver_pool, relevance_agent):
+        self.driver_pool = driver_pool
         self.relevance_agent = relevance_agent 
         self.base_url = "https://www.amazon.sa"
+        self.fetcher = PageFetcher('amazon', driver_pool)
 
     def _log(self, msg):
         logger.info(msg)
@@ -39,7 +39,7 @@ class AmazonScraper:
         return results
 
     
-    def _extract_details_from_product_page(self, soup, search_mode, keyword):
+    def _extract_details_from_product_page(self, soup, search_mode, keyword, defer_ai_units=False):
         details = {
             'Product': None, 'Price_SAR': '0.00', 'Company': 'Company not found',
             'Unit of measurement': 'units', 'Total quantity': 0, 'Validation_Status': 'Not Found'
@@ -63,7 +63,9 @@ class AmazonScraper:
             kw = keyword.lower()
             is_wipes_or_rags = ('wipes' in kw) or ('rags' in kw)
 
-            if is_wipes_or_rags:
+            if is_wipes_or_rags and defer_ai_units:
+                logger.debug("      -> Wipes/Rags detected. AI unit count submitted by the caller...")
+            elif is_wipes_or_rags:
                 logger.debug("      -> Wipes/Rags detected. Using AI for unit count...")
                 ai_units = self.relevance_agent.extract_wipes_units(raw_title)
                 if ai_units > 0:
@@ -115,61 +117,82 @@ class AmazonScraper:
             
         return details
     
-    def scrape(self, keyword, search_mode):
+    def _save_if_relevant(self, product_details, listing, found_products, on_product):
+        product_title = product_details['Product']
+        if product_details.get('Total quantity', 0) > 0:
+            if listing.is_relevant(product_title):
+                found_products.append(product_details)
+                if on_product:
+                    on_product(product_details)
+                logger.info(f"      -> ✅ RELEVANT & VALID. Product saved.")
+            else:
+                logger.info(f"      -> DISCARDED (Not relevant by AI): {product_title[:60]}...")
+        else:
+            logger.info(f"      -> DISCARDED (No quantity found by extractor): {product_title[:60]}...")
+
+    def _collect_wipes_units(self, pending, listing, found_products, on_product, products_to_find):
+        product_details, units_job = pending
+        if len(found_products) >= products_to_find:
+            return
+        try:
+            ai_units = units_job.result()
+        except Exception:
+            # Igual que en el camino síncrono: sin conteo de la IA el candidato queda sin cantidad
+            logger.error(f"      ! AI wipes unit count failed for: {product_details['Product'][:60]}...", exc_info=True)
+            ai_units = None
+        if ai_units and ai_units > 0:
+            product_details['Total quantity'] = ai_units
+            product_details['Validation_Status'] = 'AI Wipes Units'
+        self._save_if_relevant(product_details, listing, found_products, on_product)
+
+    def scrape(self, keyword, search_mode, on_product=None):
         self._log(f"   [Amazon Scraper] Searching: '{keyword}' (Mode: {search_mode})")
         found_products = []
         products_to_find = 40
         search_url = f"{self.base_url}/s?k={keyword.replace(' ', '+')}&language=en_AE"
+        listing = ListingFilter('amazon', self.relevance_agent, keyword)
+        # Solo en modo unidades (sin toallitas) la cantidad sale únicamente del título
+        kw = keyword.lower()
+        ai_units_mode = search_mode == 'units' and ('wipes' in kw or 'rags' in kw)
+        title_quantity = parse_count_string if search_mode == 'units' and not ai_units_mode else None
+        # Conteos de toallitas encargados a Gemini mientras se siguen visitando páginas
+        pending_units = []
 
-        service = ChromeService(executable_path=self.driver_path)
-        options = webdriver.ChromeOptions()
-        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--disable-notifications')
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--disable-webgl')
-        options.add_argument('--disable-3d-apis')
-        options.add_argument(f"user-agent={config.USER_AGENT}")
-        options.add_argument('--log-level=3')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-extensions ')
-        options.add_argument('--disable-browser-side-navigation')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = self.driver_pool.acquire('amazon')
 
         try:
             driver.get(search_url)
-            import time; time.sleep(3)
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-component-type='s-search-result']")))
+            WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-component-type='s-search-result']")))
             soup = BeautifulSoup(driver.page_source, 'html.parser')
-            product_containers = soup.find_all('div', {'data-component-type': 's-search-result'})
+            # Los anuncios (patrocinados) se descartan antes de gastar peticiones de relevancia en ellos
+            listed_products = []
+            for container in soup.find_all('div', {'data-component-type': 's-search-result'}):
+                link_tag = container.find('a', class_='a-link-normal')
+                if link_tag and 'spons' not in link_tag.get('href', ''):
+                    listed_products.append((container, link_tag))
+
+            # Relevancia de toda la página de resultados en una sola petición por lote
+            listing.classify([self._safe_get_text(container.find('h2')) for container, _ in listed_products], title_quantity)
 
-            for container in product_containers:
+            for container, link_tag in listed_products:
                 if len(found_products) >= products_to_find:
                     break
 
-                link_tag = container.find('a', class_='a-link-normal')
-                if not link_tag or 'spons' in link_tag.get('href', ''):
-                    continue
                 product_url = urljoin(self.base_url, link_tag['href'])
+                if not listing.accept(self._safe_get_text(container.find('h2')), title_quantity):
+                    continue
                 self._log(f"      > Visiting product page: {product_url[:120]}...")
-                driver.get(product_url)
                 try:
-                    WebDriverWait(driver, 10).until(EC.any_of(
-                        EC.presence_of_element_located((By.ID, "productDetails_techSpec_section_1")),
-                        EC.presence_of_element_located((By.ID, "detailBullets_feature_div")),
-                        EC.presence_of_element_located((By.CLASS_NAME, "po-item_volume"))
-                    ))
+                    product_soup = self.fetcher.get_soup(
+                        product_url,
+                        "#productDetails_techSpec_section_1, #detailBullets_feature_div, .po-item_volume",
+                        timeout=10, driver=driver, cache=True
+                    )
                 except Exception:
                     logger.warning("      ! Details section not found, skipping.")
                     continue
                 
-                product_soup = BeautifulSoup(driver.page_source, 'html.parser')
-                
-                product_details = self._extract_details_from_product_page(product_soup, search_mode, keyword)
+                product_details = self._extract_details_from_product_page(product_soup, search_mode, keyword, defer_ai_units=ai_units_mode)
                 product_details['URL'] = product_url
                 product_title = product_details.get('Product')
 
@@ -177,22 +200,24 @@ class AmazonScraper:
                     logger.warning(f"      -> DISCARDED (No title found)")
                     continue
 
-                if product_details.get('Total quantity', 0) > 0:
-                    is_relevant = self.relevance_agent.is_relevant(product_title, keyword)
-                    time.sleep(2)
-
-                    if is_relevant:
-                        found_products.append(product_details)
-                        logger.info(f"      -> ✅ RELEVANT & VALID. Product saved.")
-                    else:
-                        logger.info(f"      -> DISCARDED (Not relevant by AI): {product_title[:60]}...")
-                else:
-                    logger.info(f"      -> DISCARDED (No quantity found by extractor): {product_title[:60]}...")
+                if ai_units_mode:
+                    pending_units.append((product_details, self.relevance_agent.submit_wipes_units(product_title)))
+                    # Tope de conteos en vuelo: se recoge el más antiguo antes de seguir visitando páginas,
+                    # así solo cuentan para el límite los productos ya aceptados
+                    while len(pending_units) >= config.WIPES_UNITS_IN_FLIGHT:
+                        self._collect_wipes_units(pending_units.pop(0), listing, found_products, on_product, products_to_find)
+                    continue
+
+                self._save_if_relevant(product_details, listing, found_products, on_product)
                 
         except Exception as e:
             logger.error(f"      ! Unexpected error occurred in Amazon scraper", exc_info=True)
         finally:
-            if driver:
-                driver.quit()
+            self.driver_pool.release(driver)
+
+        # El navegador ya está libre: solo queda recoger los conteos de la IA
+        for pending in pending_units:
+            self._collect_wipes_units(pending, listing, found_products, on_product, products_to_find)
+        listing.report()
 
         return found_products
\ No newline at end of file
@@ -1,27 +1,27 @@
-import time
 import re
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, ElementClickInterceptedException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, quote
 from utils import parse_volume_string, parse_count_string
-import config
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+from services.fetcher import PageFetcher
+from services.listing_filter import ListingFilter
 from log_config import get_logger
 
 logger = get_logger()
 
 
 class FineScraper:
-    def __init__(self, driver_path, relevance_agent):
-        self.driver_path = driver_path
+    def __init__(self, driver_pool, relevance_agent):
+        self.driver_pool = driver_pool
         self.relevance_agent = relevance_agent
         self.base_url = "https://ksa.finestore.com/en"
         self.products_to_find_limit = 5
+        self.max_listing_pages = 5
+        self.max_candidates = 40
+        self.fetcher = PageFetcher('fine', driver_pool)
 
     def _log(self, msg):
         logger.info(msg)
@@ -29,15 +29,6 @@ class FineScraper:
     def _safe_get_text(self, element):
         return element.get_text(strip=True) if element else None
 
-    def _close_modal(self):
-        try:
-            js_script = 'document.querySelectorAll(".newsletter, .subscribe, .popup, .ecomz-popup, .modal, .overlay").forEach(function(e){e.style.display="none"});'
-            self.driver.execute_script(js_script)
-            time.sleep(0.3)
-            return True
-        except Exception:
-            return False
-
     def _extract_price(self, soup):
         try:
             price_element = soup.select_one("div.ecomz-product-price-style")
@@ -132,24 +123,9 @@ class FineScraper:
         }
         
         try:
-            for _ in range(2):
-                try:
-                    WebDriverWait(driver, 8).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.ecomz-product-name-style"))
-                    )
-                    break
-                except TimeoutException:
-                    self._close_modal()
-                    time.sleep(0.5)
-
-            try:
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.ecomz-product-price-style"))
-                )
-            except TimeoutException:
-                pass
-
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            # Se espera al precio, que se pinta después del nombre: sin él el producto no sería válido
+            # y así solo entran en la caché páginas completas
+            soup = self.fetcher.get_soup(product_url, "div.ecomz-product-price-style", timeout=13, driver=driver, cache=True)
 
             details['Product'] = (
                 self._safe_get_text(soup.select_one("span.mg-l-0.f-xs-18")) or
@@ -178,6 +154,8 @@ class FineScraper:
                 details['Unit of measurement'] = final_data['unit']
                 details['Total quantity'] = final_data['quantity'] * multiplier
 
+        except TimeoutException:
+            logger.warning(f"      ! Product page without price, skipping: {product_url[:100]}")
         except Exception as e:
             logger.error(f"      ! Error extracting details from {product_url}", exc_info=True)
 
@@ -199,149 +177,94 @@ class FineScraper:
             
         return True, "Valid"
 
-    def _navigate_to_product(self, driver, link_element, href):
-        for attempt in range(2):
+    def _harvest_listing(self, driver):
+        """(URL, title) of every product on the results pages (up to max_listing_pages), collected in one pass."""
+        products = {}
+        for page_num in range(1, self.max_listing_pages + 1):
             try:
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", link_element)
-                time.sleep(0.4)
-                
-                try:
-                    link_element.click()
-                except Exception:
-                    driver.execute_script("arguments[0].click();", link_element)
-                
-                WebDriverWait(driver, 12).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.ecomz-product-name-style"))
+                WebDriverWait(driver, 15).until(
+                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.listing-page a.display-flex"))
                 )
-                return True
-                
-            except Exception:
-                if attempt == 0:
-                    self._close_modal()
-                    if href:
-                        try:
-                            absolute_url = urljoin(self.base_url, href)
-                            driver.get(absolute_url)
-                            WebDriverWait(driver, 12).until(
-                                EC.presence_of_element_located((By.CSS_SELECTOR, "div.ecomz-product-name-style"))
-                            )
-                            return True
-                        except Exception:
-                            continue
-                
-        return False
+            except TimeoutException:
+                if page_num == 1:
+                    raise
+                break
+            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            new_urls = 0
+            for link in soup.select("div.listing-page a.display-flex"):
+                url = urljoin(self.base_url, link['href']) if link.get('href') else None
+                if url and url not in products:
+                    products[url] = link.get('title') or link.get_text(" ", strip=True)
+                    new_urls += 1
+            logger.debug(f"      -> Listing page {page_num}: {new_urls} new product URLs")
+            if not new_urls or len(products) >= self.max_candidates:
+                break
 
-    def scrape(self, keyword, search_mode):
+            try:
+                next_page_button = driver.find_element(By.XPATH, "//a[contains(text(), 'Next')]")
+            except NoSuchElementException:
+                break
+            next_href = next_page_button.get_attribute('href')
+            driver.wait_turn()
+            if next_href and not next_href.startswith('javascript'):
+                driver.get(urljoin(self.base_url, next_href))
+            else:
+                first_link = driver.find_element(By.CSS_SELECTOR, "div.listing-page a.display-flex")
+                driver.execute_script("arguments[0].click();", next_page_button)
+                try:
+                    WebDriverWait(driver, 10).until(EC.staleness_of(first_link))
+                except TimeoutException:
+                    break
+        return list(products.items())[:self.max_candidates]
+
+    def scrape(self, keyword, search_mode, on_product=None):
         self._log(f"  [Fine Scraper] Searching for: '{keyword}' (Mode: {search_mode})")
         
         search_url = f"{self.base_url}/products?keyword={quote(keyword)}"
         all_found_products = []
-        page_num = 1
+        listing = ListingFilter('fine', self.relevance_agent, keyword)
 
-        service = ChromeService(executable_path=self.driver_path)
-        options = webdriver.ChromeOptions()
-        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--disable-notifications')
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--disable-webgl')
-        options.add_argument('--disable-3d-apis')
-        options.add_argument(f"user-agent={config.USER_AGENT}")
-        options.add_argument('--log-level=3')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-extensions ')
-        options.add_argument('--disable-browser-side-navigation')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        self.driver = webdriver.Chrome(service=service, options=options)
+        self.driver = self.driver_pool.acquire('fine')
 
         try:
             self.driver.get(search_url)
-        except Exception as e:
-            logger.error(f"    ! Error loading search URL", exc_info=True)
-            return []
+            listed_products = self._harvest_listing(self.driver)
+            logger.debug(f"      -> Harvested {len(listed_products)} product URLs")
+            listing.classify([title for _, title in listed_products])
 
-        while len(all_found_products) < self.products_to_find_limit:
-            try:
-                WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.listing-page a.display-flex"))
-                )
-                
-                search_page_url = self.driver.current_url
-                time.sleep(1.5)
-
-                link_elements = self.driver.find_elements(By.CSS_SELECTOR, "div.listing-page a.display-flex")
-                num_products = len(link_elements)
-                
-                logger.debug(f"      -> Found {num_products} products on search page")
-                
-                if num_products == 0:
+            # Cada producto se visita directamente: sin volver a cargar la página de resultados
+            for i, (product_url, listing_title) in enumerate(listed_products):
+                if len(all_found_products) >= self.products_to_find_limit:
                     break
+                # La cantidad de Fine sale de la tabla de especificaciones: en el listado solo se filtra por relevancia
+                if not listing.accept(listing_title):
+                    continue
 
-                for i in range(num_products):
-                    if len(all_found_products) >= self.products_to_find_limit:
-                        break
-                        
-                    logger.debug(f"      -> Processing product {i+1}/{num_products}")
-                        
-                    try:
-                        fresh_links = self.driver.find_elements(By.CSS_SELECTOR, "div.listing-page a.display-flex")
-                        if i >= len(fresh_links):
-                            break
-                            
-                        link_element = fresh_links[i]
-                        href = link_element.get_attribute('href')
-
-                        if not self._navigate_to_product(self.driver, link_element, href):
-                            logger.warning(f"      -> Could not navigate to product")
-                            continue
-
-                        self._close_modal()
-                        product_url = self.driver.current_url
-                        product_details = self._extract_product_details(self.driver, product_url, search_mode)
-                        
-                        logger.debug(f"      -> Extracted: {product_details['Product'][:50]}... | Price: {product_details['Price_SAR']} | Qty: {product_details['Total quantity']}")
-
-                        is_valid, validation_msg = self._is_valid_product(product_details)
-                        if not is_valid:
-                            logger.info(f"      -> Validation failed: {validation_msg}")
-                            continue
-
-                        logger.debug(f"      -> Checking AI relevance...")
-                        if self.relevance_agent.is_relevant(product_details.get('Product'), keyword):
-                            all_found_products.append(product_details)
-                            logger.info(f"      -> Product found: {product_details['Product'][:60]}...")
-                        else:
-                            logger.info(f"      -> AI rejected product")
+                logger.debug(f"      -> Processing product {i+1}/{len(listed_products)}")
+                product_details = self._extract_product_details(self.driver, product_url, search_mode)
 
-                    except (StaleElementReferenceException, ElementClickInterceptedException, TimeoutException):
-                        continue
-                    finally:
-                        try:
-                            self.driver.get(search_page_url)
-                            WebDriverWait(self.driver, 8).until(
-                                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.listing-page a.display-flex"))
-                            )
-                            time.sleep(0.5)
-                        except Exception:
-                            pass
+                logger.debug(f"      -> Extracted: {product_details['Product'][:50]}... | Price: {product_details['Price_SAR']} | Qty: {product_details['Total quantity']}")
 
-                try:
-                    next_page_button = self.driver.find_element(By.XPATH, "//a[contains(text(), 'Next')]")
-                    self.driver.execute_script("arguments[0].click();", next_page_button)
-                    page_num += 1
-                except NoSuchElementException:
-                    break
+                is_valid, validation_msg = self._is_valid_product(product_details)
+                if not is_valid:
+                    logger.info(f"      -> Validation failed: {validation_msg}")
+                    continue
 
-            except TimeoutException:
-                break
-            except Exception as e:
-                logger.error(f"    ! Unexpected error", exc_info=True)
-                break
-        
-        if self.driver:
-            self.driver.quit()
+                logger.debug(f"      -> Checking AI relevance...")
+                if listing.is_relevant(product_details.get('Product')):
+                    all_found_products.append(product_details)
+                    if on_product:
+                        on_product(product_details)
+                    logger.info(f"      -> Product found: {product_details['Product'][:60]}...")
+                else:
+                    logger.info(f"      -> AI rejected product")
+
+        except TimeoutException:
+            logger.debug("    > No product listing found.")
+        except Exception as e:
+            logger.error(f"    ! Unexpected error", exc_info=True)
+        finally:
+            self.driver_pool.release(self.driver)
+            listing.report()
 
         return all_found_products
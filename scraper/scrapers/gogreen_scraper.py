@@ -1,27 +1,24 @@
-import time
 import re
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from selenium.common.exceptions import TimeoutException
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, quote
 from utils import parse_volume_with_multiplier, parse_count_string
-import config
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+from services.fetcher import PageFetcher
+from services.listing_filter import ListingFilter
 from log_config import get_logger
 
 logger = get_logger()
 
 class GoGreenScraper:
-    def __init__(self, driver_path, relevance_agent):
-        self.driver_path = driver_path
+    def __init__(self, driver_pool, relevance_agent):
+        self.driver_pool = driver_pool
         self.relevance_agent = relevance_agent
         self.base_url = "https://gogreen.com.sa/"
         self.products_to_find_limit = 5
+        self.fetcher = PageFetcher('gogreen', driver_pool)
 
     def _log(self, msg):
         logger.info(msg)
@@ -57,15 +54,17 @@ class GoGreenScraper:
             logger.error(f"    -> ERROR: Could not set language to English.", exc_info=True)
             return False
 
+    def _parse_title_quantity(self, title, search_mode):
+        return parse_count_string(title) if search_mode == 'units' else parse_volume_with_multiplier(title)
+
     def _extract_product_details(self, driver, product_url, search_mode):
         details = {
             'Product': 'Not found', 'Price_SAR': '0.00', 'Company': 'GoGreen',
             'URL': product_url, 'Unit of measurement': 'units', 'Total quantity': 0
         }
         try:
-            driver.get(product_url)
-            WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, "h1.h5")))
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            # html[lang=en]: una respuesta HTTP en árabe no sirve y se repite en el navegador
+            soup = self.fetcher.get_soup(product_url, "html[lang='en'] h1.h5", timeout=15, driver=driver, cache=True)
 
             name_tag = soup.select_one("h1.h5")
             product_name = self._safe_get_text(name_tag)
@@ -78,11 +77,7 @@ class GoGreenScraper:
                     details['Price_SAR'] = price_text.group(1).replace(',', '')
 
             if product_name:
-                parsed_data = None
-                if search_mode == 'units':
-                    parsed_data = parse_count_string(product_name)
-                else: 
-                    parsed_data = parse_volume_with_multiplier(product_name)
+                parsed_data = self._parse_title_quantity(product_name, search_mode)
 
                 if parsed_data:
                     details['Total quantity'] = parsed_data['quantity']
@@ -94,47 +89,28 @@ class GoGreenScraper:
         
         return details
 
-    def scrape(self, keyword, search_mode):
+    def scrape(self, keyword, search_mode, on_product=None):
         self._log(f"  [GoGreen Scraper] Buscando: '{keyword}' (Modo: {search_mode})")
         all_found_products = []
+        listing = ListingFilter('gogreen', self.relevance_agent, keyword)
+        title_quantity = lambda title: self._parse_title_quantity(title, search_mode)
 
-        service = ChromeService(executable_path=self.driver_path)
-        options = webdriver.ChromeOptions()
-        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--disable-notifications')
-        options.add_argument('--headless=new')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--disable-webgl')
-        options.add_argument('--disable-3d-apis')
-        options.add_argument(f"user-agent={config.USER_AGENT}")
-        options.add_argument('--log-level=3')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-extensions ')
-        options.add_argument('--disable-browser-side-navigation')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        # options.add_argument('--start-maximized')
-        
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = self.driver_pool.acquire('gogreen')
 
         try:
             driver.get(self.base_url)
             if not self._set_language_to_english(driver):
-                if driver:
-                    driver.quit()
                 return []
+            # El idioma se guarda en cookies: las peticiones HTTP las reutilizan
+            self.fetcher.sync_cookies(driver)
             
             search_url = urljoin(self.base_url, f"products?search={quote(keyword)}")
-            driver.get(search_url)
-
-            WebDriverWait(driver, 15).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.card.card-product")))
-            
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = self.fetcher.get_soup(search_url, "html[lang='en'] div.card.card-product", timeout=15, driver=driver)
             product_containers = soup.select("div.card.card-product")
             logger.debug(f"    -> Found {len(product_containers)} products on results page.")
 
+            listing.classify([self._safe_get_text(container.select_one(".card-title")) for container in product_containers], title_quantity)
+
             for container in product_containers:
                 if len(all_found_products) >= self.products_to_find_limit:
                     break
@@ -144,13 +120,17 @@ class GoGreenScraper:
                     continue
                 
                 product_url = urljoin(self.base_url, link_tag['href'])
+                if not listing.accept(self._safe_get_text(container.select_one(".card-title")), title_quantity):
+                    continue
                 logger.debug(f"      -> Processing: {product_url[:80]}...")
                 
                 product_details = self._extract_product_details(driver, product_url, search_mode)
                 
                 if product_details.get('Total quantity', 0) > 0:
-                    if self.relevance_agent.is_relevant(product_details.get('Product'), keyword):
+                    if listing.is_relevant(product_details.get('Product')):
                         all_found_products.append(product_details)
+                        if on_product:
+                            on_product(product_details)
                         logger.info(f"      -> VALID PRODUCT SAVED: {product_details['Product'][:60]}...")
                     else:
                         logger.info(f"      -> DISCARDED (Not relevant by AI): {product_details['Product'][:60]}...")
@@ -162,7 +142,7 @@ class GoGreenScraper:
         except Exception as e:
             logger.error(f"    ! Unexpected error occurred in GoGreen scraper", exc_info=True)
         finally:
-            if driver:
-                driver.quit()
+            self.driver_pool.release(driver)
+            listing.report()
 
         return all_found_products
\ No newline at end of file
@@ -5,19 +5,18 @@ from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, quote
 from utils import parse_volume_string
-import config
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+from services.fetcher import PageFetcher
+from services.listing_filter import ListingFilter
 from log_config import get_logger
 
 logger = get_logger()
 
 class MumzworldScraper:
-    def __init__(self, driver_path, relevance_agent):
-        self.driver_path = driver_path
+    def __init__(self, driver_pool, relevance_agent):
+        self.driver_pool = driver_pool
         self.relevance_agent = relevance_agent 
         self.base_url = "https://www.mumzworld.com/sa-en/"
+        self.fetcher = PageFetcher('mumzworld', driver_pool)
 
     def _log(self, msg):
         logger.info(msg)
@@ -34,15 +33,16 @@ class MumzworldScraper:
         quantity = int(match.group(1))
         return {'quantity': quantity, 'unit': 'units', 'normalized': quantity}
 
+    def _parse_title_quantity(self, title, search_mode):
+        return self._parse_mumzworld_count_string(title) if search_mode == 'units' else parse_volume_string(title)
+
     def _extract_product_details(self, driver, product_url, search_mode):
         details = {
             'Product': 'Not found', 'Price_SAR': '0.00', 'Company': 'Not found',
             'URL': product_url, 'Unit of measurement': 'units', 'Total quantity': 0
         }
         try:
-            driver.get(product_url)
-            WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, "h1.ProductDetails_productName__lcVK_")))
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = self.fetcher.get_soup(product_url, "h1.ProductDetails_productName__lcVK_", timeout=15, driver=driver, cache=True)
 
             product_name_tag = soup.find('h1', class_='ProductDetails_productName__lcVK_')
             product_name = self._safe_get_text(product_name_tag)
@@ -50,7 +50,7 @@ class MumzworldScraper:
                 details['Product'] = product_name
                 details['Company'] = product_name.split(' - ')[0].strip() if ' - ' in product_name else product_name.split(' ')[0].strip()
 
-                parsed_data = self._parse_mumzworld_count_string(product_name) if search_mode == 'units' else parse_volume_string(product_name)
+                parsed_data = self._parse_title_quantity(product_name, search_mode)
                 if parsed_data:
                     base_quantity = parsed_data['quantity']
                     multiplier_match = re.search(r'(?:pack of|x|of)\s*(\d+)', product_name, re.IGNORECASE)
@@ -70,30 +70,15 @@ class MumzworldScraper:
             logger.error(f"      ! Error extracting details from {product_url}", exc_info=True)
         return details
 
-    def scrape(self, keyword, search_mode):
+    def scrape(self, keyword, search_mode, on_product=None):
         self._log(f"  [Mumzworld Scraper] Searching: '{keyword}' (Mode: {search_mode})")
         search_url = f"{self.base_url}search?q={quote(keyword)}"
         valid_products_found = []
         products_to_find = 7
+        listing = ListingFilter('mumzworld', self.relevance_agent, keyword)
+        title_quantity = lambda title: self._parse_title_quantity(title, search_mode)
 
-        service = ChromeService(executable_path=self.driver_path)
-        options = webdriver.ChromeOptions()
-        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--disable-notifications')
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--disable-webgl')
-        options.add_argument('--disable-3d-apis')
-        options.add_argument(f"user-agent={config.USER_AGENT}")
-        options.add_argument('--log-level=3')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-extensions ')
-        options.add_argument('--disable-browser-side-navigation')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = self.driver_pool.acquire('mumzworld')
 
         try:
             logger.info(f"    > Navigating to: {search_url}")
@@ -108,22 +93,28 @@ class MumzworldScraper:
                 logger.warning("    ! Warning: No product containers found.")
                 return []
 
+            listing.classify([
+                self._safe_get_text(container.find('a', class_='ProductCard_productName__Dz1Yx')) for container in product_containers
+            ], title_quantity)
+
             for container in product_containers:
                 if len(valid_products_found) >= products_to_find:
                     logger.info(f"    > Limit of {products_to_find} VALID products reached.")
                     break
 
                 link_tag = container.find('a', class_='ProductCard_productName__Dz1Yx')
-                if link_tag and link_tag.has_attr('href'):
+                if link_tag and link_tag.has_attr('href') and listing.accept(self._safe_get_text(link_tag), title_quantity):
                     product_url = urljoin(self.base_url, link_tag['href'])
                     logger.debug(f"      -> Visiting: {product_url[:80]}...")
                     product_details = self._extract_product_details(driver, product_url, search_mode)
 
                     if product_details.get('Total quantity', 0) > 0:
-                        is_relevant = self.relevance_agent.is_relevant(product_details.get('Product'), keyword)
+                        is_relevant = listing.is_relevant(product_details.get('Product'))
                         
                         if is_relevant:
                             valid_products_found.append(product_details)
+                            if on_product:
+                                on_product(product_details)
                             logger.info(f"      -> VALID. Extracted: {product_details['Product'][:60]}...")
                         else:
                             logger.info(f"      -> DISCARDED (Not relevant by AI): {product_details['Product'][:60]}...")
@@ -132,7 +123,7 @@ class MumzworldScraper:
         except Exception as e:
             logger.error(f"    ! Unexpected error occurred in Mumzworld scraper", exc_info=True)
         finally:
-            if driver:
-                driver.quit()
+            self.driver_pool.release(driver)
+            listing.report()
 
         return valid_products_found
\ No newline at end of file
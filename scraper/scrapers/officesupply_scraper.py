@@ -1,26 +1,20 @@
-import time
 import re
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, quote
 from utils import parse_volume_with_multiplier, parse_count_string
-import config
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+from services.fetcher import PageFetcher
+from services.listing_filter import ListingFilter
 from log_config import get_logger
 
 logger = get_logger()
 
 class OfficeSupplyScraper:
-    def __init__(self, driver_path, relevance_agent):
-        self.driver_path = driver_path
+    def __init__(self, driver_pool, relevance_agent):
+        self.driver_pool = driver_pool
         self.relevance_agent = relevance_agent
         self.base_url = "https://officesupply.sa/en/"
         self.products_to_find_limit = 8
+        self.fetcher = PageFetcher('officesupply', driver_pool)
 
     def _log(self, msg):
         logger.info(msg)
@@ -55,7 +49,10 @@ class OfficeSupplyScraper:
             price = price + '.00'
         return price
 
-    def _extract_product_details(self, driver, product_url, search_mode):
+    def _parse_title_quantity(self, title, search_mode):
+        return parse_count_string(title) if search_mode == 'units' else parse_volume_with_multiplier(title)
+
+    def _extract_product_details(self, pages, product_url, search_mode):
         logger.debug(f"        -> Extracting details from: {product_url}")
         details = {
             'Product': 'Not found', 'Price_SAR': '0.00', 'Company': 'Brand not found',
@@ -63,15 +60,9 @@ class OfficeSupplyScraper:
         }
 
         try:
-            driver.get(product_url)
-            
             logger.debug("        -> Waiting for product price to load...")
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "span.ty-price-num"))
-            )
+            soup = pages.get_soup(product_url, "span.ty-price-num", timeout=15, cache=True)
             logger.debug("        -> Price found! Extracting data.")
-            
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
 
             name_tag = soup.select_one("div.ut2-pb__title h1")
             if name_tag:
@@ -87,11 +78,7 @@ class OfficeSupplyScraper:
                 logger.warning("        -> WARNING: Could not extract price (helper). Partial HTML captured.")
 
             if details['Product'] != 'Not found':
-                parsed_data = None
-                if search_mode == 'units':
-                    parsed_data = parse_count_string(details['Product'])
-                else: 
-                    parsed_data = parse_volume_with_multiplier(details['Product'])
+                parsed_data = self._parse_title_quantity(details['Product'], search_mode)
 
                 if parsed_data:
                     details['Total quantity'] = parsed_data['quantity']
@@ -109,7 +96,7 @@ class OfficeSupplyScraper:
         return details
 
 
-    def scrape(self, keyword, search_mode):
+    def scrape(self, keyword, search_mode, on_product=None):
         self._log(f"  [OfficeSupply Scraper] Buscando: '{keyword}' (Modo: {search_mode})")
         
         search_keyword = quote(keyword)
@@ -119,73 +106,54 @@ class OfficeSupplyScraper:
         )
         
         all_found_products = []
-
-        service = ChromeService(executable_path=self.driver_path)
-        options = webdriver.ChromeOptions()
-        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--disable-notifications')
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--disable-webgl')
-        options.add_argument('--disable-3d-apis')
-        options.add_argument(f"user-agent={config.USER_AGENT}")
-        options.add_argument('--log-level=3')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-extensions ')
-        options.add_argument('--disable-browser-side-navigation')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        driver = webdriver.Chrome(service=service, options=options)
-        
-        try:
-            driver.get(search_url)
-
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.ut2-gl__body"))
-            )
-            
-            logger.info("    > Search results page loaded.")
-            
-            time.sleep(2)
-
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            
-            product_containers = soup.select("div.ut2-gl__body")
-            logger.debug(f"    > Found {len(product_containers)} products on page.")
-
-            product_urls = []
-            for container in product_containers:
-                link_tag = container.select_one("a.product_icon_lnk")
-                if link_tag and link_tag.has_attr('href'):
-                    product_urls.append(urljoin(self.base_url, link_tag['href']))
-
-            logger.debug(f"    > Found {len(product_urls)} product URLs to process.")
-
-            for product_url in product_urls:
-                if len(all_found_products) >= self.products_to_find_limit:
-                    logger.info(f"    > Limit of {self.products_to_find_limit} products reached.")
-                    break
-                
-                product_details = self._extract_product_details(driver, product_url, search_mode)
-                
-                if product_details.get('Total quantity', 0) > 0:
-                    is_relevant = self.relevance_agent.is_relevant(product_details.get('Product'), keyword)
-                    if is_relevant:
-                        all_found_products.append(product_details)
-                        logger.info(f"      -> VALID PRODUCT SAVED: {product_details['Product'][:60]}...")
+        listing = ListingFilter('officesupply', self.relevance_agent, keyword)
+        title_quantity = lambda title: self._parse_title_quantity(title, search_mode)
+
+        # Un driver solo se pide al pool si alguna página necesita el navegador
+        with self.fetcher.session() as pages:
+            try:
+                soup = pages.get_soup(search_url, "div.ut2-gl__body", timeout=15, settle=2)
+                logger.info("    > Search results page loaded.")
+
+                product_containers = soup.select("div.ut2-gl__body")
+                logger.debug(f"    > Found {len(product_containers)} products on page.")
+
+                listed_products = []
+                for container in product_containers:
+                    link_tag = container.select_one("a.product_icon_lnk")
+                    title_tag = container.select_one("a.product-title")
+                    if link_tag and link_tag.has_attr('href'):
+                        listed_products.append((urljoin(self.base_url, link_tag['href']), title_tag.get_text(strip=True) if title_tag else None))
+
+                logger.debug(f"    > Found {len(listed_products)} product URLs to process.")
+                listing.classify([title for _, title in listed_products], title_quantity)
+
+                for product_url, listing_title in listed_products:
+                    if len(all_found_products) >= self.products_to_find_limit:
+                        logger.info(f"    > Limit of {self.products_to_find_limit} products reached.")
+                        break
+                    if not listing.accept(listing_title, title_quantity):
+                        continue
+
+                    product_details = self._extract_product_details(pages, product_url, search_mode)
+
+                    if product_details.get('Total quantity', 0) > 0:
+                        is_relevant = listing.is_relevant(product_details.get('Product'))
+                        if is_relevant:
+                            all_found_products.append(product_details)
+                            if on_product:
+                                on_product(product_details)
+                            logger.info(f"      -> VALID PRODUCT SAVED: {product_details['Product'][:60]}...")
+                        else:
+                            logger.info(f"      -> DISCARDED (Not relevant by AI): {product_details['Product'][:60]}...")
                     else:
-                        logger.info(f"      -> DISCARDED (Not relevant by AI): {product_details['Product'][:60]}...")
-                else:
-                    logger.info(f"      -> DISCARDED (No valid quantity): {product_details.get('Product', 'N/A')[:60]}...")
-
-        except TimeoutException:
-            logger.warning("    > No products found or page took too long to load.")
-        except Exception as e:
-            logger.error(f"    ! Unexpected error occurred during OfficeSupply search", exc_info=True)
-        finally:
-            if driver:
-                driver.quit()
+                        logger.info(f"      -> DISCARDED (No valid quantity): {product_details.get('Product', 'N/A')[:60]}...")
+
+            except TimeoutException:
+                logger.warning("    > No products found or page took too long to load.")
+            except Exception as e:
+                logger.error(f"    ! Unexpected error occurred during OfficeSupply search", exc_info=True)
+            finally:
+                listing.report()
 
         return all_found_products
\ No newline at end of file
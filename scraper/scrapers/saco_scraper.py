@@ -2,23 +2,22 @@ import time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, ElementClickInterceptedException, InvalidSessionIdException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, InvalidSessionIdException, NoSuchElementException
 from bs4 import BeautifulSoup
-from urllib.parse import quote
+from urllib.parse import quote, urljoin
 from utils import parse_volume_string, parse_count_string, parse_saco_count_string
-import config
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+from services.fetcher import PageFetcher
+from services.listing_filter import ListingFilter
 from log_config import get_logger
 
 logger = get_logger()
 
 class SacoScraper:
-    def __init__(self, driver_path, relevance_agent):
-        self.driver_path = driver_path
+    def __init__(self, driver_pool, relevance_agent):
+        self.driver_pool = driver_pool
         self.relevance_agent = relevance_agent
         self.base_url = "https://www.saco.sa/en/"
+        self.fetcher = PageFetcher('saco', driver_pool)
 
     def _log(self, msg):
         logger.info(msg)
@@ -35,13 +34,14 @@ class SacoScraper:
             logger.debug("    > No cookie banner detected. Continuing.")
             pass
 
-    def _extract_product_details(self, driver, product_url, search_mode):
+    def _parse_title_quantity(self, title, search_mode):
+        if search_mode == 'units':
+            return parse_saco_count_string(title) or parse_count_string(title)
+        return parse_volume_string(title)
+
+    def _extract_product_details(self, pages, product_url, search_mode):
         logger.debug(f"        -> Extracting details from: {product_url}")
-        driver.get(product_url)
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "h1.product-title"))
-        )
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        soup = pages.get_soup(product_url, "h1.product-title", timeout=30, cache=True)
         
         details = {
             'Product': 'Not found', 'Price_SAR': '0.00', 'Company': 'Brand not found',
@@ -67,13 +67,7 @@ class SacoScraper:
                     break
 
         if product_name != "Not found":
-            if search_mode == 'units':
-                parsed_data = parse_saco_count_string(product_name)
-                if not parsed_data:
-                    parsed_data = parse_count_string(product_name)
-            else:
-                parsed_data = parse_volume_string(product_name)
-
+            parsed_data = self._parse_title_quantity(product_name, search_mode)
             if parsed_data:
                 details['Total quantity'] = parsed_data['quantity']
                 details['Unit of measurement'] = parsed_data['unit']
@@ -81,149 +75,127 @@ class SacoScraper:
 
         return details
 
-    def scrape(self, keyword, search_mode):
+    def _harvest_listing(self, soup):
+        """(URL, title) of each product on one results page plus the raw href of its `a.next` link (None on the last page)."""
+        products = {}
+        for container in soup.select("div.product-inner-container"):
+            product_link = container.select_one("p.product-name a")
+            if not product_link or not product_link.get_text(strip=True) or not product_link.get('href'):
+                continue
+            products.setdefault(urljoin(self.base_url, product_link['href']), product_link.get_text(strip=True))
+        next_link = soup.select_one("a.next")
+        return list(products.items()), next_link.get('href', '').strip() if next_link else None
+
+    def _click_next_page(self, pages, listing_url):
+        """
+        Click-based flow for a `next` link without a real href (`javascript:`): opens the results page
+        in the browser, clears the cookie banner and clicks the link. (soup, url) of the new page, or None.
+        """
+        driver = pages.driver
+        try:
+            if driver.current_url != listing_url:
+                driver.get(listing_url)
+                WebDriverWait(driver, 25).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.product-inner-container")))
+                self._handle_overlays(driver)
+            next_page_button = driver.find_element(By.CSS_SELECTOR, "a.next")
+            first_product = driver.find_element(By.CSS_SELECTOR, "div.product-inner-container")
+            driver.wait_turn()
+            driver.execute_script("arguments[0].click();", next_page_button)
+            WebDriverWait(driver, 25).until(EC.staleness_of(first_product))
+            WebDriverWait(driver, 25).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.product-inner-container")))
+        except (TimeoutException, NoSuchElementException):
+            return None
+        return BeautifulSoup(driver.page_source, 'html.parser'), driver.current_url
+
+    def scrape(self, keyword, search_mode, on_product=None):
         self._log(f"  [Saco Scraper] Searching: '{keyword}'")
         search_keyword = quote(keyword)
         search_url = f"{self.base_url}search/{search_keyword}"
         
         all_found_products = []
+        visited_urls = set()
         page_num = 1
         products_to_find_limit = 8
+        listing = ListingFilter('saco', self.relevance_agent, keyword)
+        title_quantity = lambda title: self._parse_title_quantity(title, search_mode)
+
+        # Cada página (resultados o producto) se carga una sola vez: los productos se abren por su URL
+        # y la paginación sigue el href de `a.next`, sin volver a la página de resultados.
+        # Si el enlace no tiene href real (`javascript:`) se vuelve al clic de siempre en el navegador
+        listing_url = search_url
+        with self.fetcher.session() as pages:
+            try:
+                try:
+                    listing_soup = pages.get_soup(search_url, "div.product-inner-container", timeout=25)
+                except TimeoutException:
+                    logger.warning("    > No product containers found on the initial page. Skipping keyword.")
+                    return []
+
+                while len(all_found_products) < products_to_find_limit:
+                    logger.info(f"--- Analyzing Page {page_num} ---")
+                    listed_products, next_href = self._harvest_listing(listing_soup)
+                    listed_products = [(url, title) for url, title in listed_products if url not in visited_urls]
+
+                    if not listed_products:
+                        logger.warning("    ! No products found on this page.")
+                        break
 
-        service = ChromeService(executable_path=self.driver_path)
-        options = webdriver.ChromeOptions()
-        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--disable-notifications')
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--disable-webgl')
-        options.add_argument('--disable-3d-apis')
-        options.add_argument(f"user-agent={config.USER_AGENT}")
-        options.add_argument('--log-level=3')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-extensions ')
-        options.add_argument('--disable-browser-side-navigation')
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        driver = webdriver.Chrome(service=service, options=options)
+                    logger.debug(f"    > Found {len(listed_products)} product URLs on this page.")
+                    listing.classify([title for _, title in listed_products], title_quantity)
+
+                    for i, (product_url, listing_title) in enumerate(listed_products):
+                        if len(all_found_products) >= products_to_find_limit:
+                            break
+                        visited_urls.add(product_url)
+                        if not listing.accept(listing_title, title_quantity):
+                            continue
+                        logger.debug(f"      -> Processing product {i+1}/{len(listed_products)}...")
+                        try:
+                            product_details = self._extract_product_details(pages, product_url, search_mode)
+                        except TimeoutException:
+                            logger.warning(f"      -> WARNING: Could not process product {i+1}. Skipping. Reason: TimeoutException")
+                            continue
+
+                        if product_details and product_details.get('Total quantity', 0) > 0:
+                            is_relevant = listing.is_relevant(product_details.get('Product'))
+                            if is_relevant:
+                                all_found_products.append(product_details)
+                                if on_product:
+                                    on_product(product_details)
+                                logger.info(f"      -> AI VALIDATED. Product saved: {product_details['Product'][:60]}...")
+                            else:
+                                logger.info(f"      -> DISCARDED BY AI (Not relevant): {product_details['Product'][:60]}...")
+                        else:
+                            logger.info(f"      -> DISCARDED (no quantity): {product_details.get('Product', 'N/A')[:60]}...")
 
-        driver.get(search_url)
-        self._handle_overlays(driver)
+                    if len(all_found_products) >= products_to_find_limit:
+                        logger.info(f"    > Target of {products_to_find_limit} products reached.")
+                        break
 
-        try:
-            WebDriverWait(driver, 25).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div.product-inner-container"))
-            )
-        except TimeoutException:
-            logger.warning("    > No product containers found on the initial page. Skipping keyword.")
-            if driver:
-                driver.quit()
-            return []
-
-        while len(all_found_products) < products_to_find_limit:
-            logger.info(f"--- Analyzing Page {page_num} ---")
-            
-            search_page_url = driver.current_url
-            time.sleep(5)
-
-            
-            product_containers = driver.find_elements(By.CSS_SELECTOR, "div.product-inner-container")
-            num_containers = len(product_containers)
-
-            if num_containers == 0:
-                logger.warning("    ! No products containers found on this page.")
-                break
-
-            logger.debug(f"    > Found {num_containers} product containers on this page.")
-
-            
-            for i in range(num_containers):
-                if len(all_found_products) >= products_to_find_limit:
-                    break
-                try:
-                    
-                    current_containers = driver.find_elements(By.CSS_SELECTOR, "div.product-inner-container")
-                    if i >= len(current_containers):
+                    if next_href is None:
+                        logger.debug("    > No more pages found. Ending pagination.")
                         break
-                    
-                    container = current_containers[i]
-
-                    
-                    try:
-                        product_link = container.find_element(By.CSS_SELECTOR, "p.product-name a")
-                        if not product_link.text.strip():
-                            logger.debug(f"      -> Skipping empty product container #{i+1}.")
-                            continue 
-                    except NoSuchElementException:
-                        logger.debug(f"      -> Skipping container #{i+1} (no product link found inside).")
-                        continue 
-
-                    logger.debug(f"      -> Processing product {i+1}/{num_containers}...")
-                    
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", product_link)
-                    time.sleep(1)
-                    product_link.click()
-
-                    WebDriverWait(driver, 30).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "h1.product-title"))
-                    )
-                    
-                    product_url = driver.current_url
-                    product_details = self._extract_product_details(driver, product_url, search_mode)
-                    
-                    if product_details and product_details.get('Total quantity', 0) > 0:
-                        is_relevant = self.relevance_agent.is_relevant(product_details.get('Product'), keyword)
-                        if is_relevant:
-                            all_found_products.append(product_details)
-                            logger.info(f"      -> AI VALIDATED. Product saved: {product_details['Product'][:60]}...")
-                        else:
-                            logger.info(f"      -> DISCARDED BY AI (Not relevant): {product_details['Product'][:60]}...")
+                    if next_href and not next_href.startswith(('javascript', '#')):
+                        listing_url = urljoin(self.base_url, next_href)
+                        try:
+                            listing_soup = pages.get_soup(listing_url, "div.product-inner-container", timeout=25)
+                        except TimeoutException:
+                            logger.info("    > Next page did not load. Ending pagination.")
+                            break
                     else:
-                        logger.info(f"      -> DISCARDED (no quantity): {product_details.get('Product', 'N/A')[:60]}...")
-
-                    driver.get(search_page_url)
-                    WebDriverWait(driver, 30).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.product-inner-container"))
-                    )
-                    time.sleep(2)
-
-                except (TimeoutException, StaleElementReferenceException, ElementClickInterceptedException) as e:
-                    logger.warning(f"      -> WARNING: Could not process product {i+1}. Skipping. Reason: {type(e).__name__}")
-                    driver.get(search_page_url)
-                    WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.product-inner-container")))
-                    continue
-                except InvalidSessionIdException:
-                    logger.error(f"      -> FATAL ERROR: Browser session lost. Aborting scrape for '{keyword}'.")
-                    if driver:
-                        driver.quit()
-                    return all_found_products
-            
-            if len(all_found_products) >= products_to_find_limit:
-                logger.info(f"    > Target of {products_to_find_limit} products reached.")
-                break
-            
-            try:
-                current_page_url = driver.current_url
-                next_page_button = driver.find_element(By.CSS_SELECTOR, "a.next")
-                logger.debug("    > Next page button found. Attempting to navigate...")
-                
-                driver.execute_script("arguments[0].click();", next_page_button)
-                time.sleep(3)
-
-                if driver.current_url == current_page_url:
-                    logger.info("    > URL did not change. Reached the last page.")
-                    break
-                else:
+                        next_page = self._click_next_page(pages, listing_url)
+                        if next_page is None:
+                            logger.info("    > Next page did not load after clicking. Ending pagination.")
+                            break
+                        listing_soup, listing_url = next_page
                     page_num += 1
                     logger.info("    > Successfully navigated to the next page.")
 
-            except:
-                logger.debug("    > No more pages found. Ending pagination.")
-                break
+            except InvalidSessionIdException:
+                logger.error(f"      -> FATAL ERROR: Browser session lost. Aborting scrape for '{keyword}'.")
+                pages.mark_broken()
+            finally:
+                listing.report()
 
         logger.info(f"\n  [Saco Scraper] Finished scraping. Found data for {len(all_found_products)} products.")
-        if driver:
-            driver.quit()
-        return all_found_products
\ No newline at end of file
+        return all_found_products
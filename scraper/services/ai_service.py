@@ -1,10 +1,14 @@
-import os
 import json
-import requests
 import time
 import boto3
 import base64
+from collections import Counter
 from botocore.exceptions import ClientError
+from services.gemini_client import GeminiClient, GeminiError, GEMINI_URL, completed_future
+from services.relevance_cache import RelevanceCache, WipesUnitsMemo, prompt_version
+from services.relevance_model import RelevancePreClassifier
+import config
+from utils import parse_wipes_units
 from log_config import get_logger
 
 logger = get_logger()
@@ -32,7 +36,7 @@ def get_secret(secret_name, region_name="eu-north-1"):
             return json.loads(decoded_binary_secret)
 
 class RelevanceAgent:
-    def __init__(self):
+    def __init__(self, cache_file=None, model_file=None):
         SECRET_NAME = "prod/wayakit-app" 
         AWS_REGION = "eu-north-1" 
 
@@ -51,10 +55,25 @@ class RelevanceAgent:
 
         if not self.api_key:
             logger.warning("API KEY not found")
-        self.relevance_api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={self.api_key}"
-        self.extraction_api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-pro:generateContent?key={self.api_key}"
-        
-        self.headers = {'Content-Type': 'application/json'}
+        self.relevance_model = "gemini-2.5-flash-lite"
+        self.extraction_model = "gemini-2.5-pro"
+        # Una sesión keep-alive y un presupuesto por minuto compartidos por todas las llamadas del proceso
+        self.client = GeminiClient(self.api_key) if self.api_key else None
+
+        # Decisiones ya tomadas (en disco): la versión cambia sola si se edita el prompt o el modelo
+        version = prompt_version(
+            self._get_prompt('{product_name}', '{search_query}'),
+            self._get_batch_prompt(['{product_name}'], '{search_query}'),
+            GEMINI_URL.format(model=self.relevance_model)
+        )
+        self.prompt_version = version
+        self.cache = RelevanceCache(cache_file, version) if cache_file else None
+        # Conteos de toallitas que tuvo que dar la IA, en el mismo archivo
+        units_version = prompt_version(self._get_wipes_prompt('{product_title}'), GEMINI_URL.format(model=self.extraction_model))
+        self.units_memo = WipesUnitsMemo(cache_file, units_version) if cache_file else None
+        # Modelo local entrenado con esas decisiones: solo los títulos dudosos llegan a Gemini
+        self.pre_classifier = RelevancePreClassifier.load(model_file, version) if model_file else None
+        self.stats = Counter()
 
     def _get_prompt(self, product_name, search_query):
         return f"""
@@ -134,57 +153,229 @@ class RelevanceAgent:
         Is the product a relevant match for the query?
         """
 
-    def is_relevant(self, product_name, search_query):
-        if not self.api_key:
-            return False
+    def _get_batch_prompt(self, product_names, search_query):
+        # Mismas reglas y ejemplos que la consulta individual; solo cambia la tarea final
+        rules = self._get_prompt('', search_query).split('--- CURRENT TASK ---')[0]
+        rules = rules.replace('Respond with only "Yes" or "No".', 'Apply the rules to every product title listed in the task.')
+        numbered_titles = '\n'.join(f'        {i}. "{name}"' for i, name in enumerate(product_names))
+        return f"""{rules}--- CURRENT TASK ---
+        User Search Query: "{search_query}"
+        Product Titles:
+{numbered_titles}
+
+        For each numbered title, is the product a relevant match for the query?
+        Return a JSON list with one object per title: {{"index": <number>, "relevant": true or false}}.
+        """
 
+    def _response_text(self, result):
+        if not result.get('candidates'):
+            return None
+        return result['candidates'][0]['content']['parts'][0]['text'].strip()
+
+    def is_relevant(self, product_name, search_query):
+        if self.cache:
+            cached = self.cache.get(product_name, search_query)
+            if cached is not None:
+                logger.debug(f"      -> IA decision (cached): {'yes' if cached else 'no'}")
+                return cached
+
+        local_decision, audit = self._local_decision(product_name, search_query)
+        if local_decision is not None and not audit:
+            return local_decision
+        return self._ask_single(product_name, search_query, local_decision)
+
+    def known_decision(self, product_name, search_query):
+        """The decision available without calling Gemini (cache, then a confident local model), or None."""
+        if self.cache:
+            cached = self.cache.get(product_name, search_query)
+            if cached is not None:
+                return cached
+        local_decision, _ = self._local_decision(product_name, search_query)
+        return local_decision
+
+    def _ask_single(self, product_name, search_query, local_decision=None):
+        """Gemini's answer for one title (cached); the local answer, or False, when there is none."""
+        if not self.client:
+            return bool(local_decision)
+
+        start = time.perf_counter()
+        decision = self._ask_relevance(product_name, search_query)
+        self.stats['single_calls'] += 1
+        self.stats['single_seconds'] += time.perf_counter() - start
+        if decision is None:
+            return bool(local_decision)
+        self._store_decision(product_name, search_query, decision, local_decision)
+        return decision
+
+    def _local_decision(self, product_name, search_query):
+        """(True/False from the local model or None, audit flag); (None, False) without a model."""
+        if not self.pre_classifier:
+            return None, False
+        return self.pre_classifier.decide(product_name, search_query)
+
+    def _store_decision(self, product_name, search_query, decision, local_decision=None):
+        # Solo se guardan respuestas de Gemini: son los datos de entrenamiento del modelo local
+        if local_decision is not None:
+            self.pre_classifier.record_audit(local_decision, decision)
+        if self.cache:
+            self.cache.put(product_name, search_query, decision)
+
+    def submit_relevance(self, product_name, search_query):
+        """Future of is_relevant(): the page navigation goes on while Gemini answers."""
+        if not self.client:
+            return completed_future(self.is_relevant(product_name, search_query))
+        return self.client.run_async(self.is_relevant, product_name, search_query)
+
+    def _ask_relevance(self, product_name, search_query):
+        """True/False from Gemini, or None when no valid answer was obtained (not cached)."""
         prompt = self._get_prompt(product_name, search_query)
-        chat_history = [{"role": "user", "parts": [{"text": prompt}]}]
-        payload = {"contents": chat_history}
-        
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # CAMBIO 2: Se usa la URL específica para la relevancia (flash-lite).
-                response = requests.post(self.relevance_api_url, headers=self.headers, data=json.dumps(payload))
-                
-                if response.status_code == 429:
-                    logger.warning(f"      -> 🛑 RATE LIMIT HIT. Google dice: {response.text}")
-                    time.sleep(60)
-                    continue
-
-                response.raise_for_status()
-                result = response.json()
-
-                if result.get('candidates'):
-                    decision = result['candidates'][0]['content']['parts'][0]['text'].strip().lower()
-                    logger.debug(f"      -> IA decision: {decision}")
-                    time.sleep(3)
-                    return "yes" in decision
-                else:
-                    logger.warning("      -> No candidates found in AI response.")
-                    return False
-
-            except requests.exceptions.RequestException as e:
-                logger.error(f"      -> Network error contacting AI agent", exc_info=True)
-                if attempt < max_retries - 1:
-                    logger.info(f"      -> Retrying in 10 seconds... (Attempt {attempt + 1}/{max_retries})")
-                    time.sleep(10)
-                else:
-                    return False
-            except Exception as e:
-                logger.error(f"      -> Unexpected error processing AI response", exc_info=True)
-                return False
-        
-        logger.warning("      -> Failed to get a valid response from AI after multiple retries.")
-        return False
-    
-    def extract_wipes_units(self, product_title: str) -> int:
-        if not self.api_key:
-            return 0
+        payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        try:
+            decision = self._response_text(self.client.generate(self.relevance_model, payload))
+        except GeminiError:
+            logger.warning("      -> Failed to get a valid response from AI after multiple retries.", exc_info=True)
+            return None
+        except Exception:
+            logger.error(f"      -> Unexpected error processing AI response", exc_info=True)
+            return None
+        if decision is None:
+            logger.warning("      -> No candidates found in AI response.")
+            return None
+        logger.debug(f"      -> IA decision: {decision.lower()}")
+        return "yes" in decision.lower()
+
+    def classify_batch(self, product_names, search_query):
+        """
+        Relevance of several titles for one query, in order. Titles found in the cache or that the local
+        model is confident about are answered locally; the rest are sent RELEVANCE_BATCH_SIZE at a time in
+        structured-output requests that run concurrently. Any title a batch answer leaves out or garbles
+        is asked on its own.
+        """
+        decisions = [None] * len(product_names)
+        local_decisions = {}
+        pending = []
+        for i, name in enumerate(product_names):
+            cached = self.cache.get(name, search_query) if self.cache else None
+            if cached is not None:
+                decisions[i] = cached
+                continue
+            local_decision, audit = self._local_decision(name, search_query)
+            if local_decision is not None and (not audit or not self.client):
+                decisions[i] = local_decision
+                continue
+            if local_decision is not None:
+                local_decisions[i] = local_decision
+            pending.append(i)
+
+        batches = []
+        if self.client:
+            for chunk_start in range(0, len(pending), config.RELEVANCE_BATCH_SIZE):
+                chunk = pending[chunk_start:chunk_start + config.RELEVANCE_BATCH_SIZE]
+                if len(chunk) == 1:
+                    continue # una sola pregunta no compensa el prompt por lotes
+                batches.append((chunk, self.client.run_async(self._ask_relevance_batch, [product_names[i] for i in chunk], search_query)))
+
+        batched = set()
+        for chunk, future in batches:
+            answers, elapsed = future.result()
+            batched.update(chunk)
+            self.stats['batch_calls'] += 1
+            self.stats['batch_seconds'] += elapsed
+            for position, i in enumerate(chunk):
+                if position in answers:
+                    decisions[i] = answers[position]
+                    self.stats['batch_decisions'] += 1
+                    self._store_decision(product_names[i], search_query, answers[position], local_decisions.get(i))
+
+        for i, decision in enumerate(decisions):
+            if decision is None:
+                if i in batched:
+                    self.stats['batch_fallbacks'] += 1
+                decisions[i] = self._ask_single(product_names[i], search_query, local_decisions.get(i))
+        return decisions
+
+    def _ask_relevance_batch(self, product_names, search_query):
+        """({position: True/False} for the titles Gemini answered properly, seconds taken)."""
+        start = time.perf_counter()
+        prompt = self._get_batch_prompt(product_names, search_query)
+        payload = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "responseMimeType": "application/json",
+                "responseSchema": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {"index": {"type": "INTEGER"}, "relevant": {"type": "BOOLEAN"}},
+                        "required": ["index", "relevant"]
+                    }
+                }
+            }
+        }
+        try:
+            text_response = self._response_text(self.client.generate(self.relevance_model, payload))
+        except GeminiError:
+            logger.warning("      -> Failed to get a valid batch response from AI after multiple retries.", exc_info=True)
+            return {}, time.perf_counter() - start
+        except Exception:
+            logger.error(f"      -> Unexpected error processing AI batch response", exc_info=True)
+            return {}, time.perf_counter() - start
+        if text_response is None:
+            logger.warning("      -> No candidates found in AI batch response.")
+            return {}, time.perf_counter() - start
 
+        try:
+            entries = json.loads(text_response)
+        except json.JSONDecodeError:
+            logger.warning(f"      -> Malformed AI batch response, asking one by one: '{text_response[:200]}'")
+            return {}, time.perf_counter() - start
+
+        answers = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            index, relevant = entry.get('index'), entry.get('relevant')
+            if isinstance(index, int) and 0 <= index < len(product_names) and isinstance(relevant, bool):
+                answers.setdefault(index, relevant)
+        logger.debug(f"      -> IA batch: {len(answers)}/{len(product_names)} decisions ({sum(answers.values())} relevant)")
+        return answers, time.perf_counter() - start
+
+    def report(self):
+        if self.cache:
+            self.cache.report()
+        single, batch = self.stats['single_calls'], self.stats['batch_calls']
+        if single or batch:
+            batch_decisions = self.stats['batch_decisions']
+            logger.info(
+                f"[RelevanceAgent] Individual calls: {single} "
+                f"({self.stats['single_seconds'] / single if single else 0:.2f}s/decision) | "
+                f"Batch calls: {batch} for {batch_decisions} titles "
+                f"({self.stats['batch_seconds'] / batch_decisions if batch_decisions else 0:.2f}s/decision) | "
+                f"Fallbacks: {self.stats['batch_fallbacks']} | Calls saved: {max(batch_decisions - batch, 0)}"
+            )
+        if self.pre_classifier:
+            self.pre_classifier.report()
+        units_total = self.stats['units_parser'] + self.stats['units_memo'] + self.stats['units_ai']
+        if units_total:
+            logger.info(
+                f"[RelevanceAgent] Wipes units: {units_total} titles | parser: {self.stats['units_parser']} | "
+                f"memo: {self.stats['units_memo']} | AI: {self.stats['units_ai']} "
+                f"({self.stats['units_ai_seconds'] / self.stats['units_ai'] if self.stats['units_ai'] else 0:.2f}s/call)"
+            )
+        if self.client:
+            self.client.report()
+
+    def close(self):
+        if self.client:
+            self.client.close()
+        if self.cache:
+            self.cache.close()
+        if self.units_memo:
+            self.units_memo.close()
+
+    def _get_wipes_prompt(self, product_title):
         # CAMBIO 1: El nuevo prompt que definimos arriba.
-        prompt = f"""
+        return f"""
 You are an expert data extractor. Your goal is to calculate the TOTAL number of wipes from a product title. You must identify the base count per pack and any multipliers (like "Pack of 2", "3 Pack", "4x", etc.) and multiply them together.
 
 First, provide a brief, one-sentence reasoning of your calculation. Then, provide the final integer.
@@ -232,59 +423,69 @@ Title: "Microfiber Cloths 6 Pack"
 Title: "{product_title}"
 """
 
-        chat_history = [{"role": "user", "parts": [{"text": prompt}]}]
-        payload = {"contents": chat_history}
-
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Se usa la URL de extracción (gemini-2.5-pro) como ya lo tenías
-                response = requests.post(self.extraction_api_url, headers=self.headers, data=json.dumps(payload))
-
-                if response.status_code == 429:
-                    logger.warning("      -> Rate limit hit (units). Waiting for 60 seconds to reset...")
-                    time.sleep(60)
-                    continue
-
-                response.raise_for_status()
-                result = response.json()
-
-                if result.get('candidates'):
-                    text_response = result['candidates'][0]['content']['parts'][0]['text'].strip()
-                    
-                    # CAMBIO 2: Parsear la respuesta como JSON en lugar de usar regex.
-                    try:
-                        # Limpiar la respuesta por si viene con formato de bloque de código markdown
-                        if text_response.startswith("```json"):
-                            text_response = text_response.strip("```json\n").strip("`")
-                        
-                        data = json.loads(text_response)
-                        reasoning = data.get("reasoning", "No reasoning provided.")
-                        total_units = int(data.get("total_units", 0))
-
-                        logger.debug(f"      -> IA reasoning: {reasoning}")
-                        logger.debug(f"      -> IA wipes units: {total_units}")
-                        time.sleep(3)
-                        return total_units
-                        
-                    except (json.JSONDecodeError, KeyError, TypeError) as e:
-                        logger.error(f"      -> Failed to parse JSON response", exc_info=True)
-                        logger.debug(f"      -> Raw response: '{text_response}'")
-                        return 0
-                else:
-                    logger.warning("      -> No candidates found in AI response (units).")
-                    return 0
-
-            except requests.exceptions.RequestException as e:
-                logger.error(f"      -> Network error contacting AI agent (units)", exc_info=True)
-                if attempt < max_retries - 1:
-                    logger.info(f"      -> Retrying in 10 seconds... (Attempt {attempt + 1}/{max_retries})")
-                    time.sleep(10)
-                else:
-                    return 0
-            except Exception as e:
-                logger.error(f"      -> Unexpected error processing AI response (units)", exc_info=True)
-                return 0
-
-        logger.warning("      -> Failed to get a valid units response from AI after multiple retries.")
-        return 0
\ No newline at end of file
+    def extract_wipes_units(self, product_title: str) -> int:
+        """Total wipes in a title: local parser first, then the memo, and Gemini only for ambiguous titles."""
+        parsed = parse_wipes_units(product_title)
+        if parsed:
+            self.stats['units_parser'] += 1
+            logger.debug(f"      -> Wipes units (parser): {parsed['quantity']}")
+            return parsed['quantity']
+
+        if self.units_memo:
+            memoized = self.units_memo.get(product_title)
+            if memoized is not None:
+                self.stats['units_memo'] += 1
+                logger.debug(f"      -> Wipes units (memo): {memoized}")
+                return memoized
+
+        if not self.client:
+            return 0
+        start = time.perf_counter()
+        total_units = self._ask_wipes_units(product_title)
+        self.stats['units_ai'] += 1
+        self.stats['units_ai_seconds'] += time.perf_counter() - start
+        if total_units is None:
+            return 0
+        if self.units_memo:
+            self.units_memo.put(product_title, total_units)
+        return total_units
+
+    def _ask_wipes_units(self, product_title):
+        """Gemini's count for an ambiguous title, or None when no valid answer was obtained (not memoized)."""
+        payload = {"contents": [{"role": "user", "parts": [{"text": self._get_wipes_prompt(product_title)}]}]}
+        try:
+            text_response = self._response_text(self.client.generate(self.extraction_model, payload))
+        except GeminiError:
+            logger.warning("      -> Failed to get a valid units response from AI after multiple retries.", exc_info=True)
+            return None
+        except Exception:
+            logger.error(f"      -> Unexpected error processing AI response (units)", exc_info=True)
+            return None
+        if text_response is None:
+            logger.warning("      -> No candidates found in AI response (units).")
+            return None
+
+        # CAMBIO 2: Parsear la respuesta como JSON en lugar de usar regex.
+        try:
+            # Limpiar la respuesta por si viene con formato de bloque de código markdown
+            if text_response.startswith("```json"):
+                text_response = text_response.strip("```json\n").strip("`")
+
+            data = json.loads(text_response)
+            reasoning = data.get("reasoning", "No reasoning provided.")
+            total_units = int(data.get("total_units", 0))
+
+            logger.debug(f"      -> IA reasoning: {reasoning}")
+            logger.debug(f"      -> IA wipes units: {total_units}")
+            return total_units
+
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            logger.error(f"      -> Failed to parse JSON response", exc_info=True)
+            logger.debug(f"      -> Raw response: '{text_response}'")
+            return None
+
+    def submit_wipes_units(self, product_title):
+        """Future of extract_wipes_units(): the scraper keeps loading pages while Gemini counts."""
+        if not self.client or parse_wipes_units(product_title):
+            return completed_future(self.extract_wipes_units(product_title))
+        return self.client.run_async(self.extract_wipes_units, product_title)
@@ -0,0 +1,240 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.common.exceptions import WebDriverException
+from services.rate_limit import get_scheduler, looks_blocked
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+
+def build_chrome_options():
+    options = webdriver.ChromeOptions()
+    options.add_experimental_option('excludeSwitches', ['enable-automation', 'enable-logging'])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument('--disable-notifications')
+    options.add_argument('--headless=new')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--disable-webgl')
+    options.add_argument('--disable-3d-apis')
+    options.add_argument(f"user-agent={config.USER_AGENT}")
+    options.add_argument('--log-level=3')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-extensions')
+    options.add_argument('--disable-browser-side-navigation')
+    return options
+
+
+def blocked_url_patterns(site):
+    """URL patterns (Chrome DevTools wildcards) Chrome must not download for `site`."""
+    if not config.BLOCK_RESOURCES:
+        return []
+    return config.BLOCKED_RESOURCE_PATTERNS + config.SITE_BLOCKED_RESOURCE_PATTERNS.get(site, [])
+
+
+class PooledDriver:
+    """
+    Thin proxy over a Chrome WebDriver that counts the pages it has loaded and asks the
+    politeness scheduler for the current site's turn before each one.
+    """
+
+    def __init__(self, driver, driver_id):
+        self._driver = driver
+        self.driver_id = driver_id
+        self.pages_loaded = 0
+        self.leases = 0
+        self.broken = False
+        self.blocked_patterns = None
+        self.site = None
+
+    def wait_turn(self):
+        """For navigations that don't go through get() (clicking a link or a 'next' button)."""
+        get_scheduler().wait(self.site)
+
+    def get(self, url):
+        self.pages_loaded += 1
+        scheduler = get_scheduler()
+        scheduler.wait(self.site)
+        start = time.monotonic()
+        result = self._driver.get(url)
+        elapsed = time.monotonic() - start
+        try:
+            blocked = looks_blocked(self._driver.current_url, self._driver.title)
+        except WebDriverException:
+            blocked = False
+        scheduler.observe(self.site, elapsed=elapsed, blocked=blocked)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class DriverPool:
+    """
+    Keeps up to `size` warm headless Chrome instances and leases them to the scrapers.
+    Drivers are reset (cookies, extra tabs) when returned and recycled after
+    `max_pages` page loads or when the browser session is found dead.
+    """
+
+    def __init__(self, driver_path, size=None, max_pages=None, lease_timeout=None):
+        self.driver_path = driver_path
+        self.size = size or config.DRIVER_POOL_SIZE
+        self.max_pages = max_pages or config.DRIVER_MAX_PAGES
+        self.lease_timeout = lease_timeout or config.DRIVER_LEASE_TIMEOUT
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._next_id = 0
+        self._closed = False
+        self.stats = {
+            'leases': 0, 'wait_total': 0.0, 'wait_max': 0.0,
+            'created': 0, 'recycled': 0, 'crashed': 0,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        logger.info(f"[DriverPool] Warming up {self.size} Chrome instance(s)...")
+        warm = []
+        for _ in range(self.size):
+            driver = self._try_create()
+            if driver is None:
+                break
+            warm.append(driver)
+        for driver in warm:
+            self._idle.put(driver)
+        return self
+
+    def _create_driver(self):
+        with self._lock:
+            self._next_id += 1
+            driver_id = self._next_id
+        service = ChromeService(executable_path=self.driver_path)
+        driver = webdriver.Chrome(service=service, options=build_chrome_options())
+        self.stats['created'] += 1
+        logger.debug(f"[DriverPool] Chrome #{driver_id} started.")
+        return PooledDriver(driver, driver_id)
+
+    def _try_create(self):
+        with self._lock:
+            if self._live >= self.size:
+                return None
+            self._live += 1
+        try:
+            return self._create_driver()
+        except Exception:
+            with self._lock:
+                self._live -= 1
+            raise
+
+    def acquire(self, site=None):
+        if self._closed:
+            raise RuntimeError("DriverPool is closed.")
+        start = time.monotonic()
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            driver = self._try_create()
+            if driver is None:
+                try:
+                    driver = self._idle.get(timeout=self.lease_timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No Chrome driver became available within {self.lease_timeout}s.")
+        waited = time.monotonic() - start
+        driver.leases += 1
+        with self._lock:
+            self.stats['leases'] += 1
+            self.stats['wait_total'] += waited
+            self.stats['wait_max'] = max(self.stats['wait_max'], waited)
+        logger.debug(f"[DriverPool] Lease of Chrome #{driver.driver_id} granted after waiting {waited:.2f}s.")
+        self._apply_resource_blocking(driver, site)
+        driver.site = site
+        return driver
+
+    def _apply_resource_blocking(self, driver, site):
+        # Images, fonts, ads and trackers are dropped by Chrome itself (DevTools Network domain);
+        # the block list only changes when the driver moves to a site with different patterns
+        patterns = blocked_url_patterns(site)
+        if patterns == driver.blocked_patterns:
+            return
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            driver.blocked_patterns = patterns
+            logger.debug(f"[DriverPool] Chrome #{driver.driver_id}: {len(patterns)} blocked URL patterns for '{site}'.")
+        except WebDriverException:
+            logger.warning(f"[DriverPool] Could not set blocked URLs on Chrome #{driver.driver_id}.", exc_info=True)
+
+    def release(self, driver):
+        if driver is None:
+            return
+        if not driver.broken and driver.pages_loaded < self.max_pages and not self._closed:
+            try:
+                self._reset(driver)
+                self._idle.put(driver)
+                return
+            except WebDriverException:
+                driver.broken = True
+
+        if driver.broken:
+            self.stats['crashed'] += 1
+            logger.warning(f"[DriverPool] Chrome #{driver.driver_id} crashed or lost its session. Recycling.")
+        else:
+            self.stats['recycled'] += 1
+            logger.debug(f"[DriverPool] Chrome #{driver.driver_id} recycled after {driver.pages_loaded} pages.")
+        self._discard(driver)
+
+    @contextmanager
+    def lease(self, site=None):
+        driver = self.acquire(site)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def _reset(self, driver):
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        driver._driver.get('about:blank')
+
+    def _discard(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._lock:
+            self._live -= 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+        self.report()
+
+    def report(self):
+        leases = self.stats['leases']
+        avg_wait = self.stats['wait_total'] / leases if leases else 0.0
+        logger.info(
+            f"[DriverPool] Leases: {leases} | Avg wait: {avg_wait:.2f}s | Max wait: {self.stats['wait_max']:.2f}s | "
+            f"Chrome started: {self.stats['created']} | Recycled: {self.stats['recycled']} | Crashed: {self.stats['crashed']}"
+        )
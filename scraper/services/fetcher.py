@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from services.rate_limit import get_scheduler, parse_retry_after
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+# Una sola sesión keep-alive por proceso, compartida por todos los scrapers
+_session = None
+_session_lock = threading.Lock()
+
+# Estadísticas por sitio: qué camino sirvió cada página
+_stats = {}
+
+# Caché en disco de páginas de producto (services.page_cache.PageCache), opcional
+_page_cache = None
+
+
+def set_page_cache(page_cache):
+    global _page_cache
+    _page_cache = page_cache
+
+
+def get_http_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=config.HTTP_POOL_SIZE, pool_maxsize=config.HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({
+                'User-Agent': config.USER_AGENT,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.9',
+            })
+            _session = session
+        return _session
+
+
+def report_fetch_stats():
+    for site, counts in sorted(_stats.items()):
+        total = counts['cache'] + counts['http'] + counts['browser']
+        share = counts['http'] / total * 100 if total else 0.0
+        logger.info(
+            f"[Fetcher] {site}: {total} pages | Cache: {counts['cache']} | HTTP: {counts['http']} ({share:.0f}%) | Browser: {counts['browser']} "
+            f"(fallbacks: {counts['fallback']}, HTTP errors: {counts['http_error']})"
+        )
+
+
+class PageFetcher:
+    """
+    Fetches a page for one site, trying a plain keep-alive HTTP GET first and falling back to
+    the Selenium driver pool when the response does not contain `selector` (JS-rendered page,
+    captcha, error). A site whose HTTP path keeps failing is switched to browser-only for the run.
+    """
+
+    def __init__(self, site, driver_pool):
+        self.site = site
+        self.driver_pool = driver_pool
+        self.http_enabled = site in config.HTTP_FETCH_SITES
+        self.consecutive_fallbacks = 0
+        self.stats = _stats.setdefault(site, Counter())
+
+    def sync_cookies(self, driver):
+        """Copies the browser cookies (language, region...) into the HTTP session."""
+        session = get_http_session()
+        for cookie in driver.get_cookies():
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+
+    def _get_http(self, url, selector):
+        scheduler = get_scheduler()
+        scheduler.wait(self.site)
+        start = time.monotonic()
+        try:
+            response = get_http_session().get(url, timeout=config.HTTP_TIMEOUT)
+        except requests.RequestException as e:
+            logger.debug(f"        -> [Fetcher] HTTP error for {url[:80]}: {type(e).__name__}")
+            self.stats['http_error'] += 1
+            scheduler.observe(self.site, elapsed=time.monotonic() - start)
+            return None
+        elapsed = time.monotonic() - start
+        if response.status_code != 200:
+            logger.debug(f"        -> [Fetcher] HTTP {response.status_code} for {url[:80]}")
+            self.stats['http_error'] += 1
+            scheduler.observe(self.site, status=response.status_code, elapsed=elapsed,
+                              retry_after=parse_retry_after(response.headers.get('Retry-After')))
+            return None
+        soup = BeautifulSoup(response.text, 'html.parser')
+        if soup.select_one(selector) is None:
+            # Sin el selector esperado y con marcas de captcha: el sitio nos está frenando
+            blocked = any(marker in response.text[:20000].lower() for marker in config.BLOCKED_PAGE_MARKERS)
+            scheduler.observe(self.site, elapsed=elapsed, blocked=blocked)
+            logger.debug(f"        -> [Fetcher] '{selector}' missing in HTTP response, needs the browser.")
+            return None
+        scheduler.observe(self.site, status=response.status_code, elapsed=elapsed)
+        return soup, response.text
+
+    def _try_http(self, url, selector):
+        if not self.http_enabled:
+            return None
+        fetched = self._get_http(url, selector)
+        if fetched is not None:
+            self.stats['http'] += 1
+            self.consecutive_fallbacks = 0
+            return fetched
+        self.stats['fallback'] += 1
+        self.consecutive_fallbacks += 1
+        if self.consecutive_fallbacks >= config.HTTP_FALLBACK_DISABLE_AFTER:
+            logger.warning(f"[Fetcher] {self.site}: HTTP path failed {self.consecutive_fallbacks} times in a row. Using only the browser for this run.")
+            self.http_enabled = False
+        return None
+
+    def _get_browser(self, driver, url, selector, timeout, settle):
+        self.stats['browser'] += 1
+        driver.get(url)
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+        )
+        if settle:
+            time.sleep(settle)
+        html = driver.page_source
+        return BeautifulSoup(html, 'html.parser'), html
+
+    def _from_cache(self, url, selector):
+        html = _page_cache.get(url)
+        if html is None:
+            return None
+        soup = BeautifulSoup(html, 'html.parser')
+        if soup.select_one(selector) is None:
+            return None
+        self.stats['cache'] += 1
+        logger.debug(f"        -> [Fetcher] Page served from cache: {url[:80]}")
+        return soup
+
+    def _fetch(self, url, selector, timeout, settle, get_driver, cache):
+        use_cache = cache and _page_cache is not None
+        if use_cache:
+            soup = self._from_cache(url, selector)
+            if soup is not None:
+                return soup
+        fetched = self._try_http(url, selector)
+        if fetched is None:
+            fetched = get_driver(lambda driver: self._get_browser(driver, url, selector, timeout, settle))
+        soup, html = fetched
+        if use_cache:
+            _page_cache.put(url, html)
+        return soup
+
+    def get_soup(self, url, selector, timeout=20, settle=0, driver=None, cache=False):
+        """
+        Returns the parsed page once `selector` is present. `driver` is used for the browser
+        fallback when the caller already holds one; otherwise one is leased just for this page.
+        With `cache=True` (product pages) the on-disk page cache is read first and filled after.
+        Raises TimeoutException like the plain Selenium wait did.
+        """
+        def with_driver(load):
+            if driver is not None:
+                return load(driver)
+            with self.driver_pool.lease(self.site) as leased_driver:
+                return load(leased_driver)
+        return self._fetch(url, selector, timeout, settle, with_driver, cache)
+
+    @contextmanager
+    def session(self):
+        """Scope for a whole search: the first browser fallback leases a driver, kept until the end."""
+        fetch_session = FetchSession(self)
+        try:
+            yield fetch_session
+        finally:
+            fetch_session.release()
+
+
+class FetchSession:
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+        self._driver = None
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = self.fetcher.driver_pool.acquire(self.fetcher.site)
+        return self._driver
+
+    def get_soup(self, url, selector, timeout=20, settle=0, cache=False):
+        return self.fetcher._fetch(url, selector, timeout, settle, lambda load: load(self.driver), cache)
+
+    def mark_broken(self):
+        """The leased driver lost its session: the pool discards it instead of reusing it."""
+        if self._driver is not None:
+            self._driver.broken = True
+
+    def release(self):
+        if self._driver is not None:
+            self.fetcher.driver_pool.release(self._driver)
+            self._driver = None
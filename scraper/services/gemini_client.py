@@ -0,0 +1,153 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from services.rate_limit import TokenBucket, parse_retry_after
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class GeminiError(Exception):
+    """No valid response from Gemini after the retries (or a non-retryable HTTP error)."""
+
+
+def completed_future(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def estimate_tokens(payload):
+    # ~4 caracteres por token: suficiente para repartir el presupuesto por minuto
+    return len(json.dumps(payload)) // 4 + 1
+
+
+def retry_delay_from_body(response):
+    """Seconds from the RetryInfo detail of a Gemini error body ("retryDelay": "31s"), if any."""
+    try:
+        for detail in response.json().get('error', {}).get('details', []):
+            match = re.match(r'([\d.]+)s$', str(detail.get('retryDelay', '')))
+            if match:
+                return float(match.group(1))
+    except ValueError:
+        pass
+    return None
+
+
+class ModelBudget:
+    """Requests-per-minute and tokens-per-minute buckets of one model, plus a shared pause after a 429."""
+
+    def __init__(self, model):
+        rpm, tpm = config.GEMINI_RATE_LIMITS.get(model, config.GEMINI_DEFAULT_RATE_LIMIT)
+        # Ráfaga de hasta 10 segundos de presupuesto
+        self.requests = TokenBucket(rpm / 60, max(1, rpm / 6))
+        self.tokens = TokenBucket(tpm / 60, max(1, tpm / 6))
+        self.not_before = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, tokens):
+        delay = max(self.requests.reserve(), self.tokens.reserve(tokens))
+        with self._lock:
+            delay = max(delay, self.not_before - time.monotonic())
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0.0)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.not_before = max(self.not_before, time.monotonic() + seconds)
+
+
+class GeminiClient:
+    """
+    Shared caller for the Gemini generateContent API: one keep-alive session, per-model RPM/TPM
+    budgets, and retries with jittered exponential backoff that honor Retry-After. generate()
+    blocks; submit() and run_async() run on a small thread pool so scrapers can keep navigating.
+    """
+
+    def __init__(self, api_key, max_workers=None):
+        max_workers = max_workers or config.GEMINI_MAX_CONCURRENCY
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json', 'x-goog-api-key': api_key})
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gemini')
+        self.stats = Counter()
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def _budget(self, model):
+        with self._lock:
+            if model not in self._budgets:
+                self._budgets[model] = ModelBudget(model)
+            return self._budgets[model]
+
+    def _count(self, **increments):
+        with self._lock:
+            self.stats.update(increments)
+
+    def _backoff(self, attempt):
+        delay = min(config.GEMINI_BACKOFF_MAX_SECONDS, config.GEMINI_BACKOFF_BASE_SECONDS * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def generate(self, model, payload):
+        """Response JSON of one generateContent call, waiting for the model budget. Raises GeminiError."""
+        budget = self._budget(model)
+        tokens = estimate_tokens(payload)
+        for attempt in range(config.GEMINI_MAX_RETRIES):
+            waited = budget.wait(tokens)
+            start = time.perf_counter()
+            try:
+                response = self.session.post(GEMINI_URL.format(model=model), json=payload, timeout=config.GEMINI_TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                reason, delay = type(e).__name__, self._backoff(attempt)
+            else:
+                elapsed = time.perf_counter() - start
+                if response.status_code not in RETRYABLE_STATUS:
+                    if not response.ok:
+                        self._count(errors=1)
+                        raise GeminiError(f"HTTP {response.status_code}: {response.text[:200]}")
+                    self._count(requests=1, seconds=elapsed, waited=waited, tokens=tokens)
+                    return response.json()
+                retry_after = parse_retry_after(response.headers.get('Retry-After')) or retry_delay_from_body(response)
+                reason, delay = f"HTTP {response.status_code}", max(self._backoff(attempt), retry_after or 0.0)
+                if response.status_code == 429:
+                    # La cuota es de la cuenta: todas las peticiones a este modelo esperan
+                    budget.pause(delay)
+                    self._count(rate_limited=1)
+            self._count(retries=1)
+            logger.warning(f"      -> Gemini {model}: {reason}. Retrying in {delay:.1f}s (attempt {attempt + 1}/{config.GEMINI_MAX_RETRIES})")
+            time.sleep(delay)
+        self._count(errors=1)
+        raise GeminiError(f"{model}: no valid response after {config.GEMINI_MAX_RETRIES} attempts")
+
+    def submit(self, model, payload):
+        """Future of generate(model, payload)."""
+        return self.executor.submit(self.generate, model, payload)
+
+    def run_async(self, func, *args, **kwargs):
+        """Runs a job that calls generate() (parse, cache...) on the client threads."""
+        return self.executor.submit(func, *args, **kwargs)
+
+    def report(self):
+        requests_done = self.stats['requests']
+        logger.info(
+            f"[Gemini] Requests: {requests_done} "
+            f"({self.stats['seconds'] / requests_done if requests_done else 0:.2f}s avg) | "
+            f"~{self.stats['tokens']} tokens | waited for budget {self.stats['waited']:.0f}s | "
+            f"retries: {self.stats['retries']} (429: {self.stats['rate_limited']}) | errors: {self.stats['errors']}"
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
@@ -0,0 +1,86 @@
+import re
+from collections import Counter
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+
+def normalize_title(title):
+    return re.sub(r'\s+', ' ', title or '').strip().lower()
+
+
+class ListingFilter:
+    """
+    Decides from the search-results card whether a product page is worth loading. A card is
+    skipped when the relevance agent rejects it or, with LISTING_QUANTITY_GATE, when its title has
+    no parseable quantity (only for sites whose quantity comes from the title). classify() asks for a whole results page in
+    one batch; decisions are kept for the search, so the product-page check is not repeated when
+    the title did not change.
+    One instance per scrape() call; report() logs the page loads saved for that keyword.
+    """
+
+    def __init__(self, site, relevance_agent, keyword):
+        self.site = site
+        self.relevance_agent = relevance_agent
+        self.keyword = keyword
+        self.enabled = config.LISTING_PREFILTER_ENABLED
+        self.quantity_gate = config.LISTING_QUANTITY_GATE
+        self.stats = Counter()
+        self._decisions = {}
+
+    def classify(self, titles, quantity_parser=None):
+        """Asks the relevance of a whole results page in one batch, leaving out cards the quantity check skips anyway."""
+        if not self.enabled:
+            return
+        quantity_parser = quantity_parser if self.quantity_gate else None
+        pending = {}
+        for title in titles:
+            key = normalize_title(title)
+            if key and key not in self._decisions and not (quantity_parser and not quantity_parser(title)):
+                pending.setdefault(key, title)
+        if not pending:
+            return
+        self.stats['relevance_asked'] += len(pending)
+        decisions = self.relevance_agent.classify_batch(list(pending.values()), self.keyword)
+        self._decisions.update(zip(pending, decisions))
+
+    def accept(self, title, quantity_parser=None):
+        """True when the card should be opened. Cards without a readable title are always opened."""
+        self.stats['cards'] += 1
+        if not self.enabled or not normalize_title(title):
+            self.stats['fetched'] += 1
+            return True
+        if self.quantity_gate and quantity_parser and not quantity_parser(title):
+            self.stats['skipped_quantity'] += 1
+            logger.debug(f"      -> SKIPPED at listing (no quantity in title): {title[:60]}...")
+            return False
+        if not self._ask(title):
+            self.stats['skipped_relevance'] += 1
+            logger.debug(f"      -> SKIPPED at listing (Not relevant by AI): {title[:60]}...")
+            return False
+        self.stats['fetched'] += 1
+        return True
+
+    def is_relevant(self, product_title):
+        """Product-page relevance check, answered from the listing decision when the title matches."""
+        if normalize_title(product_title) in self._decisions:
+            self.stats['relevance_reused'] += 1
+            return self._decisions[normalize_title(product_title)]
+        return self._ask(product_title)
+
+    def _ask(self, title):
+        key = normalize_title(title)
+        if key not in self._decisions:
+            self.stats['relevance_asked'] += 1
+            self._decisions[key] = self.relevance_agent.is_relevant(title, self.keyword)
+        return self._decisions[key]
+
+    def report(self):
+        saved = self.stats['skipped_quantity'] + self.stats['skipped_relevance']
+        logger.info(
+            f"    [ListingFilter] {self.site} '{self.keyword}': {self.stats['cards']} cards | "
+            f"{self.stats['fetched']} pages loaded | {saved} page loads saved "
+            f"(no quantity: {self.stats['skipped_quantity']}, not relevant: {self.stats['skipped_relevance']}) | "
+            f"AI decisions: {self.stats['relevance_asked']} (reused: {self.stats['relevance_reused']})"
+        )
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+AMAZON_ASIN = re.compile(r'/dp/([A-Z0-9]{10})')
+
+
+def normalize_url(url):
+    """Same product page -> same key, whatever search/tracking parameters the listing added."""
+    parts = urlsplit(url.strip())
+    path = parts.path or '/'
+    asin = AMAZON_ASIN.search(path)
+    if asin:
+        path = f"/dp/{asin.group(1)}"
+    path = '/'.join(segment for segment in path.split('/') if not segment.startswith('ref='))
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in config.PAGE_CACHE_IGNORED_PARAMS and not k.startswith('utm_')
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path.rstrip('/') or '/', urlencode(query), ''))
+
+
+class PageCache:
+    """
+    On-disk cache of product page HTML. Pages are stored zlib-compressed under the sha256 of
+    their content (identical pages share one file); a SQLite index maps the normalized URL to
+    that file with its fetch time. Entries expire after `ttl_hours`, and the least recently
+    used ones are evicted once the files exceed `max_mb`.
+    """
+
+    def __init__(self, directory, ttl_hours=None, max_mb=None):
+        self.directory = directory
+        self.ttl_seconds = (ttl_hours or config.PAGE_CACHE_TTL_HOURS) * 3600
+        self.max_bytes = (max_mb or config.PAGE_CACHE_MAX_MB) * 1024 * 1024
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stored': 0, 'evicted': 0}
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self.conn.commit()
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.directory, content_hash[:2], content_hash + '.html.z')
+
+    def get(self, url):
+        url_key = normalize_url(url)
+        row = self.conn.execute(
+            "SELECT content_hash, fetched_at FROM pages WHERE url_key = ?", (url_key,)
+        ).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        content_hash, fetched_at = row
+        if time.time() - fetched_at > self.ttl_seconds:
+            self.stats['expired'] += 1
+            self._delete(url_key, content_hash)
+            return None
+        try:
+            with open(self._blob_path(content_hash), 'rb') as f:
+                html = zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error):
+            self.stats['misses'] += 1
+            self._delete(url_key, content_hash)
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE pages SET last_access = ? WHERE url_key = ?", (time.time(), url_key))
+        self.stats['hits'] += 1
+        return html
+
+    def put(self, url, html):
+        data = html.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(content_hash)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(data, 6))
+            os.replace(tmp_path, blob_path)
+        url_key = normalize_url(url)
+        previous = self.conn.execute("SELECT content_hash FROM pages WHERE url_key = ?", (url_key,)).fetchone()
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (url_key, url, content_hash, os.path.getsize(blob_path), now, now)
+            )
+        if previous and previous[0] != content_hash:
+            self._remove_blob_if_unused(previous[0])
+        self.stats['stored'] += 1
+        self._enforce_size_cap()
+
+    def _delete(self, url_key, content_hash):
+        with self.conn:
+            self.conn.execute("DELETE FROM pages WHERE url_key = ?", (url_key,))
+        self._remove_blob_if_unused(content_hash)
+
+    def _remove_blob_if_unused(self, content_hash):
+        in_use = self.conn.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone()
+        if not in_use:
+            try:
+                os.remove(self._blob_path(content_hash))
+            except OSError:
+                pass
+
+    def _total_bytes(self):
+        # Cada fichero cuenta una sola vez aunque lo compartan varias URLs
+        row = self.conn.execute("SELECT SUM(size) FROM (SELECT DISTINCT content_hash, size FROM pages)").fetchone()
+        return row[0] or 0
+
+    def _enforce_size_cap(self):
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        # Se libera hasta el 90% del límite para no desalojar en cada escritura
+        target = self.max_bytes * 0.9
+        for url_key, content_hash in self.conn.execute(
+            "SELECT url_key, content_hash FROM pages ORDER BY last_access"
+        ).fetchall():
+            if total <= target:
+                break
+            size = self.conn.execute("SELECT size FROM pages WHERE url_key = ?", (url_key,)).fetchone()
+            self._delete(url_key, content_hash)
+            if size and not os.path.exists(self._blob_path(content_hash)):
+                total -= size[0]
+            self.stats['evicted'] += 1
+
+    def report(self):
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['expired']
+        hit_rate = self.stats['hits'] / lookups * 100 if lookups else 0.0
+        logger.info(
+            f"[PageCache] Hits: {self.stats['hits']} ({hit_rate:.0f}%) | Misses: {self.stats['misses']} | "
+            f"Expired: {self.stats['expired']} | Stored: {self.stats['stored']} | Evicted: {self.stats['evicted']} | "
+            f"Size: {self._total_bytes() / 1024 / 1024:.1f} MB"
+        )
+
+    def close(self):
+        self.conn.close()
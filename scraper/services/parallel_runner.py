@@ -0,0 +1,119 @@
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing.util import Finalize
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+# Estado propio de cada proceso worker (pool de navegadores, agente IA y scrapers)
+_worker_state = {}
+
+
+def _init_worker(driver_path, page_cache_dir, relevance_cache_file, relevance_model_file, defer_relevance):
+    from services.ai_service import RelevanceAgent
+    from services.driver_pool import DriverPool
+    from services.fetcher import report_fetch_stats, set_page_cache
+    from services.page_cache import PageCache
+    from services.rate_limit import get_scheduler
+    from services.relevance_stage import StagingRelevanceAgent
+    from scrapers import build_scrapers
+
+    driver_pool = DriverPool(driver_path, size=1)
+    Finalize(driver_pool, driver_pool.close, exitpriority=10)
+    Finalize(None, report_fetch_stats, exitpriority=5)
+    Finalize(None, lambda: get_scheduler().report(), exitpriority=5)
+    if page_cache_dir:
+        # Cada worker abre su propia conexión al índice SQLite de la caché (compartida en disco)
+        page_cache = PageCache(page_cache_dir)
+        set_page_cache(page_cache)
+        Finalize(page_cache, page_cache.report, exitpriority=5)
+        Finalize(page_cache, page_cache.close, exitpriority=4)
+    # La caché de relevancia también se comparte en disco; cada worker abre su conexión
+    ai_agent = RelevanceAgent(relevance_cache_file, relevance_model_file)
+    Finalize(ai_agent, ai_agent.report, exitpriority=5)
+    Finalize(ai_agent, ai_agent.close, exitpriority=4)
+    # En modo diferido la relevancia se decide después, en el proceso principal
+    _worker_state['scrapers'] = build_scrapers(driver_pool, StagingRelevanceAgent(ai_agent) if defer_relevance else ai_agent)
+
+
+def _run_task(task):
+    scraper = _worker_state['scrapers'][task['site']]
+    return scraper.scrape(task['keyword'], task['search_mode'])
+
+
+def site_concurrency(site):
+    return config.SITE_MAX_CONCURRENCY.get(site, config.DEFAULT_SITE_CONCURRENCY)
+
+
+def run_tasks_parallel(tasks, workers, driver_path, on_result, result_cache=None, page_cache_dir=None, relevance_cache_file=None, relevance_model_file=None, defer_relevance=False):
+    """
+    Reparte las tareas (subindustria, tipo de producto, sitio, keyword) en un pool de procesos,
+    sin superar SITE_MAX_CONCURRENCY búsquedas simultáneas por sitio. `on_result(task, products)`
+    se llama siempre desde el proceso principal, que sigue siendo el único que escribe el CSV.
+    Con `result_cache`, una búsqueda repetida (mismo sitio, keyword y modo) no se envía a los workers:
+    espera a la que ya está en curso y reutiliza sus productos.
+    Con `defer_relevance`, los workers no esperan a la IA: los productos se clasifican después
+    (services.relevance_stage).
+    """
+    pending = {}
+    for task in tasks:
+        pending.setdefault(task['site'], deque()).append(task)
+    sites = deque(pending)
+    in_flight = Counter()
+    futures = {}
+    waiting = {} # clave de búsqueda en curso -> tareas repetidas que esperan su resultado
+
+    logger.info(f"[Parallel] {len(tasks)} tareas en {len(pending)} sitios con {workers} workers.")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(driver_path, page_cache_dir, relevance_cache_file, relevance_model_file, defer_relevance)) as executor:
+        def fill():
+            # Round-robin entre sitios para que ninguno acapare los workers libres
+            stalled = 0
+            while len(futures) < workers and stalled < len(sites):
+                site = sites[0]
+                sites.rotate(-1)
+                if pending[site] and in_flight[site] < site_concurrency(site):
+                    task = pending[site].popleft()
+                    stalled = 0
+                    if result_cache is not None:
+                        key = result_cache.key(task)
+                        if key in waiting:
+                            waiting[key].append(task)
+                            continue
+                        cached_products = result_cache.get(task)
+                        if cached_products is not None:
+                            on_result(task, cached_products)
+                            continue
+                        waiting[key] = []
+                    futures[executor.submit(_run_task, task)] = task
+                    in_flight[site] += 1
+                else:
+                    stalled += 1
+
+        try:
+            fill()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = futures.pop(future)
+                    in_flight[task['site']] -= 1
+                    followers = waiting.pop(result_cache.key(task), []) if result_cache is not None else []
+                    try:
+                        products = future.result()
+                    except Exception:
+                        # Sin on_result: la búsqueda no se marca como completada y queda pendiente para --resume
+                        logger.error(f"Error durante scraping de '{task['site']}' con keyword '{task['keyword']}'.", exc_info=True)
+                        # Las búsquedas repetidas que esperaban este resultado vuelven a la cola
+                        pending[task['site']].extendleft(reversed(followers))
+                        continue
+                    on_result(task, products)
+                    if result_cache is not None:
+                        result_cache.put(task, products)
+                        for follower in followers:
+                            on_result(follower, result_cache.get(follower))
+                fill()
+        except BaseException:
+            # Ctrl+C / SIGTERM: no esperar a que terminen las búsquedas en curso al salir del `with`
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import Counter
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+# Un planificador por proceso, compartido por el pool de navegadores y el fetcher HTTP
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class TokenBucket:
+    """`rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        """Takes `amount` tokens and returns how long the caller must wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class DomainThrottle:
+    """
+    Politeness state of one site: a token bucket for the steady request rate plus an extra
+    delay that grows on 429/503, captchas and slow responses and decays on healthy ones.
+    Each backoff also halves the bucket rate, which then recovers by 10% per healthy response.
+    """
+
+    def __init__(self, site):
+        rate, burst = config.SITE_RATE_LIMITS.get(site, config.DEFAULT_RATE_LIMIT)
+        self.site = site
+        self.base_rate = rate
+        self.bucket = TokenBucket(rate, burst)
+        self.backoff = 0.0
+        self.not_before = 0.0
+        self.started = time.monotonic()
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        delay = self.bucket.reserve()
+        with self._lock:
+            delay = max(delay, self.not_before - time.monotonic())
+            self.stats['requests'] += 1
+            self.stats['wait_seconds'] += max(delay, 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def _raise_backoff(self, reason, factor, retry_after=None):
+        with self._lock:
+            self.backoff = min(config.BACKOFF_MAX_SECONDS, max(config.BACKOFF_BASE_SECONDS, self.backoff * factor))
+            pause = max(self.backoff, retry_after or 0.0)
+            self.not_before = time.monotonic() + pause
+            self.bucket.rate = max(self.base_rate / 10, self.bucket.rate / 2)
+            self.stats[reason] += 1
+        logger.warning(f"[RateLimit] {self.site}: {reason}. Pausing requests for {pause:.1f}s.")
+
+    def observe(self, status=None, elapsed=None, blocked=False, retry_after=None):
+        if blocked:
+            self._raise_backoff('captcha', 2)
+        elif status in (429, 503):
+            self._raise_backoff(f"http_{status}", 2, retry_after)
+        elif elapsed is not None and elapsed > config.SLOW_RESPONSE_SECONDS:
+            self._raise_backoff('slow', 1.5)
+        else:
+            with self._lock:
+                self.backoff = self.backoff / 2 if self.backoff > 1 else 0.0
+                self.bucket.rate = min(self.base_rate, self.bucket.rate * 1.1)
+
+    def report(self):
+        minutes = max((time.monotonic() - self.started) / 60, 1e-9)
+        logger.info(
+            f"[RateLimit] {self.site}: {self.stats['requests']} requests ({self.stats['requests'] / minutes:.1f}/min) | "
+            f"waited {self.stats['wait_seconds']:.0f}s | rate now {self.bucket.rate:.2f}/s | backoffs: 429={self.stats['http_429']} 503={self.stats['http_503']} "
+            f"captcha={self.stats['captcha']} slow={self.stats['slow']}"
+        )
+
+
+class PolitenessScheduler:
+    """Per-site throttles. Scrapers (through the driver pool and the fetcher) ask before each navigation."""
+
+    def __init__(self):
+        self._throttles = {}
+        self._lock = threading.Lock()
+
+    def throttle(self, site):
+        with self._lock:
+            if site not in self._throttles:
+                self._throttles[site] = DomainThrottle(site)
+            return self._throttles[site]
+
+    def wait(self, site):
+        return self.throttle(site).wait() if site else 0.0
+
+    def observe(self, site, **kwargs):
+        if site:
+            self.throttle(site).observe(**kwargs)
+
+    def report(self):
+        for site in sorted(self._throttles):
+            self._throttles[site].report()
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PolitenessScheduler()
+        return _scheduler
+
+
+def parse_retry_after(value):
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def looks_blocked(url, title):
+    text = f"{url} {title}".lower()
+    return any(marker in text for marker in config.BLOCKED_PAGE_MARKERS)
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', text or '').strip().lower()
+
+
+def prompt_version(*parts):
+    """Short hash of the prompt template (and model): any change to them yields a new version."""
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class RelevanceCache:
+    """
+    On-disk memo of the AI relevance decisions, keyed by normalized product title, normalized
+    query and the prompt version. Entries of other prompt versions are dropped when the cache is
+    opened; the rest expire after `ttl_days`, and the least recently used are evicted once the
+    table holds more than `max_entries`. Shared on disk by every worker (one connection each);
+    within a process the connection is shared by the Gemini client threads under a lock.
+    """
+
+    def __init__(self, path, version, ttl_days=None, max_entries=None):
+        self.version = version
+        self.ttl_seconds = (ttl_days or config.RELEVANCE_CACHE_TTL_DAYS) * 86400
+        self.max_entries = max_entries or config.RELEVANCE_CACHE_MAX_ENTRIES
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stored': 0, 'evicted': 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS decisions (
+                key TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                query TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                relevant INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS decisions_last_access ON decisions (last_access)")
+        with self.conn:
+            dropped = self.conn.execute("DELETE FROM decisions WHERE prompt_version != ?", (version,)).rowcount
+        if dropped:
+            logger.info(f"[RelevanceCache] Prompt changed: {dropped} old decisions discarded.")
+        # Recuento aproximado (sube con cada escritura): la tabla solo se cuenta de verdad al pasar el límite
+        self._entries = self.conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+
+    def _key(self, title, query):
+        return hashlib.sha256(f"{self.version}\0{normalize_text(query)}\0{normalize_text(title)}".encode('utf-8')).hexdigest()
+
+    def get(self, title, query):
+        """The cached decision (True/False), or None when it has to be asked."""
+        with self._lock:
+            return self._get(title, query)
+
+    def _get(self, title, query):
+        key = self._key(title, query)
+        row = self.conn.execute("SELECT relevant, created_at FROM decisions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        relevant, created_at = row
+        if time.time() - created_at > self.ttl_seconds:
+            self.stats['expired'] += 1
+            with self.conn:
+                self.conn.execute("DELETE FROM decisions WHERE key = ?", (key,))
+            self._entries -= 1
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE decisions SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.stats['hits'] += 1
+        return bool(relevant)
+
+    def put(self, title, query, relevant):
+        with self._lock:
+            self._put(title, query, relevant)
+
+    def _put(self, title, query, relevant):
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self._key(title, query), normalize_text(title), normalize_text(query), self.version, int(relevant), now, now)
+            )
+        self.stats['stored'] += 1
+        self._entries += 1
+        self._enforce_size_cap()
+
+    def _enforce_size_cap(self):
+        if self._entries <= self.max_entries:
+            return
+        # El recuento local no ve los reemplazos ni lo que escriben otros workers: se corrige aquí
+        count = self._entries = self.conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Se libera hasta el 90% del límite para no desalojar en cada escritura
+        excess = count - int(self.max_entries * 0.9)
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM decisions WHERE key IN (SELECT key FROM decisions ORDER BY last_access LIMIT ?)", (excess,)
+            )
+        self.stats['evicted'] += excess
+        self._entries = count - excess
+
+    def report(self):
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['expired']
+        hit_rate = self.stats['hits'] / lookups * 100 if lookups else 0.0
+        logger.info(
+            f"[RelevanceCache] Hits: {self.stats['hits']} ({hit_rate:.0f}%) | Misses: {self.stats['misses']} | "
+            f"Expired: {self.stats['expired']} | Stored: {self.stats['stored']} | Evicted: {self.stats['evicted']}"
+        )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class WipesUnitsMemo:
+    """
+    On-disk memo of the wipes counts the AI gave for titles the local parser found ambiguous,
+    keyed by normalized title and stored next to the relevance decisions. Counts from another
+    wipes prompt (or model) version are dropped when the memo is opened.
+    """
+
+    def __init__(self, path, version):
+        self.version = version
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS wipes_units (
+                title_key TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                units INTEGER NOT NULL,
+                prompt_version TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        with self.conn:
+            self.conn.execute("DELETE FROM wipes_units WHERE prompt_version != ?", (version,))
+
+    def get(self, title):
+        with self._lock:
+            row = self.conn.execute("SELECT units FROM wipes_units WHERE title_key = ?", (normalize_text(title),)).fetchone()
+        self.stats['hits' if row else 'misses'] += 1
+        return row[0] if row else None
+
+    def put(self, title, units):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO wipes_units VALUES (?, ?, ?, ?, ?)",
+                (normalize_text(title), title, int(units), self.version, time.time())
+            )
+        self.stats['stored'] += 1
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,172 @@
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+WORD = re.compile(r'[a-z0-9]+')
+
+
+def relevance_tokens(text):
+    """
+    Features of a "query<TAB>title" pair: title words, title bigrams and query x title word
+    pairs, so the same title word can weigh differently depending on the query
+    ("microfiber" is bad for "glass cleaner" and good for "microfiber for vehicle").
+    Module-level so the pickled vectorizer can find it.
+    """
+    query, _, title = text.partition('\t')
+    query_words = sorted(set(WORD.findall(query.lower())))
+    title_words = WORD.findall(title.lower())
+    tokens = [f"t:{word}" for word in title_words]
+    tokens += [f"b:{a}_{b}" for a, b in zip(title_words, title_words[1:])]
+    tokens += [f"x:{q}|{word}" for q in query_words for word in set(title_words)]
+    return tokens
+
+
+def pair_text(title, query):
+    return f"{query}\t{title}"
+
+
+def load_training_decisions(cache_file):
+    """(titles, queries, labels, prompt_version) of the Gemini decisions stored in the relevance cache, newest prompt only."""
+    conn = sqlite3.connect(cache_file)
+    try:
+        row = conn.execute("SELECT prompt_version FROM decisions ORDER BY created_at DESC LIMIT 1").fetchone()
+        if row is None:
+            return [], [], [], None
+        rows = conn.execute("SELECT title, query, relevant FROM decisions WHERE prompt_version = ?", (row[0],)).fetchall()
+    finally:
+        conn.close()
+    titles, queries, labels = zip(*rows)
+    return list(titles), list(queries), list(labels), row[0]
+
+
+def band_metrics(probabilities, labels, band):
+    """Escalation rate and agreement with Gemini of the confident predictions for one uncertainty band."""
+    lower, upper = band
+    confident = [(p >= upper, label) for p, label in zip(probabilities, labels) if p <= lower or p >= upper]
+    agreed = sum(1 for predicted, label in confident if predicted == bool(label))
+    return {
+        'samples': len(labels),
+        'escalation_rate': 1 - len(confident) / len(labels) if labels else 0.0,
+        'agreement': agreed / len(confident) if confident else 0.0,
+    }
+
+
+def train_model(cache_file, model_file, band=None, test_size=0.2):
+    """Fits TF-IDF + logistic regression on the cached decisions and saves it with its held-out metrics."""
+    import joblib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+
+    band = band or config.RELEVANCE_MODEL_BAND
+    titles, queries, labels, version = load_training_decisions(cache_file)
+    if len(labels) < config.RELEVANCE_MODEL_MIN_SAMPLES or len(set(labels)) < 2:
+        raise ValueError(f"Not enough decisions to train: {len(labels)} (need {config.RELEVANCE_MODEL_MIN_SAMPLES} with both answers)")
+
+    texts = [pair_text(title, query) for title, query in zip(titles, queries)]
+    X_train, X_test, y_train, y_test = train_test_split(texts, labels, test_size=test_size, random_state=42, stratify=labels)
+
+    def build():
+        return Pipeline([
+            ('tfidf', TfidfVectorizer(analyzer=relevance_tokens, sublinear_tf=True, min_df=2)),
+            ('clf', LogisticRegression(C=4.0, class_weight='balanced', max_iter=2000)),
+        ])
+
+    probabilities = build().fit(X_train, y_train).predict_proba(X_test)[:, 1]
+    metrics = band_metrics(probabilities, y_test, band)
+    metrics['accuracy'] = sum(1 for p, label in zip(probabilities, y_test) if (p >= 0.5) == bool(label)) / len(y_test)
+
+    # El modelo final se entrena con todas las decisiones
+    pipeline = build().fit(texts, labels)
+    os.makedirs(os.path.dirname(model_file) or '.', exist_ok=True)
+    joblib.dump({
+        'pipeline': pipeline,
+        'prompt_version': version,
+        'band': band,
+        'samples': len(labels),
+        'trained_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'test_metrics': metrics,
+    }, model_file)
+    return metrics
+
+
+class RelevancePreClassifier:
+    """
+    Local relevance model in front of Gemini. decide() answers True/False when the predicted
+    probability is outside the uncertainty band and None (ask Gemini) inside it. A small share of
+    the confident answers is also sent to Gemini (`audit_rate`) to track live agreement.
+    """
+
+    def __init__(self, model, band=None, audit_rate=None):
+        self.pipeline = model['pipeline']
+        self.band = band or model.get('band') or config.RELEVANCE_MODEL_BAND
+        self.audit_rate = config.RELEVANCE_MODEL_AUDIT_RATE if audit_rate is None else audit_rate
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, model_file, prompt_version):
+        """The classifier saved by train_relevance_model.py, or None if missing or trained for another prompt."""
+        if not model_file or not os.path.exists(model_file):
+            logger.info(f"[RelevanceModel] No local model at '{model_file}'. Every title goes to Gemini.")
+            return None
+        try:
+            import joblib
+            model = joblib.load(model_file)
+        except Exception:
+            logger.error(f"[RelevanceModel] Could not load '{model_file}'.", exc_info=True)
+            return None
+        if model.get('prompt_version') != prompt_version:
+            logger.warning("[RelevanceModel] Model trained with another relevance prompt. Ignored until retrained.")
+            return None
+        metrics = model.get('test_metrics', {})
+        logger.info(
+            f"[RelevanceModel] Loaded ({model.get('samples')} decisions, {model.get('trained_at')}). "
+            f"Held-out: escalation {metrics.get('escalation_rate', 0):.0%}, agreement {metrics.get('agreement', 0):.1%}"
+        )
+        return cls(model)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def probability(self, product_name, search_query):
+        return self.pipeline.predict_proba([pair_text(product_name, search_query)])[0][1]
+
+    def decide(self, product_name, search_query):
+        """(decision or None, audit): audit=True means "answer locally, but also ask Gemini to compare"."""
+        lower, upper = self.band
+        p = self.probability(product_name, search_query)
+        if lower < p < upper:
+            self._count('escalated')
+            return None, False
+        decision = p >= upper
+        self._count('local_yes' if decision else 'local_no')
+        return decision, random.random() < self.audit_rate
+
+    def record_audit(self, local_decision, gemini_decision):
+        self._count('audited')
+        if local_decision == gemini_decision:
+            self._count('audit_agreed')
+
+    def report(self):
+        local = self.stats['local_yes'] + self.stats['local_no']
+        total = local + self.stats['escalated']
+        if not total:
+            return
+        audited = self.stats['audited']
+        agreement = f"{self.stats['audit_agreed'] / audited:.1%}" if audited else "n/a"
+        logger.info(
+            f"[RelevanceModel] {total} titles | answered locally: {local} (yes {self.stats['local_yes']}, no {self.stats['local_no']}) | "
+            f"escalated to Gemini: {self.stats['escalated']} ({self.stats['escalated'] / total:.0%}) | "
+            f"agreement with Gemini: {agreement} over {audited} audits"
+        )
@@ -0,0 +1,167 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.task_journal import TaskJournal
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+
+class StagingRelevanceAgent:
+    """
+    Relevance agent for the deferred stage: scrapers never wait for Gemini. Listing titles are only
+    rejected when the answer is already known (cache or confident local model); every other product
+    is accepted and staged for classify_staged(). Wipes units still go to the real agent.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def is_relevant(self, product_name, search_query):
+        return True
+
+    def classify_batch(self, product_names, search_query):
+        return [self.agent.known_decision(name, search_query) is not False for name in product_names]
+
+    def extract_wipes_units(self, product_title):
+        return self.agent.extract_wipes_units(product_title)
+
+    def submit_wipes_units(self, product_title):
+        return self.agent.submit_wipes_units(product_title)
+
+
+class CandidateStore:
+    """
+    Staging table of the scraped candidates (the output rows plus the search query), one block per
+    scraping unit. Decisions are stored with the relevance prompt version, so the stage can be run
+    again (or after a prompt change) without scraping. Only written from the main process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS candidates (
+                unit_key TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                title TEXT NOT NULL,
+                row_json TEXT NOT NULL,
+                relevant INTEGER,
+                prompt_version TEXT,
+                staged_at REAL NOT NULL,
+                PRIMARY KEY (unit_key, position)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS candidates_query_title ON candidates (query, title)")
+        self.conn.commit()
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM candidates")
+
+    def stage(self, task, rows):
+        """Replaces the candidates of a scraping unit (a retried unit does not leave duplicates)."""
+        unit_key = TaskJournal.unit_key(task)
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM candidates WHERE unit_key = ?", (unit_key,))
+            self.conn.executemany(
+                "INSERT INTO candidates (unit_key, position, query, title, row_json, staged_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(unit_key, i, task['keyword'], row.get('product') or '', json.dumps(row), now) for i, row in enumerate(rows)]
+            )
+
+    def reset_decisions(self):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE candidates SET relevant = NULL, prompt_version = NULL")
+
+    def pending(self, version):
+        """{query: [titles]} of the candidates without a decision for this prompt version (each pair once)."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT query, title FROM candidates WHERE prompt_version IS NULL OR prompt_version != ? ORDER BY query",
+                (version,)
+            ).fetchall()
+        by_query = {}
+        for query, title in rows:
+            by_query.setdefault(query, []).append(title)
+        return by_query
+
+    def set_decisions(self, query, titles, decisions, version):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE candidates SET relevant = ?, prompt_version = ? WHERE query = ? AND title = ?",
+                [(int(decision), version, query, title) for title, decision in zip(titles, decisions)]
+            )
+
+    def accepted_rows(self, version):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT row_json FROM candidates WHERE relevant = 1 AND prompt_version = ? ORDER BY staged_at, unit_key, position",
+                (version,)
+            ).fetchall()
+        return [json.loads(row_json) for (row_json,) in rows]
+
+    def counts(self, version):
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT COUNT(*),
+                       SUM(prompt_version = ? AND relevant = 1),
+                       SUM(prompt_version = ? AND relevant = 0)
+                FROM candidates
+            """, (version, version)).fetchone()
+        total, accepted, rejected = row[0], row[1] or 0, row[2] or 0
+        return {'total': total, 'accepted': accepted, 'rejected': rejected, 'pending': total - accepted - rejected}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def classify_staged(store, agent, concurrency=None, chunk_size=None):
+    """
+    Relevance stage: classifies every staged candidate still undecided for the current prompt.
+    Queries run `concurrency` at a time, each in classify_batch() chunks whose batches run on the
+    Gemini client threads, and decisions are saved after each chunk so an interrupted stage resumes.
+    Returns False (nothing classified) when the agent has no Gemini client.
+    """
+    if not agent.client:
+        logger.error("[RelevanceStage] No Gemini client: staged candidates stay pending.")
+        return False
+    concurrency = concurrency or config.RELEVANCE_STAGE_CONCURRENCY
+    chunk_size = chunk_size or config.RELEVANCE_STAGE_CHUNK
+    version = agent.prompt_version
+    pending = store.pending(version)
+    chunks = [(query, titles[i:i + chunk_size]) for query, titles in pending.items() for i in range(0, len(titles), chunk_size)]
+    total = sum(len(titles) for _, titles in chunks)
+    logger.info(f"[RelevanceStage] {total} titles to classify for {len(pending)} queries ({len(chunks)} chunks).")
+    if not chunks:
+        return True
+
+    start = time.perf_counter()
+    done = accepted = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='relevance-stage') as executor:
+        futures = {executor.submit(agent.classify_batch, titles, query): (query, titles) for query, titles in chunks}
+        for future in as_completed(futures):
+            query, titles = futures[future]
+            try:
+                decisions = future.result()
+            except Exception:
+                logger.error(f"[RelevanceStage] Error classifying '{query}'. Left pending.", exc_info=True)
+                continue
+            store.set_decisions(query, titles, decisions, version)
+            done += len(titles)
+            accepted += sum(decisions)
+            logger.info(f"[RelevanceStage] {done}/{total} titles classified ('{query}': {sum(decisions)}/{len(titles)} relevant).")
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"[RelevanceStage] {done} titles in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} titles/s) | "
+        f"relevant: {accepted} | not relevant: {done - accepted}"
+    )
+    return True
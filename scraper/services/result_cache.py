@@ -0,0 +1,37 @@
+from log_config import get_logger
+
+logger = get_logger()
+
+
+class SearchResultCache:
+    """
+    Per-run memo of scrape results keyed by (site, keyword, search_mode). The same search shows up
+    under several sub-industries; only the subindustry/industry/channel columns differ between them.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(task):
+        return (task['site'], task['keyword'].strip().lower(), task['search_mode'])
+
+    def get(self, task):
+        products = self._results.get(self.key(task))
+        if products is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            logger.info(f"   -> Reutilizando {len(products)} productos ya encontrados en '{task['site']}' para '{task['keyword']}' ({task['search_mode']}).")
+        return products
+
+    def __contains__(self, task):
+        return self.key(task) in self._results
+
+    def put(self, task, products):
+        self._results[self.key(task)] = list(products)
+
+    def report(self):
+        logger.info(f"[ResultCache] Búsquedas reutilizadas: {self.hits} | Búsquedas nuevas: {self.misses}")
@@ -0,0 +1,116 @@
+import csv
+import os
+import queue
+import threading
+import time
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+_CLOSE = object()
+
+
+class StreamingCSVWriter:
+    """
+    Writes result rows to the output CSV from a background thread as soon as they are produced.
+    Rows go through a bounded queue, so the scraping thread never waits on disk I/O, and the file
+    is flushed + fsynced every `flush_rows` rows or `flush_seconds` seconds, whichever comes first.
+    A write or fsync error is kept and raised from the next writerow()/writerows() and from close(),
+    so the run fails instead of finishing with rows missing; later rows are discarded.
+    checkpoint()/rollback() take back the rows of a unit of work that failed after streaming some.
+    """
+
+    def __init__(self, f, fieldnames, flush_rows=None, flush_seconds=None, queue_size=None):
+        self._file = f
+        self._writer = csv.DictWriter(f, fieldnames=fieldnames)
+        self.flush_rows = flush_rows or config.WRITER_FLUSH_ROWS
+        self.flush_seconds = flush_seconds or config.WRITER_FLUSH_SECONDS
+        self._queue = queue.Queue(maxsize=queue_size or config.WRITER_QUEUE_SIZE)
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+        self.rows_written = 0
+        self._error = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='csv-writer', daemon=True)
+        self._thread.start()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def writerow(self, row):
+        self._raise_error()
+        self._queue.put(row)
+
+    def writerows(self, rows):
+        self._raise_error()
+        for row in rows:
+            self._queue.put(row)
+
+    def checkpoint(self):
+        """Waits for the rows queued so far to be written and returns a token for rollback()."""
+        self._queue.join()
+        with self._lock:
+            self._raise_error()
+            self._file.flush()
+            return self._file.tell(), self.rows_written
+
+    def rollback(self, token):
+        """Drops every row written after checkpoint() returned `token`."""
+        self._queue.join()
+        position, rows_written = token
+        with self._lock:
+            self._raise_error()
+            self._file.seek(position)
+            self._file.truncate()
+            self._sync()
+            self.rows_written = rows_written
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                item = None
+            if item is _CLOSE:
+                self._queue.task_done()
+                break
+            try:
+                # Tras un error se sigue vaciando la cola para que quien escribe nunca quede bloqueado
+                if self._error is None:
+                    with self._lock:
+                        self._write(item)
+            except Exception as e:
+                logger.error("[Writer] Error escribiendo en el CSV de salida.", exc_info=True)
+                self._error = e
+            finally:
+                if item is not None:
+                    self._queue.task_done()
+
+    def _write(self, item):
+        if item is not None:
+            self._writer.writerow(item)
+            self.rows_written += 1
+            self._pending_sync += 1
+        if self._pending_sync and (
+            self._pending_sync >= self.flush_rows or time.monotonic() - self._last_sync >= self.flush_seconds
+        ):
+            self._sync()
+
+    def close(self):
+        """Drains the queue, then flushes and fsyncs whatever is left. Raises the writer thread's error, if any."""
+        if self._thread.is_alive():
+            logger.info(f"[Writer] Vaciando cola de escritura ({self._queue.qsize()} filas pendientes)...")
+            self._queue.put(_CLOSE)
+            self._thread.join()
+            if self._error is None:
+                self._sync()
+            logger.info(f"[Writer] {self.rows_written} filas escritas en esta ejecución.")
+        self._raise_error()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import config
+from log_config import get_logger
+
+logger = get_logger()
+
+
+def file_fingerprint(paths, *values):
+    """
+    Hash of the contents of `paths` plus `values` taken as plain strings. Paths of files the run
+    itself writes (the output CSV) go in `values`: their contents change while the run goes on.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if path and os.path.isfile(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        else:
+            digest.update(str(path).encode('utf-8'))
+        digest.update(b'\0')
+    for value in values:
+        digest.update(str(value).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class TaskJournal:
+    """
+    Durable record of the scraping units (subindustry, type_of_product, site, keyword)
+    completed in the current run, with their result rows, so a killed run can resume.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS units (
+                unit_key TEXT PRIMARY KEY,
+                subindustry TEXT, type_of_product TEXT, site TEXT, keyword TEXT,
+                rows_json TEXT NOT NULL,
+                completed_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self._done = set()
+
+    @staticmethod
+    def unit_key(task):
+        return json.dumps([task['subindustry'], task['type_of_product'], task['site'], task['keyword']])
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(k, str(v)) for k, v in values.items()]
+        )
+
+    def can_resume(self, fingerprint):
+        status = self._get_meta('status')
+        if status != 'running':
+            logger.info(f"[Journal] No hay una ejecución interrumpida en '{self.path}' (estado: {status}).")
+            return False
+        if self._get_meta('fingerprint') != fingerprint:
+            logger.warning(f"[Journal] '{self.path}' pertenece a otras instrucciones/salida. Se empieza de cero.")
+            return False
+        age_hours = (time.time() - float(self._get_meta('started_at') or 0)) / 3600
+        if age_hours > config.JOURNAL_MAX_AGE_HOURS:
+            logger.warning(f"[Journal] La ejecución interrumpida tiene {age_hours:.0f}h (máx. {config.JOURNAL_MAX_AGE_HOURS}h). Se empieza de cero.")
+            return False
+        return True
+
+    def start(self, fingerprint, base_offset):
+        with self.conn:
+            self.conn.execute("DELETE FROM units")
+            self.conn.execute("DELETE FROM meta")
+            self._set_meta(status='running', fingerprint=fingerprint, base_offset=base_offset, started_at=time.time())
+        self._done = set()
+
+    def resume(self):
+        self._done = {row[0] for row in self.conn.execute("SELECT unit_key FROM units")}
+        logger.info(f"[Journal] Reanudando: {len(self._done)} búsquedas ya completadas en '{self.path}'.")
+        return int(self._get_meta('base_offset') or 0)
+
+    def is_done(self, task):
+        return self.unit_key(task) in self._done
+
+    def completed_rows(self):
+        rows = []
+        for (rows_json,) in self.conn.execute("SELECT rows_json FROM units ORDER BY completed_at"):
+            rows.extend(json.loads(rows_json))
+        return rows
+
+    def mark_done(self, task, rows):
+        key = self.unit_key(task)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, task['subindustry'], task['type_of_product'], task['site'], task['keyword'],
+                 json.dumps(rows, default=str), time.time())
+            )
+        self._done.add(key)
+
+    def finish(self):
+        with self.conn:
+            self._set_meta(status='completed', finished_at=time.time())
+
+    def close(self):
+        self.conn.close()
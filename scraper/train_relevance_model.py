@@ -0,0 +1,50 @@
+# scraper/train_relevance_model.py
+# Entrena el modelo local de relevancia (TF-IDF + regresión logística) con las decisiones de Gemini
+# guardadas en la caché de relevancia. Se ejecuta desde la raíz del proyecto:
+#   python scraper/train_relevance_model.py
+#   python scraper/train_relevance_model.py --band 0.05 0.95
+import argparse
+import os
+import sys
+scraper_dir = os.path.abspath(os.path.dirname(__file__))
+project_root = os.path.abspath(os.path.join(scraper_dir, '..'))
+for path in (scraper_dir, project_root):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+import config
+from services.relevance_model import train_model
+from log_config import get_logger
+
+logger = get_logger()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena el pre-clasificador local de relevancia.")
+    parser.add_argument('--cache_file', default=config.RELEVANCE_CACHE_FILE,
+                        help=f"Caché SQLite con las decisiones de Gemini (default: {config.RELEVANCE_CACHE_FILE})")
+    parser.add_argument('--model_file', default=config.RELEVANCE_MODEL_FILE,
+                        help=f"Dónde guardar el modelo (default: {config.RELEVANCE_MODEL_FILE})")
+    parser.add_argument('--band', type=float, nargs=2, default=list(config.RELEVANCE_MODEL_BAND), metavar=('LOWER', 'UPPER'),
+                        help=f"Banda de incertidumbre que se consulta a Gemini (default: {config.RELEVANCE_MODEL_BAND})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.cache_file):
+        logger.error(f"No existe la caché de relevancia '{args.cache_file}'. Ejecuta antes el scraping con la caché activada.")
+        sys.exit(1)
+
+    try:
+        metrics = train_model(args.cache_file, args.model_file, band=tuple(args.band))
+    except ValueError as e:
+        logger.error(f"No se pudo entrenar: {e}")
+        sys.exit(1)
+
+    logger.info(f"Modelo guardado en '{args.model_file}'.")
+    logger.info(
+        f"Validación (20% reservado): exactitud {metrics['accuracy']:.1%} | "
+        f"consultas a Gemini (banda {args.band[0]}-{args.band[1]}): {metrics['escalation_rate']:.0%} | "
+        f"acuerdo con Gemini fuera de la banda: {metrics['agreement']:.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,50 @@
 import re
+from functools import lru_cache
+
+# --- Patrones precompilados (una sola compilación por proceso) ---
+VOLUME_PATTERN = re.compile(r'(\d+\.?\d*)\s*(ltr|ml|l|g|kg|liter|litre|liters|milliliters|grams|kilograms|oz|ounce|fl\s?oz|fluid\sounces?)\b', re.I)
+COUNT_PATTERNS = [
+    re.compile(r'(\d+)\s*/\s*(box|pack|count)\b', re.I),
+    re.compile(r'(\d+)\s*(?:wet\s*)?(wipes|count|sheets|sachets|pack|pcs|pieces|pc)\b', re.I),
+    re.compile(r'\b(pack|box)\s*of\s*(\d+)', re.I),
+    re.compile(r'^(\d+)\s*(?:sanitizing\s*)?(wipes|count|sheets|sachets|pack|pcs|pieces|pc)\b', re.I),
+]
+SACO_COUNT_PATTERN = re.compile(r'(\d+)\s*-\s*(piece|wipes|rags)\b', re.I)
+OFFICESUPPLY_MULTIPLIER_PATTERN = re.compile(r'\((\d+\.?\d*)\s+.*?\s*[xX]\s*(\d+\.?\d*)\s*(ltr|ml|l|liter|litre|liters|milliliters)\b.*\)', re.I)
+GOGREEN_MULTIPLIER_PATTERN = re.compile(r'(\d+)\s*Pcs\s*[xX]\s*(\d+\.?\d*)\s*(ltr|ml|l|liter|litre|liters|milliliters)\b', re.I)
+SIMPLE_MULTIPLIER_PATTERN = re.compile(r'(\d+)\s*[xX]', re.I)
+AEROSENSE_PCS_PATTERN = re.compile(r'\((\d+)\s*pcs\)')
+AEROSENSE_PACK_PATTERN = re.compile(r'(\d+)-pack\s*x\s*(\d+)')
+
+
+@lru_cache(maxsize=None)
+def volume_unit(unit_text):
+    """(canonical unit, factor to ml/g) of a unit matched by VOLUME_PATTERN."""
+    unit = unit_text.lower().strip()
+    if 'milliliter' in unit or unit == 'ml':
+        return 'ml', 1
+    if 'liter' in unit or unit == 'l' or unit == 'ltr':
+        return 'L', 1000
+    if 'gram' in unit or unit == 'g':
+        return 'g', 1
+    if 'kilogram' in unit or unit == 'kg':
+        return 'kg', 1000
+    if 'oz' in unit or 'ounce' in unit:
+        return 'fl oz', 29.5735
+    return unit, 1
+
 
 def parse_volume_string(text_string):
     if not text_string:
         return None
     
-    match = re.search(r'(\d+\.?\d*)\s*(ltr|ml|l|g|kg|liter|litre|liters|milliliters|grams|kilograms|oz|ounce|fl\s?oz|fluid\sounces?)\b', text_string, re.I)
+    match = VOLUME_PATTERN.search(text_string)
     if not match:
         return None
         
     quantity = float(match.group(1))
-    unit = match.group(2).lower().strip()
-    normalized_value = quantity
-    
-    if 'milliliter' in unit or unit == 'ml':
-        unit = 'ml'
-    elif 'liter' in unit or unit == 'l' or unit == 'ltr':
-        normalized_value = quantity * 1000
-        unit = 'L'
-    elif 'gram' in unit or unit == 'g':
-        unit = 'g'
-    elif 'kilogram' in unit or unit == 'kg':
-        normalized_value = quantity * 1000
-        unit = 'kg'
-    elif 'oz' in unit or 'ounce' in unit:
-        normalized_value = quantity * 29.5735
-        unit = 'fl oz'
+    unit, factor = volume_unit(match.group(2))
+    normalized_value = quantity * factor if factor != 1 else quantity
 
     return {'quantity': quantity, 'unit': unit, 'normalized': normalized_value}
 
@@ -32,15 +52,8 @@ def parse_count_string(text_string):
     if not text_string:
         return None
 
-    patterns = [
-        r'(\d+)\s*/\s*(box|pack|count)\b',
-        r'(\d+)\s*(?:wet\s*)?(wipes|count|sheets|sachets|pack|pcs|pieces|pc)\b',
-        r'\b(pack|box)\s*of\s*(\d+)',
-        r'^(\d+)\s*(?:sanitizing\s*)?(wipes|count|sheets|sachets|pack|pcs|pieces|pc)\b'
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, text_string, re.I)
+    for pattern in COUNT_PATTERNS:
+        match = pattern.search(text_string)
         if match:
             # Different patterns might have the number in group 1 or 2
             quantity_str = match.group(1) if match.group(1) and match.group(1).isdigit() else (match.group(2) if len(match.groups()) > 1 and match.group(2) and match.group(2).isdigit() else None)
@@ -54,7 +67,7 @@ def parse_saco_count_string(text_string):
     if not text_string:
         return None
     
-    match = re.search(r'(\d+)\s*-\s*(piece|wipes|rags)\b', text_string, re.I)
+    match = SACO_COUNT_PATTERN.search(text_string)
     if not match:
         return None
         
@@ -64,10 +77,7 @@ def parse_saco_count_string(text_string):
 def parse_volume_with_multiplier(text_string):
     if not text_string:
         return None
-    office_supply_match = re.search(
-        r'\((\d+\.?\d*)\s+.*?\s*[xX]\s*(\d+\.?\d*)\s*(ltr|ml|l|liter|litre|liters|milliliters)\b.*\)',
-        text_string, re.I
-    )
+    office_supply_match = OFFICESUPPLY_MULTIPLIER_PATTERN.search(text_string)
     if office_supply_match:
         multiplier = float(office_supply_match.group(1))
         base_quantity = float(office_supply_match.group(2))
@@ -78,7 +88,7 @@ def parse_volume_with_multiplier(text_string):
         if final_data:
             final_data['quantity'] = total_quantity
             return final_data
-    gogreen_match = re.search(r'(\d+)\s*Pcs\s*[xX]\s*(\d+\.?\d*)\s*(ltr|ml|l|liter|litre|liters|milliliters)\b', text_string, re.I)
+    gogreen_match = GOGREEN_MULTIPLIER_PATTERN.search(text_string)
     if gogreen_match:
         multiplier = float(gogreen_match.group(1))
         base_quantity = float(gogreen_match.group(2))
@@ -94,7 +104,7 @@ def parse_volume_with_multiplier(text_string):
         return None 
 
     multiplier = 1
-    simple_multiplier_match = re.search(r'(\d+)\s*[xX]', text_string, re.I)
+    simple_multiplier_match = SIMPLE_MULTIPLIER_PATTERN.search(text_string)
     if simple_multiplier_match:
         multiplier = int(simple_multiplier_match.group(1))
 
@@ -106,11 +116,133 @@ def parse_volume_with_multiplier(text_string):
     return base_volume_data
 
 def extract_aerosense_units(text):
-    match_pcs = re.search(r'\((\d+)\s*pcs\)', text)
+    match_pcs = AEROSENSE_PCS_PATTERN.search(text)
     if match_pcs:
         return int(match_pcs.group(1))
-    match_pack = re.search(r'(\d+)-pack\s*x\s*(\d+)', text)
+    match_pack = AEROSENSE_PACK_PATTERN.search(text)
     if match_pack:
         return int(match_pack.group(1)) * int(match_pack.group(2))
 
-    return None
\ No newline at end of file
+    return None
+
+
+# --- Wipes units (deterministic first, AI only when ambiguous) ---
+WIPES_BASE_UNITS = r'(?:wet\s+|sanitizing\s+|disinfecting\s+|disinfectant\s+|cleaning\s+|baby\s+)?(?:wipes?|sheets?|count|ct|pulls|towelettes?|rags?)\b'
+WIPES_BASE_PATTERN = re.compile(r'(\d+)\s*-?\s*' + WIPES_BASE_UNITS, re.I)
+WIPES_PIECES_PATTERN = re.compile(r'(\d+)\s*-?\s*(?:pcs|pieces?)\b', re.I)
+WIPES_MULTIPLIER_PATTERNS = [
+    re.compile(r'\b(?:pack|set|bundle|box|case)\s+of\s+(\d+)\b', re.I),
+    re.compile(r'\b(\d+)\s*-?\s*(?:packs?|pk|tubs?|canisters?|packets?)\b', re.I),
+    re.compile(r'\b(\d+)\s*x(?=\s*\d|\b)(?!\s*\()', re.I),
+    re.compile(r'\bx\s*(\d+)\b(?!\s*-?\s*' + WIPES_BASE_UNITS + r')', re.I),
+]
+WIPES_NESTED_PATTERN = re.compile(r'(\d+)\s*x\s*\(([^()]*)\)', re.I)
+# Medidas ("20x20 cm") que no son multiplicadores
+WIPES_DIMENSIONS_PATTERN = re.compile(r'\b\d+(?:\.\d+)?\s*x\s*\d+(?:\.\d+)?\s*(?:cm|mm|in|inch(?:es)?|")', re.I)
+# Promociones ("3 packs + 1 free"): el total no se deduce de forma fiable
+WIPES_AMBIGUOUS_PATTERN = re.compile(r'\+|\bfree\b|\bbonus\b|\bextra\b', re.I)
+
+
+def _wipes_total(text):
+    """Total wipes of a title without parentheses, or None when it has no count or the numbers disagree."""
+    bases = {int(m.group(1)) for m in WIPES_BASE_PATTERN.finditer(text)}
+    if not bases:
+        bases = {int(m.group(1)) for m in WIPES_PIECES_PATTERN.finditer(text)}
+    if not bases or 0 in bases:
+        return None
+    # Los números de la cantidad base no cuentan como multiplicadores ("3 x 80 wipes": el 80)
+    base_spans = [m.span(1) for m in WIPES_BASE_PATTERN.finditer(text)]
+    multipliers = set()
+    for pattern in WIPES_MULTIPLIER_PATTERNS:
+        for m in pattern.finditer(text):
+            if m.span(1) not in base_spans and int(m.group(1)) > 1:
+                multipliers.add(int(m.group(1)))
+    if len(multipliers) > 1:
+        return None
+    multiplier = multipliers.pop() if multipliers else 1
+    if len(bases) == 1:
+        return bases.pop() * multiplier
+    # Dos cantidades solo son coherentes si una es el total de la otra: "75 Wipes, Pack of 3 (225 Wipes)"
+    low, high = min(bases), max(bases)
+    if len(bases) == 2 and (high == low * multiplier or (multiplier == 1 and high % low == 0)):
+        return high
+    return None
+
+
+def parse_wipes_units(text_string):
+    """
+    Total wipes in a title, multiplying the base count by pack multipliers, including nested
+    ones ("2 x (3 x 80 wipes)"). Returns None when the title is ambiguous or has no count;
+    the caller then asks the AI.
+    """
+    if not text_string or WIPES_AMBIGUOUS_PATTERN.search(text_string):
+        return None
+    text = re.sub(r'(?<=\d),(?=\d{3}\b)', '', text_string.replace('×', 'x').replace('*', 'x'))
+    text = WIPES_DIMENSIONS_PATTERN.sub(' ', text)
+    # Se resuelven los paréntesis de dentro hacia fuera: "2 x (3 x 80 wipes)" -> "2 x 240 wipes"
+    while True:
+        nested = WIPES_NESTED_PATTERN.search(text)
+        if not nested:
+            break
+        inner_total = _wipes_total(nested.group(2))
+        if inner_total is None:
+            return None
+        text = f"{text[:nested.start()]} {int(nested.group(1)) * inner_total} wipes {text[nested.end():]}"
+    text = re.sub(r'[()\[\]]', ' ', text)
+    total = _wipes_total(text)
+    if total is None:
+        return None
+    return {'quantity': total, 'unit': 'units', 'normalized': total}
+
+
+# --- Batch parsing (re-processing stored titles) ---
+def _aerosense_quantity(text_string):
+    units = extract_aerosense_units(text_string)
+    return {'quantity': units, 'unit': 'units', 'normalized': units} if units else None
+
+
+QUANTITY_PARSERS = {
+    'volume': parse_volume_string,
+    'count': parse_count_string,
+    'saco_count': parse_saco_count_string,
+    'volume_multiplier': parse_volume_with_multiplier,
+    'aerosense': _aerosense_quantity,
+    'wipes': parse_wipes_units,
+}
+
+
+def _parse_volume_series(text):
+    # Una sola pasada de str.extract sobre toda la serie; las unidades se resuelven una vez por valor distinto
+    groups = text.str.extract(VOLUME_PATTERN)
+    canonical = {unit_text: volume_unit(unit_text) for unit_text in groups[1].dropna().unique()}
+    quantity = groups[0].astype(float)
+    factor = groups[1].map({unit_text: factor for unit_text, (_, factor) in canonical.items()})
+    return {
+        'quantity': quantity,
+        'unit': groups[1].map({unit_text: unit for unit_text, (unit, _) in canonical.items()}),
+        'normalized': quantity * factor,
+    }
+
+
+def parse_quantities(titles, kind='volume'):
+    """
+    DataFrame with quantity/unit/normalized columns for many titles at once (a list or a pandas
+    Series, whose index is kept); NaN where the title has no quantity. kind is a QUANTITY_PARSERS
+    key: 'volume' runs as one vectorized str.extract, the rest parse each distinct title once.
+    """
+    import pandas as pd
+
+    if kind not in QUANTITY_PARSERS:
+        raise ValueError(f"Unknown quantity parser '{kind}'. Expected one of: {', '.join(QUANTITY_PARSERS)}")
+    series = titles if isinstance(titles, pd.Series) else pd.Series(list(titles), dtype=object)
+    text = series.astype(object).where(series.notna(), '').astype(str)
+    if kind == 'volume':
+        return pd.DataFrame(_parse_volume_series(text), index=series.index)
+
+    parser = QUANTITY_PARSERS[kind]
+    parsed = {title: parser(title) for title in text.unique()}
+    parsed = {title: result for title, result in parsed.items() if result}
+    return pd.DataFrame({
+        column: text.map({title: result[column] for title, result in parsed.items()})
+        for column in ('quantity', 'unit', 'normalized')
+    }, index=series.index)